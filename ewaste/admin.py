@@ -1,7 +1,82 @@
 from django.contrib import admin
 from django.contrib.auth.models import User
 from django.contrib.auth.admin import UserAdmin as DjangoUserAdmin
-from .models import EWasteCategory, EWasteItem, PickupRequest, RecyclingFacility, Feedback, Company, Notification, UserProfile
+from django.core.paginator import EmptyPage, Paginator
+from django.db import connections
+from django.http import HttpResponse
+from django.utils.functional import cached_property
+from . import services
+from .models import ArchivedItem, ArchivedRecord, EWasteCategory, EWasteItem, PickupRequest, RecyclingFacility, Feedback, Company, CompanySubscription, DigestEntry, HeatmapCell, Notification, PickupSlot, UserProfile, ImpactStat, Job, JobSchedule, PickupEvent, PickupEventMonthly
+
+
+# Counting more rows than this exactly is not worth a full scan for a page count
+ADMIN_COUNT_LIMIT = 10000
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator for large changelists.
+
+    An unfiltered list takes the row count from the planner statistics where the
+    database keeps them (PostgreSQL, MySQL). Otherwise rows are counted up to
+    ADMIN_COUNT_LIMIT + 1, so the count never scans more than one window of the
+    index. Past that count the page links stop, but a page beyond them is still
+    served by ?p= as long as it has rows.
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not queryset.query.where:
+            estimate = self._estimated_rows(queryset)
+            if estimate is not None and estimate > ADMIN_COUNT_LIMIT:
+                return estimate
+        return queryset[:ADMIN_COUNT_LIMIT + 1].count()
+
+    @property
+    def is_capped(self):
+        """Whether count is an estimate or a cut-off rather than the exact total"""
+        return self.count > ADMIN_COUNT_LIMIT
+
+    def validate_number(self, number):
+        try:
+            return super().validate_number(number)
+        except EmptyPage:
+            bottom = (int(number) - 1) * self.per_page
+            if not self.is_capped or bottom < 0 or not self.object_list[bottom:bottom + 1].exists():
+                raise
+        return int(number)
+
+    def page(self, number):
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        top = bottom + self.per_page
+        if not self.is_capped and top + self.orphans >= self.count:
+            top = self.count
+        return self._get_page(self.object_list[bottom:top], number, self)
+
+    @staticmethod
+    def _estimated_rows(queryset):
+        connection = connections[queryset.db]
+        table = queryset.model._meta.db_table
+        if connection.vendor == 'postgresql':
+            sql, params = "SELECT reltuples::bigint FROM pg_class WHERE relname = %s", [table]
+        elif connection.vendor == 'mysql':
+            sql = "SELECT table_rows FROM information_schema.tables WHERE table_schema = DATABASE() AND table_name = %s"
+            params = [table]
+        else:
+            return None
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            row = cursor.fetchone()
+        return int(row[0]) if row and row[0] and row[0] > 0 else None
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """Changelist settings for tables that grow without bound"""
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    list_per_page = 50
 
 
 class UserProfileInline(admin.StackedInline):
@@ -9,12 +84,18 @@ class UserProfileInline(admin.StackedInline):
     can_delete = False
     verbose_name_plural = 'Profile'
     fk_name = 'user'
-    fields = ('is_company', 'company', 'created_at')
+    fields = ('is_company', 'company', 'email_frequency', 'created_at')
     readonly_fields = ('created_at',)
+    autocomplete_fields = ('company',)
 
 
 class CustomUserAdmin(DjangoUserAdmin):
     inlines = (UserProfileInline,)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    list_select_related = ('profile',)
+    # Prefix and exact lookups can use the username/email indexes
+    search_fields = ('^username', '=email', '^first_name', '^last_name')
 
     def is_company_member(self, obj):
         profile = getattr(obj, 'profile', None)
@@ -37,10 +118,19 @@ class EWasteCategoryAdmin(admin.ModelAdmin):
 
 
 @admin.register(EWasteItem)
-class EWasteItemAdmin(admin.ModelAdmin):
+class EWasteItemAdmin(LargeTableAdmin):
     list_display = ['item_name', 'user', 'category', 'condition', 'is_collected', 'created_at']
     list_filter = ['condition', 'is_collected', 'category', 'created_at']
-    search_fields = ['item_name', 'user__username']
+    list_select_related = ['user', 'category']
+    search_fields = ['^item_name', '=user__username']
+    autocomplete_fields = ['user', 'duplicate_of']
+    actions = ['mark_collected']
+
+    @admin.action(description='Mark selected items collected (completes their pickups)')
+    def mark_collected(self, request, queryset):
+        pickup_ids = list(PickupRequest.objects.filter(ewaste_item__in=queryset).values_list('id', flat=True))
+        updated, skipped = services.bulk_update_pickups(pickup_ids, request.user, to_status='completed')
+        self.message_user(request, f"Completed {len(updated)} pickup(s), skipped {len(skipped)}.")
     readonly_fields = ['created_at', 'updated_at']
     fieldsets = (
         ('Item Information', {
@@ -50,17 +140,46 @@ class EWasteItemAdmin(admin.ModelAdmin):
             'fields': ('quantity', 'pickup_location', 'preferred_date', 'contact_phone')
         }),
         ('Status', {
-            'fields': ('is_collected', 'created_at', 'updated_at')
+            'fields': ('is_collected', 'duplicate_of', 'created_at', 'updated_at')
         }),
     )
 
 
 @admin.register(PickupRequest)
-class PickupRequestAdmin(admin.ModelAdmin):
+class PickupRequestAdmin(LargeTableAdmin):
     list_display = ['ewaste_item', 'status', 'assigned_to', 'scheduled_date', 'created_at']
     list_filter = ['status', 'created_at']
-    search_fields = ['ewaste_item__item_name']
-    readonly_fields = ['created_at', 'updated_at']
+    list_select_related = ['ewaste_item__user', 'assigned_to']
+    search_fields = ['^ewaste_item__item_name', '=assigned_to__username']
+    autocomplete_fields = ['ewaste_item', 'assigned_to']
+    actions = ['assign_to_me', 'mark_completed', 'cancel_pickups', 'export_csv']
+
+    def _bulk(self, request, queryset, **kwargs):
+        pickup_ids = list(queryset.values_list('id', flat=True))
+        updated, skipped = services.bulk_update_pickups(pickup_ids, request.user, **kwargs)
+        self.message_user(request, f"Updated {len(updated)} pickup(s), skipped {len(skipped)}.")
+
+    @admin.action(description='Assign selected pickups to me')
+    def assign_to_me(self, request, queryset):
+        self._bulk(request, queryset, assign_to=request.user)
+
+    @admin.action(description='Mark selected pickups completed')
+    def mark_completed(self, request, queryset):
+        self._bulk(request, queryset, to_status='completed')
+
+    @admin.action(description='Cancel selected pickups')
+    def cancel_pickups(self, request, queryset):
+        self._bulk(request, queryset, to_status='cancelled')
+
+    @admin.action(description='Export selected pickups as CSV')
+    def export_csv(self, request, queryset):
+        response = HttpResponse(content_type='text/csv')
+        response['Content-Disposition'] = 'attachment; filename="pickups.csv"'
+        services.write_pickups_csv(queryset, response)
+        return response
+    # Status moves only through the actions above, which log events and keep
+    # bookings and counters in step
+    readonly_fields = ['status', 'slot', 'created_at', 'updated_at']
 
 
 @admin.register(RecyclingFacility)
@@ -81,21 +200,133 @@ class RecyclingFacilityAdmin(admin.ModelAdmin):
 
 
 @admin.register(Feedback)
-class FeedbackAdmin(admin.ModelAdmin):
+class FeedbackAdmin(LargeTableAdmin):
     list_display = ['user', 'subject', 'rating', 'created_at']
     list_filter = ['rating', 'created_at']
-    search_fields = ['user__username', 'subject', 'message']
+    list_select_related = ['user']
+    search_fields = ['=user__username', '^subject']
+    autocomplete_fields = ['user']
     readonly_fields = ['created_at']
 
 
+class CompanySubscriptionInline(admin.TabularInline):
+    model = CompanySubscription
+    extra = 0
+    fields = ['category', 'condition', 'geohash_prefix', 'region']
+
+
 @admin.register(Company)
 class CompanyAdmin(admin.ModelAdmin):
-    list_display = ['name', 'contact_email', 'contact_phone', 'created_at']
+    list_display = ['name', 'contact_email', 'contact_phone', 'service_regions', 'email_frequency', 'created_at']
+    list_filter = ['email_frequency']
     search_fields = ['name', 'contact_email']
+    inlines = (CompanySubscriptionInline,)
+
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        if change:
+            return
+        # Subscriptions entered with a new company replace the catch-all one
+        # it was given on creation (see signals.py)
+        default_id, *entered = form.instance.subscriptions.order_by('id').values_list('id', flat=True)
+        if entered:
+            CompanySubscription.objects.filter(id=default_id).delete()
 
 
 @admin.register(Notification)
-class NotificationAdmin(admin.ModelAdmin):
+class NotificationAdmin(LargeTableAdmin):
     list_display = ['message', 'user', 'company', 'is_read', 'created_at']
     list_filter = ['is_read', 'created_at']
-    search_fields = ['message', 'user__username', 'company__name']
+    list_select_related = ['user', 'company']
+    search_fields = ['=user__username', '^company__name']
+    autocomplete_fields = ['user', 'company']
+
+
+@admin.register(PickupSlot)
+class PickupSlotAdmin(LargeTableAdmin):
+    list_display = ['date', 'area', 'capacity', 'booked']
+    list_editable = ['capacity']
+    list_filter = ['date']
+    search_fields = ['=area']
+    readonly_fields = ['booked']
+    date_hierarchy = 'date'
+
+
+@admin.register(ArchivedItem)
+class ArchivedItemAdmin(LargeTableAdmin):
+    list_display = ['item_name', 'user', 'pickup_status', 'is_collected', 'created_at', 'archived_at']
+    list_filter = ['pickup_status', 'is_collected']
+    list_select_related = ['user']
+    search_fields = ['^item_name', '=user__username']
+    raw_id_fields = ['user', 'company', 'impact_company']
+
+
+@admin.register(ArchivedRecord)
+class ArchivedRecordAdmin(LargeTableAdmin):
+    list_display = ['kind', 'original_id', 'user', 'created_at', 'archived_at']
+    list_filter = ['kind']
+    list_select_related = ['user']
+    search_fields = ['=original_id', '=user__username']
+    raw_id_fields = ['user']
+
+
+@admin.register(HeatmapCell)
+class HeatmapCellAdmin(LargeTableAdmin):
+    list_display = ['cell', 'precision', 'category_id', 'status', 'items', 'units', 'updated_at']
+    list_filter = ['precision', 'status']
+    search_fields = ['^cell']
+
+
+@admin.register(DigestEntry)
+class DigestEntryAdmin(LargeTableAdmin):
+    list_display = ['email', 'frequency', 'subject', 'created_at']
+    list_filter = ['frequency']
+    search_fields = ['=email']
+
+
+@admin.register(ImpactStat)
+class ImpactStatAdmin(LargeTableAdmin):
+    list_display = ['key', 'scope', 'items_collected', 'weight_kg', 'co2_avoided_kg', 'updated_at']
+    list_filter = ['scope']
+    search_fields = ['^key']
+    raw_id_fields = ['user', 'company']
+    readonly_fields = ['updated_at']
+
+
+@admin.register(Job)
+class JobAdmin(LargeTableAdmin):
+    list_display = ['name', 'status', 'attempts', 'run_at', 'locked_by', 'finished_at']
+    list_filter = ['status', 'name']
+    search_fields = ['^name']
+    readonly_fields = ['created_at', 'updated_at']
+
+
+@admin.register(JobSchedule)
+class JobScheduleAdmin(admin.ModelAdmin):
+    list_display = ['name', 'interval_seconds', 'next_run_at', 'last_run_at', 'enabled']
+    list_editable = ['enabled']
+
+
+@admin.register(PickupEvent)
+class PickupEventAdmin(LargeTableAdmin):
+    list_display = ['pickup', 'from_status', 'to_status', 'actor', 'created_at']
+    list_filter = ['to_status', 'created_at']
+    list_select_related = ['pickup__ewaste_item', 'actor']
+    raw_id_fields = ['pickup', 'actor']
+    readonly_fields = ['pickup', 'from_status', 'to_status', 'actor', 'created_at']
+
+    # The audit log is append-only
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(PickupEventMonthly)
+class PickupEventMonthlyAdmin(admin.ModelAdmin):
+    list_display = ['month', 'status', 'transitions', 'total_seconds', 'max_seconds']
+    list_filter = ['status']
@@ -0,0 +1,348 @@
+"""
+Versioned JSON API (v1) for the mobile collection app.
+
+Every list endpoint returns rows ordered by (updated_at, id) and supports:
+
+- ?fields=a,b,c  project a subset of the endpoint's fields
+- ?since=<ISO 8601>  delta sync: only rows changed after that time, plus
+  `deleted`, the ids removed (deleted or archived) since then. When those are
+  no longer known (see tombstones.py) `full_resync` is true and the client
+  has to fetch the list again without ?since=
+- ?cursor=<token>  continue from the previous page's next_cursor
+- ?limit=<n>  page size (default 100, max 500)
+
+Responses carry an ETag and Last-Modified derived from the rows' updated_at,
+so unchanged lists answer conditional requests with 304 Not Modified.
+"""
+import base64
+import hashlib
+import json
+import os
+from functools import wraps
+
+from django.db.models import Count, Max, Q
+from django.http import JsonResponse
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.dateparse import parse_date, parse_datetime
+from django.utils.http import http_date
+from django.views.decorators.http import require_GET, require_POST
+
+from . import categories, dbmetrics, heatmap, services, slots, tombstones
+from .models import EWasteItem, Notification, PickupRequest, RecyclingFacility
+
+
+API_VERSION = 'v1'
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+MAX_SYNC_CHANGES = 200
+
+ITEM_FIELDS = (
+    'id', 'item_name', 'category', 'description', 'condition', 'quantity',
+    'pickup_location', 'preferred_date', 'contact_phone', 'is_collected',
+    'company', 'region_key', 'created_at', 'updated_at',
+)
+PICKUP_FIELDS = (
+    'id', 'ewaste_item', 'ewaste_item__item_name', 'status', 'assigned_to', 'company',
+    'scheduled_date', 'completed_date', 'notes', 'created_at', 'updated_at',
+)
+FACILITY_FIELDS = (
+    'id', 'name', 'address', 'phone', 'email', 'accepted_items',
+    'operating_hours', 'latitude', 'longitude', 'updated_at',
+)
+NOTIFICATION_FIELDS = ('id', 'message', 'url', 'is_read', 'created_at', 'updated_at')
+
+
+class ApiError(Exception):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def api_error(message, status=400):
+    return JsonResponse({'error': message}, status=status)
+
+
+def api_view(view):
+    """Turn ApiError into a JSON error response"""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        try:
+            return view(request, *args, **kwargs)
+        except ApiError as exc:
+            return api_error(str(exc), status=exc.status)
+    return wrapper
+
+
+def api_login_required(view):
+    """Like login_required, but answers 401 JSON instead of redirecting"""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return api_error('Authentication required.', status=401)
+        return view(request, *args, **kwargs)
+    return api_view(wrapper)
+
+
+def is_operator(user):
+    """Staff and company members may update pickups (only those visible_to them)"""
+    profile = getattr(user, 'profile', None)
+    return user.is_staff or bool(profile and profile.is_company)
+
+
+def encode_cursor(updated_at, pk):
+    raw = json.dumps([updated_at.isoformat(), pk]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        updated_at, pk = json.loads(base64.urlsafe_b64decode(padded))
+        updated_at = parse_datetime(updated_at)
+        if updated_at is None:
+            raise ValueError
+        return updated_at, int(pk)
+    except (ValueError, TypeError):
+        raise ApiError('Invalid cursor.')
+
+
+def _projection(request, allowed):
+    requested = request.GET.get('fields')
+    if not requested:
+        return list(allowed)
+    fields = [f.strip() for f in requested.split(',') if f.strip()]
+    unknown = set(fields) - set(allowed)
+    if unknown:
+        raise ApiError(f"Unknown fields: {', '.join(sorted(unknown))}")
+    # id and updated_at are needed to build the cursor
+    for required in ('updated_at', 'id'):
+        if required not in fields:
+            fields.insert(0, required)
+    return fields
+
+
+def _page_size(request):
+    try:
+        limit = int(request.GET.get('limit', DEFAULT_PAGE_SIZE))
+    except ValueError:
+        raise ApiError('limit must be an integer.')
+    return max(1, min(limit, MAX_PAGE_SIZE))
+
+
+def _since(request):
+    since = request.GET.get('since')
+    if not since:
+        return None
+    since_dt = parse_datetime(since)
+    if since_dt is None:
+        raise ApiError('since must be an ISO 8601 datetime.')
+    return timezone.make_aware(since_dt) if timezone.is_naive(since_dt) else since_dt
+
+
+def _filter_window(request, queryset):
+    since = _since(request)
+    if since:
+        queryset = queryset.filter(updated_at__gt=since)
+
+    cursor = request.GET.get('cursor')
+    if cursor:
+        updated_at, pk = decode_cursor(cursor)
+        queryset = queryset.filter(Q(updated_at__gt=updated_at) | Q(updated_at=updated_at, id__gt=pk))
+    return queryset
+
+
+def _add_category_names(rows):
+    for row in rows:
+        if 'category' in row:
+            row['category_name'] = categories.name_for(row['category'])
+    return rows
+
+
+def list_response(request, queryset, allowed_fields, transform=None):
+    """
+    Paginated, conditional JSON list of `queryset` projected with .values()
+    """
+    fields = _projection(request, allowed_fields)
+    limit = _page_size(request)
+    window = _filter_window(request, queryset)
+    since = _since(request)
+
+    # One aggregate query (and for delta sync, the latest tombstone) decides
+    # whether the client's copy is still current
+    state = window.aggregate(total=Count('id'), last_modified=Max('updated_at'))
+    last_modified = state['last_modified']
+    last_deleted = tombstones.last_deleted(queryset.model) if since else None
+    fingerprint = f"{API_VERSION}|{request.get_full_path()}|{state['total']}|{last_modified}|{last_deleted}"
+    etag = '"%s"' % hashlib.md5(fingerprint.encode()).hexdigest()
+    changed_at = max(filter(None, (last_modified, last_deleted)), default=None)
+    timestamp = int(changed_at.timestamp()) if changed_at else None
+
+    not_modified = get_conditional_response(request, etag=etag, last_modified=timestamp)
+    if not_modified is not None:
+        return not_modified
+
+    rows = list(window.order_by('updated_at', 'id').values(*fields)[:limit + 1])
+    more = len(rows) > limit
+    rows = rows[:limit]
+    if transform:
+        rows = transform(rows)
+
+    payload = {
+        'version': API_VERSION,
+        'count': len(rows),
+        'results': rows,
+        'next_cursor': encode_cursor(rows[-1]['updated_at'], rows[-1]['id']) if more else None,
+        'sync_token': changed_at.isoformat() if changed_at else None,
+    }
+    if since:
+        deleted = tombstones.deleted_since(queryset.model, since)
+        payload['deleted'] = deleted or []
+        payload['full_resync'] = deleted is None
+    response = JsonResponse(payload)
+    response['ETag'] = etag
+    if timestamp is not None:
+        response['Last-Modified'] = http_date(timestamp)
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+@require_GET
+@api_login_required
+def items(request):
+    queryset = EWasteItem.objects.visible_to(request.user)
+    return list_response(request, queryset, ITEM_FIELDS, transform=_add_category_names)
+
+
+@require_GET
+@api_login_required
+def pickups(request):
+    queryset = PickupRequest.objects.visible_to(request.user)
+    return list_response(request, queryset, PICKUP_FIELDS)
+
+
+@require_GET
+@api_view
+def facilities(request):
+    return list_response(request, RecyclingFacility.objects.all(), FACILITY_FIELDS)
+
+
+@require_GET
+@api_view
+def db_metrics(request):
+    """Database counters of this server process, for load tests; staff only"""
+    if not dbmetrics.ENABLED:
+        raise ApiError('Database metrics are disabled.', status=404)
+    if not request.user.is_staff:
+        raise ApiError('Only staff can view database metrics.', status=403)
+    return JsonResponse({'version': API_VERSION, 'pid': os.getpid(), **dbmetrics.snapshot()})
+
+
+@require_GET
+@api_login_required
+def notifications(request):
+    queryset = Notification.objects.filter(user=request.user)
+    return list_response(request, queryset, NOTIFICATION_FIELDS)
+
+
+@require_GET
+@api_login_required
+def pickup_slots(request):
+    """
+    Bookable days for a pickup address: ?location=<address> (or ?area=<region
+    key>), optional ?start=<YYYY-MM-DD> and ?days=<n>
+    """
+    if 'area' in request.GET:
+        area = request.GET['area'].strip().lower()
+    else:
+        area = slots.area_for(request.GET.get('location', ''))
+    start = None
+    if request.GET.get('start'):
+        start = parse_date(request.GET['start'])
+        if start is None:
+            raise ApiError('start must be a YYYY-MM-DD date.')
+    try:
+        days = int(request.GET.get('days', slots.BOOKING_DAYS))
+    except ValueError:
+        raise ApiError('days must be an integer.')
+
+    response = JsonResponse({
+        'version': API_VERSION,
+        'area': area,
+        'days': slots.calendar(area, start=start, days=max(1, days)),
+    })
+    response['Cache-Control'] = f'private, max-age={slots.CALENDAR_CACHE_SECONDS}'
+    return response
+
+
+@require_GET
+@api_login_required
+def heatmap_tile(request, tile):
+    """
+    Reported e-waste per geohash cell inside `tile` (2 to 6 characters),
+    optionally filtered with ?category=<id> and ?status=open|collected
+    """
+    if not request.user.is_staff:
+        return api_error('Only staff can view the heatmap.', status=403)
+    tile = tile.lower()
+    if heatmap.tile_precision(tile) is None:
+        raise ApiError('tile must be a geohash of 2 to 6 characters.')
+    category_id = request.GET.get('category')
+    if category_id is not None:
+        if not category_id.isdigit():
+            raise ApiError('category must be an id.')
+        category_id = int(category_id)
+    status = request.GET.get('status')
+    if status and status not in (heatmap.OPEN, heatmap.COLLECTED):
+        raise ApiError('status must be open or collected.')
+
+    rows = heatmap.tile_rows(tile, category_id=category_id, status=status)
+    total, last_modified = heatmap.tile_state(rows)
+    fingerprint = f"{API_VERSION}|{request.get_full_path()}|{total}|{last_modified}"
+    etag = '"%s"' % hashlib.md5(fingerprint.encode()).hexdigest()
+    timestamp = int(last_modified.timestamp()) if last_modified else None
+    not_modified = get_conditional_response(request, etag=etag, last_modified=timestamp)
+    if not_modified is None:
+        response = JsonResponse({
+            'version': API_VERSION,
+            'tile': tile,
+            'precision': heatmap.tile_precision(tile),
+            'cells': heatmap.tile(rows),
+        })
+    else:
+        response = not_modified
+    response['ETag'] = etag
+    if timestamp is not None:
+        response['Last-Modified'] = http_date(timestamp)
+    response['Cache-Control'] = f'private, max-age={heatmap.TILE_MAX_AGE}'
+    return response
+
+
+@require_POST
+@api_login_required
+def pickup_sync(request):
+    """
+    Apply a batch of queued pickup status changes from a driver's device.
+
+    Body: {"changes": [{"id": 12, "from": "scheduled", "to": "in_progress",
+    "client_ts": "2024-05-01T09:30:00Z"}, ...]}
+    """
+    if not is_operator(request.user):
+        return api_error('Only staff and company members can update pickups.', status=403)
+    try:
+        payload = json.loads(request.body or b'{}')
+    except ValueError:
+        raise ApiError('Body must be JSON.')
+    changes = payload.get('changes') if isinstance(payload, dict) else None
+    if not isinstance(changes, list) or not all(isinstance(c, dict) for c in changes):
+        raise ApiError('changes must be a list of objects.')
+    if len(changes) > MAX_SYNC_CHANGES:
+        raise ApiError(f'At most {MAX_SYNC_CHANGES} changes per sync.')
+
+    applied, conflicts = services.sync_pickup_transitions(changes, request.user)
+    return JsonResponse({
+        'version': API_VERSION,
+        'applied': applied,
+        'conflicts': conflicts,
+        'server_time': timezone.now(),
+    })
@@ -8,3 +8,5 @@ class EwasteConfig(AppConfig):
     def ready(self):
         # Import signal handlers
         import ewaste.signals  # noqa
+        # Register job handlers
+        import ewaste.tasks  # noqa
@@ -0,0 +1,165 @@
+"""
+Hot/cold archival.
+
+Closed pickups (with their items and status events), read notifications and
+old feedback are moved into ArchivedItem and ArchivedRecord once they are
+older than settings.ARCHIVE_AFTER_DAYS. Each batch is copied and deleted in
+one transaction, so a row is always in exactly one place. The operational
+tables then only hold recent and open work and their indexes stay small.
+
+Archived items keep their original ids and the columns that item history,
+exports and the totals rebuilds read, so those paths include them; the rest
+of each row is kept as a JSON snapshot that rebuilds the original objects for
+display (see archived_pickup()).
+"""
+from contextvars import ContextVar
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.utils import timezone
+
+from . import tombstones
+from .audit import FINAL_STATUSES
+from .models import (
+    ArchivedItem, ArchivedRecord, EWasteItem, Feedback, Notification, PickupEvent, PickupRequest,
+)
+
+
+ARCHIVE_AFTER_DAYS = {
+    'pickups': 365,
+    'notifications': 30,
+    'feedback': 730,
+    **getattr(settings, 'ARCHIVE_AFTER_DAYS', {}),
+}
+
+_archiving = ContextVar('ewaste_archiving', default=False)
+
+
+def is_archiving():
+    """True while rows are being moved, so delete signals can tell archival from removal"""
+    return _archiving.get()
+
+
+def snapshot(obj):
+    """Concrete field values of a model instance, keyed by attribute name"""
+    return {field.attname: field.value_from_object(obj) for field in obj._meta.concrete_fields}
+
+
+def from_snapshot(model, values):
+    """Unsaved instance of `model` rebuilt from snapshot()"""
+    fields = {field.attname: field for field in model._meta.concrete_fields}
+    return model(**{
+        name: fields[name].to_python(value) for name, value in values.items() if name in fields
+    })
+
+
+def _cutoff(days):
+    return timezone.now() - timedelta(days=days)
+
+
+def _delete_moved(queryset):
+    token = _archiving.set(True)
+    try:
+        # Synced rows leave tombstones so API clients drop them (tombstones.py)
+        return tombstones.delete(queryset)
+    finally:
+        _archiving.reset(token)
+
+
+def archive_pickups(older_than_days=None, batch_size=500):
+    """
+    Move closed pickups untouched for `older_than_days`, their items and
+    events into ArchivedItem. Returns the number of items archived.
+    """
+    older_than_days = ARCHIVE_AFTER_DAYS['pickups'] if older_than_days is None else older_than_days
+    candidates = PickupRequest.objects.filter(status__in=FINAL_STATUSES, updated_at__lt=_cutoff(older_than_days))
+    archived = 0
+    while True:
+        ids = list(candidates.order_by('id').values_list('id', flat=True)[:batch_size])
+        if not ids:
+            break
+        with transaction.atomic():
+            pickups = list(
+                PickupRequest.objects.filter(id__in=ids, status__in=FINAL_STATUSES)
+                .select_for_update(of=('self',))
+                .select_related('ewaste_item', 'assigned_to__profile')
+            )
+            # Only the pickups still closed were locked; leave the rest alone
+            locked_ids = [pickup.id for pickup in pickups]
+            events = {}
+            for event in PickupEvent.objects.filter(pickup_id__in=locked_ids).order_by('created_at', 'id'):
+                events.setdefault(event.pickup_id, []).append(snapshot(event))
+
+            rows = []
+            for pickup in pickups:
+                item = pickup.ewaste_item
+                profile = getattr(pickup.assigned_to, 'profile', None) if pickup.assigned_to_id else None
+                rows.append(ArchivedItem(
+                    id=item.id, user_id=item.user_id, category_id=item.category_id,
+                    company_id=item.company_id, impact_company_id=profile.company_id if profile else None,
+                    item_name=item.item_name, description=item.description, condition=item.condition,
+                    quantity=item.quantity, pickup_location=item.pickup_location,
+                    preferred_date=item.preferred_date, contact_phone=item.contact_phone,
+                    geohash=item.geohash, is_collected=item.is_collected,
+                    pickup_status=pickup.status, completed_date=pickup.completed_date,
+                    created_at=item.created_at, updated_at=item.updated_at,
+                    data={'item': snapshot(item), 'pickup': snapshot(pickup), 'events': events.get(pickup.id, [])},
+                ))
+            ArchivedItem.objects.bulk_create(rows, batch_size=batch_size)
+            item_ids = [row.id for row in rows]
+            PickupEvent.objects.filter(pickup_id__in=locked_ids).delete()
+            _delete_moved(PickupRequest.objects.filter(id__in=locked_ids))
+            _delete_moved(EWasteItem.objects.filter(id__in=item_ids))
+        archived += len(rows)
+    return archived
+
+
+def _archive_records(kind, queryset, batch_size):
+    archived = 0
+    while True:
+        with transaction.atomic():
+            batch = list(queryset.order_by('id')[:batch_size])
+            if not batch:
+                break
+            ArchivedRecord.objects.bulk_create([
+                ArchivedRecord(kind=kind, original_id=obj.id, user_id=obj.user_id,
+                               created_at=obj.created_at, data=snapshot(obj))
+                for obj in batch
+            ], batch_size=batch_size, ignore_conflicts=True)
+            _delete_moved(queryset.model.objects.filter(id__in=[obj.id for obj in batch]))
+        archived += len(batch)
+    return archived
+
+
+def archive_notifications(older_than_days=None, batch_size=1000):
+    """Move read notifications older than the cutoff; returns how many"""
+    older_than_days = ARCHIVE_AFTER_DAYS['notifications'] if older_than_days is None else older_than_days
+    queryset = Notification.objects.filter(is_read=True, created_at__lt=_cutoff(older_than_days))
+    return _archive_records(ArchivedRecord.KIND_NOTIFICATION, queryset, batch_size)
+
+
+def archive_feedback(older_than_days=None, batch_size=1000):
+    """Move feedback older than the cutoff; returns how many"""
+    older_than_days = ARCHIVE_AFTER_DAYS['feedback'] if older_than_days is None else older_than_days
+    queryset = Feedback.objects.filter(created_at__lt=_cutoff(older_than_days))
+    return _archive_records(ArchivedRecord.KIND_FEEDBACK, queryset, batch_size)
+
+
+def archived_pickup(archived_item):
+    """
+    (pickup, timeline) of an archived item rebuilt as unsaved model
+    instances, with assignee and event actors loaded in one query
+    """
+    data = archived_item.data
+    if not data.get('pickup'):
+        return None, []
+    pickup = from_snapshot(PickupRequest, data['pickup'])
+    timeline = [from_snapshot(PickupEvent, values) for values in data.get('events', [])]
+    user_ids = {event.actor_id for event in timeline} | {pickup.assigned_to_id}
+    users = User.objects.in_bulk([user_id for user_id in user_ids if user_id is not None])
+    pickup.assigned_to = users.get(pickup.assigned_to_id)
+    for event in timeline:
+        event.actor = users.get(event.actor_id)
+    return pickup, timeline
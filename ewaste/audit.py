@@ -0,0 +1,149 @@
+"""
+Audit trail of pickup status transitions.
+
+Every status change appends a PickupEvent in the same transaction as the
+change itself. Time spent in each status is derived from consecutive events
+of a pickup with a LEAD() window function, so percentiles come from a single
+SQL statement instead of replaying history in Python. Events of closed
+pickups older than a few months are compacted into PickupEventMonthly rows.
+"""
+from datetime import date, datetime, timedelta
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import PickupEvent, PickupEventMonthly, PickupRequest
+
+
+FINAL_STATUSES = ['completed', 'cancelled']
+
+
+def record_transition(pickup, from_status, to_status, actor=None, when=None):
+    """Append one event; call inside the transaction that changes the status"""
+    if from_status == to_status:
+        return None
+    return PickupEvent.objects.create(
+        pickup=pickup,
+        from_status=from_status or '',
+        to_status=to_status,
+        actor=actor if actor is not None and actor.is_authenticated else None,
+        created_at=when or timezone.now(),
+    )
+
+
+def record_transitions(changes, to_status, actor=None, when=None):
+    """
+    Append events for many pickups in one INSERT; `changes` is an iterable of
+    (pickup_id, from_status) pairs
+    """
+    when = when or timezone.now()
+    actor = actor if actor is not None and actor.is_authenticated else None
+    events = [
+        PickupEvent(pickup_id=pickup_id, from_status=from_status or '', to_status=to_status,
+                    actor=actor, created_at=when)
+        for pickup_id, from_status in changes if from_status != to_status
+    ]
+    return PickupEvent.objects.bulk_create(events, batch_size=500)
+
+
+def _seconds_between(start, end):
+    """SQL expression for the number of seconds between two timestamp columns"""
+    if connection.vendor == 'sqlite':
+        return f"(julianday({end}) - julianday({start})) * 86400.0"
+    if connection.vendor == 'mysql':
+        return f"TIMESTAMPDIFF(MICROSECOND, {start}, {end}) / 1000000.0"
+    return f"EXTRACT(EPOCH FROM ({end} - {start}))"
+
+
+def _spans_sql(where=''):
+    """Time each pickup spent in each status, from consecutive events"""
+    table = PickupEvent._meta.db_table
+    return f"""
+        SELECT pickup_id, to_status AS status, created_at AS entered_at, left_at,
+               {_seconds_between('created_at', 'left_at')} AS seconds
+        FROM (
+            SELECT pickup_id, to_status, created_at,
+                   LEAD(created_at) OVER (PARTITION BY pickup_id ORDER BY created_at, id) AS left_at
+            FROM {table}
+            {where}
+        ) events
+        WHERE left_at IS NOT NULL
+    """
+
+
+def time_in_state_percentiles(since=None, percentiles=(0.5, 0.9, 0.99)):
+    """
+    Per status: number of completed stays, average and percentile durations in
+    seconds. Computed in one windowed query.
+    """
+    params = []
+    where = ''
+    if since is not None:
+        where = 'WHERE created_at >= %s'
+        params.append(since)
+
+    percentile_columns = ', '.join(
+        f"MIN(CASE WHEN cume >= {p} THEN seconds END) AS p{int(p * 100)}" for p in percentiles
+    )
+    sql = f"""
+        WITH spans AS ({_spans_sql(where)}),
+        ranked AS (
+            SELECT status, seconds,
+                   CUME_DIST() OVER (PARTITION BY status ORDER BY seconds) AS cume
+            FROM spans
+        )
+        SELECT status, COUNT(*) AS stays, AVG(seconds) AS avg_seconds, {percentile_columns}
+        FROM ranked
+        GROUP BY status
+        ORDER BY status
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        columns = [col[0] for col in cursor.description]
+        return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+
+def _month_start(value):
+    return date(value.year, value.month, 1)
+
+
+def compact_events(older_than_days=180, batch_size=1000):
+    """
+    Roll up and delete the events of closed pickups whose last event is older
+    than the cutoff. Only whole histories are compacted, so the remaining
+    events always describe complete stays. Returns the number of events removed.
+    """
+    cutoff = timezone.now() - timedelta(days=older_than_days)
+    removed = 0
+
+    while True:
+        pickup_ids = list(
+            PickupRequest.objects.filter(status__in=FINAL_STATUSES, events__isnull=False)
+            .exclude(events__created_at__gte=cutoff)
+            .values_list('id', flat=True).distinct()[:batch_size]
+        )
+        if not pickup_ids:
+            break
+
+        placeholders = ', '.join(['%s'] * len(pickup_ids))
+        sql = f"SELECT status, left_at, seconds FROM ({_spans_sql(f'WHERE pickup_id IN ({placeholders})')}) spans"
+        totals = {}
+        with connection.cursor() as cursor:
+            cursor.execute(sql, pickup_ids)
+            for status, left_at, seconds in cursor.fetchall():
+                if isinstance(left_at, str):
+                    left_at = datetime.fromisoformat(left_at)
+                key = (_month_start(left_at), status)
+                count, total, longest = totals.get(key, (0, 0.0, 0.0))
+                totals[key] = (count + 1, total + seconds, max(longest, seconds))
+
+        with transaction.atomic():
+            for (month, status), (count, total, longest) in totals.items():
+                rollup, _ = PickupEventMonthly.objects.select_for_update().get_or_create(month=month, status=status)
+                rollup.transitions += count
+                rollup.total_seconds += total
+                rollup.max_seconds = max(rollup.max_seconds, longest)
+                rollup.save()
+            deleted, _ = PickupEvent.objects.filter(pickup_id__in=pickup_ids).delete()
+        removed += deleted
+    return removed
@@ -0,0 +1,136 @@
+"""
+In-process registry of e-waste categories.
+
+Categories are a small table that is seeded once and rarely changes, so the
+registry loads all of them in one query and serves lookups from memory. Saving
+or deleting a category bumps a version number (see signals.py and
+versions.py); each process compares its loaded version against the current
+one and reloads when they differ.
+"""
+import threading
+
+from . import versions
+from .models import EWasteCategory
+
+
+VERSION_CACHE_KEY = 'ewaste:category_registry_version'
+
+DEFAULT_CATEGORIES = [
+    {"name": "Smartphones", "description": "Mobile phones and smartphones", "icon": "📱"},
+    {"name": "Laptops & Computers", "description": "Laptops, desktops, and computer equipment", "icon": "💻"},
+    {"name": "Tablets & E-Readers", "description": "Tablets, iPads, and e-readers", "icon": "📱"},
+    {"name": "Televisions", "description": "TVs and display screens", "icon": "📺"},
+    {"name": "Audio Equipment", "description": "Speakers, headphones, and audio devices", "icon": "🔊"},
+    {"name": "Printers & Scanners", "description": "Printers, copiers, and scanners", "icon": "🖨️"},
+    {"name": "Gaming Devices", "description": "Gaming consoles and accessories", "icon": "🎮"},
+    {"name": "Cameras & Photography", "description": "Digital cameras and photography equipment", "icon": "📷"},
+    {"name": "Home Appliances", "description": "Microwaves, washing machines, and other appliances", "icon": "🏠"},
+    {"name": "Cables & Accessories", "description": "Chargers, cables, and other accessories", "icon": "🔌"},
+]
+
+_lock = threading.Lock()
+_state = {
+    'version': None,
+    'ordered': [],
+    'by_id': {},
+    'by_name': {},
+}
+
+
+def current_version():
+    return versions.current(VERSION_CACHE_KEY)
+
+
+def invalidate():
+    """
+    Bump the registry version so processes reload on their next lookup
+    """
+    versions.bump(VERSION_CACHE_KEY)
+    with _lock:
+        _state['version'] = None
+
+
+def _registry():
+    version = current_version()
+    if _state['version'] != version:
+        with _lock:
+            if _state['version'] != version:
+                ordered = list(EWasteCategory.objects.order_by('name'))
+                _state['ordered'] = ordered
+                _state['by_id'] = {c.pk: c for c in ordered}
+                _state['by_name'] = {c.name: c for c in ordered}
+                _state['version'] = version
+    return _state
+
+
+def all_categories():
+    return list(_registry()['ordered'])
+
+
+def count():
+    return len(_registry()['ordered'])
+
+
+def get(category_id):
+    """Return the category with this id, or None"""
+    if category_id is None:
+        return None
+    try:
+        return _registry()['by_id'].get(int(category_id))
+    except (TypeError, ValueError):
+        return None
+
+
+def get_by_name(name):
+    return _registry()['by_name'].get(name)
+
+
+def name_for(category_id):
+    category = get(category_id)
+    return category.name if category else None
+
+
+def choices():
+    return [(c.pk, c.name) for c in _registry()['ordered']]
+
+
+def ids_matching(text):
+    """Ids of categories whose name contains `text` (case-insensitive)"""
+    text = (text or '').lower()
+    return [c.pk for c in _registry()['ordered'] if text in c.name.lower()]
+
+
+def ids_named(name):
+    category = get_by_name(name)
+    return [category.pk] if category else []
+
+
+def seed_categories(categories=None):
+    """
+    Idempotent bulk upsert of categories by name.
+
+    Returns (created, updated) counts. Runs one SELECT plus at most one bulk
+    INSERT and one bulk UPDATE, then invalidates the registry since bulk
+    operations do not send model signals.
+    """
+    categories = categories if categories is not None else DEFAULT_CATEGORIES
+    existing = {c.name: c for c in EWasteCategory.objects.filter(name__in=[c['name'] for c in categories])}
+
+    to_create = []
+    to_update = []
+    for data in categories:
+        current = existing.get(data['name'])
+        if current is None:
+            to_create.append(EWasteCategory(**data))
+        elif current.description != data['description'] or current.icon != data['icon']:
+            current.description = data['description']
+            current.icon = data['icon']
+            to_update.append(current)
+
+    if to_create:
+        EWasteCategory.objects.bulk_create(to_create)
+    if to_update:
+        EWasteCategory.objects.bulk_update(to_update, ['description', 'icon'])
+    if to_create or to_update:
+        invalidate()
+    return len(to_create), len(to_update)
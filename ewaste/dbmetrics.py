@@ -0,0 +1,88 @@
+"""
+Process-wide database counters for load tests.
+
+With settings.DB_METRICS on, every new database connection gets an execute
+wrapper (see signals.py) that counts queries, the time spent in them, and the
+queries that failed on lock contention: SQLite's "database is locked" after
+its busy timeout, deadlocks and lock timeouts elsewhere. snapshot() reads the
+counters, plus the live lock waits and deadlock total on PostgreSQL, and is
+served as JSON at /api/v1/metrics/db/ for `manage.py loadtest` to diff before
+and after a run. Counters are per process: with several server workers each
+request may land on a different one.
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.db import OperationalError, connection
+
+
+ENABLED = getattr(settings, 'DB_METRICS', False)
+
+LOCK_ERRORS = ('database is locked', 'database table is locked', 'deadlock', 'lock wait timeout', 'could not obtain lock')
+
+WRITES = ('INSERT', 'UPDATE', 'DELETE')
+
+_lock = threading.Lock()
+_counters = {
+    'queries': 0,
+    'writes': 0,
+    'query_seconds': 0.0,
+    'lock_errors': 0,
+    'lock_error_seconds': 0.0,
+}
+
+
+def _is_lock_error(exc):
+    message = str(exc).lower()
+    return any(text in message for text in LOCK_ERRORS)
+
+
+def _record(sql, seconds, lock_error):
+    with _lock:
+        _counters['queries'] += 1
+        _counters['query_seconds'] += seconds
+        if sql.lstrip()[:6].upper() in WRITES:
+            _counters['writes'] += 1
+        if lock_error:
+            _counters['lock_errors'] += 1
+            _counters['lock_error_seconds'] += seconds
+
+
+def execute_wrapper(execute, sql, params, many, context):
+    start = time.perf_counter()
+    lock_error = False
+    try:
+        return execute(sql, params, many, context)
+    except OperationalError as exc:
+        lock_error = _is_lock_error(exc)
+        raise
+    finally:
+        _record(sql, time.perf_counter() - start, lock_error)
+
+
+def install(db_connection):
+    """Add the counting wrapper to a connection once"""
+    if execute_wrapper not in db_connection.execute_wrappers:
+        db_connection.execute_wrappers.append(execute_wrapper)
+
+
+def _postgresql_locks():
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT count(*) FROM pg_locks WHERE NOT granted")
+        waiting = cursor.fetchone()[0]
+        cursor.execute("SELECT deadlocks FROM pg_stat_database WHERE datname = current_database()")
+        deadlocks = cursor.fetchone()[0]
+    return {'waiting_locks': waiting, 'deadlocks': deadlocks}
+
+
+def snapshot():
+    """Current counters of this process"""
+    with _lock:
+        data = dict(_counters)
+    data['query_seconds'] = round(data['query_seconds'], 6)
+    data['lock_error_seconds'] = round(data['lock_error_seconds'], 6)
+    data['vendor'] = connection.vendor
+    if connection.vendor == 'postgresql':
+        data.update(_postgresql_locks())
+    return data
@@ -0,0 +1,302 @@
+"""
+Duplicate-report detection for incoming e-waste items.
+
+Every open (not yet collected) item is kept in an in-memory index keyed by its
+contact phone, its normalized pickup address and MinHash/LSH buckets over the
+item name and description. Looking up a new report only touches the items that
+share a bucket with it, so a check costs a handful of dictionary lookups no
+matter how large the backlog is.
+
+The index lives in each process and is kept current by this process's saves.
+Before each lookup it loads the open items with ids above the highest it has
+seen, which picks up reports made through other processes, and a match is
+only returned after the database confirms it is still open, since another
+process may have collected or cancelled it. Text edits made through another
+process reach the index when its process restarts.
+"""
+import hashlib
+import re
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import EWasteItem
+
+
+NUM_PERMUTATIONS = 32
+LSH_BANDS = 8
+LSH_ROWS = NUM_PERMUTATIONS // LSH_BANDS
+
+# Minimum estimated similarity for two reports to count as duplicates
+TEXT_THRESHOLD = 0.5
+ADDRESS_THRESHOLD = 0.8
+
+# Only reports this recent are considered when looking for duplicates
+WINDOW_DAYS = getattr(settings, 'DUPLICATE_WINDOW_DAYS', 60)
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_PERMUTATIONS = [
+    (
+        int.from_bytes(hashlib.blake2b(f'a{i}'.encode(), digest_size=8).digest(), 'big') % _MERSENNE_PRIME or 1,
+        int.from_bytes(hashlib.blake2b(f'b{i}'.encode(), digest_size=8).digest(), 'big') % _MERSENNE_PRIME,
+    )
+    for i in range(NUM_PERMUTATIONS)
+]
+
+_ADDRESS_ABBREVIATIONS = {
+    'st': 'street', 'rd': 'road', 'ave': 'avenue', 'apt': 'apartment',
+    'flr': 'floor', 'fl': 'floor', 'bldg': 'building', 'nr': 'near',
+    'opp': 'opposite', 'sec': 'sector', 'blk': 'block', 'no': 'number',
+}
+_ADDRESS_STOPWORDS = {'the', 'of', 'and', 'near', 'opposite', 'number', 'house'}
+_TOKEN_RE = re.compile(r'[a-z0-9]+')
+
+
+def address_words(text):
+    """Return the normalized tokens of an address, in order"""
+    words = []
+    for token in _TOKEN_RE.findall((text or '').lower()):
+        token = _ADDRESS_ABBREVIATIONS.get(token, token)
+        if token not in _ADDRESS_STOPWORDS:
+            words.append(token)
+    return tuple(words)
+
+
+def normalize_address(text):
+    """Return the set of normalized tokens of an address"""
+    return frozenset(address_words(text))
+
+
+def normalize_phone(phone):
+    """Digits only, keeping the last 10 so country prefixes do not matter"""
+    digits = re.sub(r'\D', '', phone or '')
+    return digits[-10:]
+
+
+def _shingles(text):
+    words = _TOKEN_RE.findall((text or '').lower())
+    if len(words) < 2:
+        return set(words)
+    return {f'{a} {b}' for a, b in zip(words, words[1:])} | set(words)
+
+
+def minhash(text):
+    """MinHash signature of the word shingles of `text`"""
+    hashes = [
+        int.from_bytes(hashlib.blake2b(s.encode(), digest_size=8).digest(), 'big')
+        for s in _shingles(text)
+    ]
+    if not hashes:
+        return (0,) * NUM_PERMUTATIONS
+    return tuple(
+        min((a * h + b) % _MERSENNE_PRIME for h in hashes)
+        for a, b in _PERMUTATIONS
+    )
+
+
+def _signature_similarity(sig_a, sig_b):
+    return sum(1 for x, y in zip(sig_a, sig_b) if x == y) / NUM_PERMUTATIONS
+
+
+def _jaccard(a, b):
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def _item_text(item):
+    return f'{item.item_name} {item.description}'
+
+
+class _Entry:
+    __slots__ = ('item_id', 'user_id', 'phone', 'address', 'signature')
+
+    def __init__(self, item_id, user_id, phone, address, signature):
+        self.item_id = item_id
+        self.user_id = user_id
+        self.phone = phone
+        self.address = address
+        self.signature = signature
+
+
+class DuplicateIndex:
+    """Similarity index over open e-waste reports"""
+
+    def __init__(self):
+        self._entries = {}
+        self._by_phone = {}
+        self._by_band = {}
+        self._lock = threading.Lock()
+        # Highest item id loaded from the database
+        self.synced_id = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _entry_for(self, item):
+        return _Entry(
+            item.pk, item.user_id, normalize_phone(item.contact_phone),
+            normalize_address(item.pickup_location), minhash(_item_text(item)),
+        )
+
+    @staticmethod
+    def _bands(signature):
+        for band in range(LSH_BANDS):
+            yield band, signature[band * LSH_ROWS:(band + 1) * LSH_ROWS]
+
+    def add(self, item):
+        entry = self._entry_for(item)
+        with self._lock:
+            self._discard(item.pk)
+            self._entries[entry.item_id] = entry
+            if entry.phone:
+                self._by_phone.setdefault(entry.phone, set()).add(entry.item_id)
+            for key in self._bands(entry.signature):
+                self._by_band.setdefault(key, set()).add(entry.item_id)
+
+    def remove(self, item_id):
+        with self._lock:
+            self._discard(item_id)
+
+    def _discard(self, item_id):
+        entry = self._entries.pop(item_id, None)
+        if entry is None:
+            return
+        if entry.phone:
+            bucket = self._by_phone.get(entry.phone)
+            if bucket is not None:
+                bucket.discard(item_id)
+                if not bucket:
+                    del self._by_phone[entry.phone]
+        for key in self._bands(entry.signature):
+            bucket = self._by_band.get(key)
+            if bucket is not None:
+                bucket.discard(item_id)
+                if not bucket:
+                    del self._by_band[key]
+
+    def find(self, item):
+        """
+        Return (item_id, score) of the most likely earlier duplicate of `item`,
+        or None
+        """
+        probe = self._entry_for(item)
+        with self._lock:
+            candidates = set(self._by_phone.get(probe.phone, ())) if probe.phone else set()
+            for key in self._bands(probe.signature):
+                candidates |= self._by_band.get(key, set())
+            candidates.discard(item.pk)
+
+            best = None
+            for candidate_id in candidates:
+                entry = self._entries[candidate_id]
+                same_place = (
+                    (probe.phone and entry.phone == probe.phone)
+                    or _jaccard(probe.address, entry.address) >= ADDRESS_THRESHOLD
+                )
+                if not same_place:
+                    continue
+                score = _signature_similarity(probe.signature, entry.signature)
+                if score >= TEXT_THRESHOLD and (best is None or score > best[1]):
+                    best = (candidate_id, score)
+        return best
+
+
+def open_items():
+    """Reports that can still be duplicated: recent and not yet collected"""
+    since = timezone.now() - timedelta(days=WINDOW_DAYS)
+    return EWasteItem.objects.filter(is_collected=False, created_at__gte=since).exclude(
+        pickup_request__status__in=['completed', 'cancelled']
+    )
+
+
+_index = None
+_index_lock = threading.Lock()
+
+_INDEX_FIELDS = ('id', 'user_id', 'item_name', 'description', 'pickup_location', 'contact_phone')
+
+
+def _load(index, items):
+    for item in items.only(*_INDEX_FIELDS).order_by('id').iterator(chunk_size=2000):
+        index.add(item)
+        index.synced_id = max(index.synced_id, item.pk)
+
+
+def get_index():
+    """The process-wide index, built from the open backlog on first use"""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                index = DuplicateIndex()
+                _load(index, open_items())
+                _index = index
+    return _index
+
+
+def find_duplicate(item):
+    """Return the earlier open item that `item` most likely duplicates, or None"""
+    index = get_index()
+    with _index_lock:
+        _load(index, open_items().filter(id__gt=index.synced_id))
+    while True:
+        match = index.find(item)
+        if match is None:
+            return None
+        original = open_items().filter(pk=match[0]).select_related('pickup_request').first()
+        if original is not None:
+            return original
+        index.remove(match[0])
+
+
+def index_item(item):
+    if _index is None:
+        return
+    if item.is_collected:
+        _index.remove(item.pk)
+    else:
+        _index.add(item)
+
+
+def unindex_item(item_id):
+    if _index is not None:
+        _index.remove(item_id)
+
+
+def deduplicate_backlog(merge=False, dry_run=False):
+    """
+    Flag duplicates in the existing open backlog.
+
+    Items are replayed oldest first through a fresh index, so each duplicate
+    points at the earliest matching report. With merge=True the duplicates'
+    pending pickups are cancelled through services.bulk_update_pickups, in the
+    same transaction as the relinking. Returns a list of (duplicate_id, original_id).
+    """
+    from django.db import transaction
+
+    from .models import PickupRequest
+    from .services import bulk_update_pickups
+
+    index = DuplicateIndex()
+    pairs = []
+    for item in open_items().filter(duplicate_of__isnull=True).order_by('created_at').iterator(chunk_size=2000):
+        match = index.find(item)
+        if match is None:
+            index.add(item)
+        else:
+            pairs.append((item.pk, match[0]))
+
+    if dry_run or not pairs:
+        return pairs
+
+    updates = [EWasteItem(pk=dup_id, duplicate_of_id=original_id) for dup_id, original_id in pairs]
+    with transaction.atomic():
+        EWasteItem.objects.bulk_update(updates, ['duplicate_of'], batch_size=500)
+        if merge:
+            pending_ids = list(PickupRequest.objects.filter(
+                ewaste_item_id__in=[dup_id for dup_id, _ in pairs], status='pending'
+            ).values_list('id', flat=True))
+            bulk_update_pickups(pending_ids, None, to_status='cancelled')
+    return pairs
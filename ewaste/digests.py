@@ -0,0 +1,99 @@
+"""
+Email delivery with per-recipient digests.
+
+Staff and company contacts choose how often they are emailed
+(UserProfile/Company.email_frequency). Notifications for 'immediate'
+recipients are queued as send_email jobs as before; the rest are staged as
+DigestEntry rows. The hourly and daily digest jobs group the staged entries by
+recipient, render one message per recipient from templates/emails/digest.txt
+and send every digest of the run over a single mail connection. Entries are
+deleted only after their digest was handed to the backend, so a failed run is
+retried by the job queue without losing anything.
+"""
+from itertools import groupby
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.template.loader import render_to_string
+from django.utils import timezone
+
+from .jobs import enqueue
+from .models import DigestEntry
+
+
+IMMEDIATE = 'immediate'
+
+DIGEST_FREQUENCIES = ('hourly', 'daily')
+
+
+def deliver(subject, message, recipients, url=''):
+    """
+    Email `message` to `recipients`, given as (email, frequency) pairs: now
+    for immediate recipients, in the next digest for the others
+    """
+    frequencies = {}
+    for email, frequency in recipients:
+        if email:
+            frequencies.setdefault(email, frequency or IMMEDIATE)
+
+    immediate = [email for email, frequency in frequencies.items() if frequency not in DIGEST_FREQUENCIES]
+    if immediate:
+        enqueue('send_email', {'subject': subject, 'message': message, 'recipient_list': immediate})
+
+    now = timezone.now()
+    DigestEntry.objects.bulk_create([
+        DigestEntry(email=email, frequency=frequency, subject=subject, message=message, url=url, created_at=now)
+        for email, frequency in frequencies.items() if frequency in DIGEST_FREQUENCIES
+    ], batch_size=500)
+
+
+def _render(email, frequency, entries):
+    count = len(entries)
+    subject = f"Your {frequency} digest: {count} new notification{'s' if count != 1 else ''}"
+    body = render_to_string('emails/digest.txt', {
+        'email': email,
+        'frequency': frequency,
+        'entries': entries,
+        'site_url': getattr(settings, 'SITE_URL', '').rstrip('/'),
+    })
+    from_email = getattr(settings, 'DEFAULT_FROM_EMAIL', 'noreply@localhost')
+    return EmailMessage(subject, body, from_email, [email])
+
+
+def send_digests(frequency, batch_size=200):
+    """
+    Send the pending `frequency` digests, `batch_size` recipients at a time
+    over one connection. Returns the number of digests sent.
+    """
+    cutoff = DigestEntry.objects.filter(frequency=frequency).order_by('-id').values_list('id', flat=True).first()
+    if cutoff is None:
+        return 0
+
+    sent = 0
+    connection = get_connection()
+    connection.open()
+    try:
+        last_email = ''
+        while True:
+            emails = list(
+                DigestEntry.objects.filter(frequency=frequency, id__lte=cutoff, email__gt=last_email)
+                .order_by('email').values_list('email', flat=True).distinct()[:batch_size]
+            )
+            if not emails:
+                break
+            entries = (
+                DigestEntry.objects.filter(frequency=frequency, id__lte=cutoff, email__in=emails)
+                .order_by('email', 'id')
+            )
+            messages, entry_ids = [], []
+            for email, group in groupby(entries, key=lambda entry: entry.email):
+                group = list(group)
+                messages.append(_render(email, frequency, group))
+                entry_ids += [entry.id for entry in group]
+            connection.send_messages(messages)
+            DigestEntry.objects.filter(id__in=entry_ids).delete()
+            sent += len(messages)
+            last_email = emails[-1]
+    finally:
+        connection.close()
+    return sent
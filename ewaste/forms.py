@@ -1,6 +1,29 @@
 from django import forms
 from django.contrib.auth.models import User
-from .models import EWasteItem, Feedback, PickupRequest
+from .models import EWasteCategory, EWasteItem, Feedback, PickupRequest
+from . import categories, slots
+
+
+class CategoryChoiceField(forms.TypedChoiceField):
+    """Category select backed by the category registry instead of a queryset."""
+
+    def __init__(self, **kwargs):
+        kwargs.setdefault('choices', self._choices_from_registry)
+        kwargs.setdefault('coerce', categories.get)
+        kwargs.setdefault('empty_value', None)
+        super().__init__(**kwargs)
+
+    @staticmethod
+    def _choices_from_registry():
+        return [('', '---------')] + categories.choices()
+
+    def prepare_value(self, value):
+        if isinstance(value, EWasteCategory):
+            return value.pk
+        return value
+
+    def valid_value(self, value):
+        return categories.get(value) is not None
 
 
 class UserSignUpForm(forms.ModelForm):
@@ -12,6 +35,11 @@ class UserSignUpForm(forms.ModelForm):
     class Meta:
         model = User
         fields = ['username', 'email', 'first_name', 'last_name', 'password']
+
+    def validate_unique(self):
+        # The unique constraint on username is checked by the INSERT itself
+        # (see services.register_user); a SELECT beforehand would be racy anyway.
+        pass
     
     def clean(self):
         cleaned_data = super().clean()
@@ -36,12 +64,15 @@ class UserSignUpForm(forms.ModelForm):
 
 
 class EWasteItemForm(forms.ModelForm):
+    category = CategoryChoiceField(widget=forms.Select(attrs={'class': 'form-control'}))
+
     class Meta:
         model = EWasteItem
         fields = ['category', 'item_name', 'description', 'condition', 'quantity', 
-                  'pickup_location', 'preferred_date', 'contact_phone']
+                  'pickup_location', 'preferred_date', 'contact_phone', 'latitude', 'longitude']
         widgets = {
-            'category': forms.Select(attrs={'class': 'form-control'}),
+            'latitude': forms.HiddenInput(attrs={'data-geolocate': 'latitude'}),
+            'longitude': forms.HiddenInput(attrs={'data-geolocate': 'longitude'}),
             'item_name': forms.TextInput(attrs={'class': 'form-control', 'placeholder': 'e.g., Old Laptop'}),
             'description': forms.Textarea(attrs={'class': 'form-control', 'rows': 4}),
             'condition': forms.Select(attrs={'class': 'form-control'}),
@@ -51,6 +82,26 @@ class EWasteItemForm(forms.ModelForm):
             'contact_phone': forms.TextInput(attrs={'class': 'form-control', 'placeholder': '10-digit phone number'}),
         }
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        first, last = slots.booking_window()
+        self.fields['preferred_date'].widget.attrs.update(min=first.isoformat(), max=last.isoformat())
+
+    def clean_preferred_date(self):
+        preferred_date = self.cleaned_data['preferred_date']
+        first, last = slots.booking_window()
+        if not first <= preferred_date <= last:
+            raise forms.ValidationError(f"Choose a date between {first:%b %d} and {last:%b %d, %Y}.")
+        return preferred_date
+
+    def clean(self):
+        cleaned_data = super().clean()
+        latitude, longitude = cleaned_data.get('latitude'), cleaned_data.get('longitude')
+        if latitude is None or longitude is None or not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+            # Coordinates are optional; drop partial or out-of-range ones
+            cleaned_data['latitude'] = cleaned_data['longitude'] = None
+        return cleaned_data
+
 
 class FeedbackForm(forms.ModelForm):
     class Meta:
@@ -96,3 +147,26 @@ class UserEditForm(forms.ModelForm):
         if last_name and not last_name.isalpha():
             raise forms.ValidationError("Last name must contain only alphabetic characters.")
         return last_name
+
+
+class ItemHistoryFilterForm(forms.Form):
+    """GET filters for the customer's item history"""
+    status = forms.ChoiceField(
+        required=False,
+        choices=[('', 'Any status')] + PickupRequest.STATUS_CHOICES,
+        widget=forms.Select(attrs={'class': 'form-select form-select-sm'}),
+    )
+    condition = forms.ChoiceField(
+        required=False,
+        choices=[('', 'Any condition')] + EWasteItem.CONDITION_CHOICES,
+        widget=forms.Select(attrs={'class': 'form-select form-select-sm'}),
+    )
+    category = CategoryChoiceField(
+        required=False,
+        widget=forms.Select(attrs={'class': 'form-select form-select-sm'}),
+    )
+    archived = forms.BooleanField(
+        required=False,
+        label="Archived items",
+        widget=forms.CheckboxInput(attrs={'class': 'form-check-input'}),
+    )
@@ -0,0 +1,182 @@
+"""
+Geographic heatmap of reported e-waste.
+
+Items with coordinates are binned into geohash cells at several precisions
+(HEATMAP_PRECISIONS, 4 to 7 by default: roughly 40 km down to 150 m cells).
+Each HeatmapCell row counts the items and units in one cell per category and
+status ('open' or 'collected'). Rows are moved with in-place increments when
+an item is reported, collected or deleted, so a map tile is a single indexed
+range read of at most a few hundred rows however much history there is.
+rebuild() recomputes everything from the items table.
+"""
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, Max, Q, Sum
+from django.db.models.functions import Substr
+from django.utils import timezone
+
+from . import geo
+from .models import ArchivedItem, EWasteItem, HeatmapCell
+
+
+PRECISIONS = tuple(getattr(settings, 'HEATMAP_PRECISIONS', (4, 5, 6, 7)))
+TILE_MAX_AGE = getattr(settings, 'HEATMAP_TILE_MAX_AGE', 300)
+OPEN = 'open'
+COLLECTED = 'collected'
+
+# Keep OR-ed key lookups well below SQLite's expression depth limit
+_KEYS_PER_UPDATE = 200
+
+
+def _cells(geohash):
+    return [geohash[:precision] for precision in PRECISIONS if len(geohash) >= precision]
+
+
+def _status(is_collected):
+    return COLLECTED if is_collected else OPEN
+
+
+def apply(deltas):
+    """
+    Apply {(cell, category_id, status): (items, units)} with one UPDATE per
+    distinct delta; rows are created on first use
+    """
+    deltas = {key: delta for key, delta in deltas.items() if delta != (0, 0)}
+    if not deltas:
+        return
+    HeatmapCell.objects.bulk_create(
+        [HeatmapCell(cell=cell, precision=len(cell), category_id=category_id, status=status)
+         for cell, category_id, status in deltas],
+        ignore_conflicts=True, batch_size=500,
+    )
+    by_delta = {}
+    for key, delta in deltas.items():
+        by_delta.setdefault(delta, []).append(key)
+    now = timezone.now()
+    for (items, units), keys in by_delta.items():
+        for start in range(0, len(keys), _KEYS_PER_UPDATE):
+            condition = Q()
+            for cell, category_id, status in keys[start:start + _KEYS_PER_UPDATE]:
+                condition |= Q(cell=cell, category_id=category_id, status=status)
+            HeatmapCell.objects.filter(condition).update(
+                items=F('items') + items, units=F('units') + units, updated_at=now,
+            )
+
+
+def _add(deltas, geohash, category_id, status, items, units):
+    for cell in _cells(geohash or ''):
+        key = (cell, category_id or 0, status)
+        current = deltas.get(key, (0, 0))
+        deltas[key] = (current[0] + items, current[1] + units)
+
+
+def record_report(item):
+    """Count a newly reported item"""
+    deltas = {}
+    _add(deltas, item.geohash, item.category_id, _status(item.is_collected), 1, item.quantity)
+    apply(deltas)
+
+
+def record_removal(item):
+    """Stop counting a deleted item"""
+    deltas = {}
+    _add(deltas, item.geohash, item.category_id, _status(item.is_collected), -1, -item.quantity)
+    apply(deltas)
+
+
+def record_collections(items):
+    """Move newly collected items (a queryset) from open to collected, with one grouped read"""
+    deltas = {}
+    rows = (
+        items.exclude(geohash='').values('geohash', 'category_id')
+        .annotate(n=Count('id'), units=Sum('quantity')).order_by()
+    )
+    for row in rows:
+        _add(deltas, row['geohash'], row['category_id'], OPEN, -row['n'], -row['units'])
+        _add(deltas, row['geohash'], row['category_id'], COLLECTED, row['n'], row['units'])
+    apply(deltas)
+
+
+def record_collection(item):
+    deltas = {}
+    _add(deltas, item.geohash, item.category_id, OPEN, -1, -item.quantity)
+    _add(deltas, item.geohash, item.category_id, COLLECTED, 1, item.quantity)
+    apply(deltas)
+
+
+def rebuild():
+    """
+    Recompute every cell, live and archived items alike, with one grouped
+    query per precision and table
+    """
+    totals = {}
+    for model in (EWasteItem, ArchivedItem):
+        items = model.objects.exclude(geohash='')
+        for precision in PRECISIONS:
+            rows = (
+                items.annotate(cell=Substr('geohash', 1, precision))
+                .values('cell', 'category_id', 'is_collected')
+                .annotate(n=Count('id'), units=Sum('quantity')).order_by()
+            )
+            for row in rows:
+                if len(row['cell']) == precision:
+                    key = (row['cell'], row['category_id'] or 0, _status(row['is_collected']))
+                    current = totals.get(key, (0, 0))
+                    totals[key] = (current[0] + row['n'], current[1] + row['units'])
+    now = timezone.now()
+    cells = [
+        HeatmapCell(cell=cell, precision=len(cell), category_id=category_id, status=status,
+                    items=items, units=units, updated_at=now)
+        for (cell, category_id, status), (items, units) in totals.items()
+    ]
+    with transaction.atomic():
+        HeatmapCell.objects.all().delete()
+        HeatmapCell.objects.bulk_create(cells, batch_size=1000)
+    return len(cells)
+
+
+def tile_precision(tile):
+    """Precision of the cells returned for a tile, or None if it is not a valid tile"""
+    if not geo.is_valid(tile) or not 2 <= len(tile) < max(PRECISIONS):
+        return None
+    return max(min(PRECISIONS), len(tile) + 1)
+
+
+def tile_rows(tile, category_id=None, status=None):
+    """Non-empty cells inside `tile`, one indexed range read"""
+    rows = HeatmapCell.objects.filter(
+        precision=tile_precision(tile), cell__gte=tile, cell__lt=tile + '~', items__gt=0,
+    )
+    if category_id is not None:
+        rows = rows.filter(category_id=category_id)
+    if status:
+        rows = rows.filter(status=status)
+    return rows
+
+
+def tile_state(rows):
+    """(item total, last update) of a tile, for conditional responses"""
+    state = rows.aggregate(total=Sum('items'), last_modified=Max('updated_at'))
+    return state['total'] or 0, state['last_modified']
+
+
+def tile(rows):
+    """Cells of a tile as dicts with totals and per-category/status breakdowns"""
+    cells = {}
+    for cell, category_id, status, items, units in rows.values_list('cell', 'category_id', 'status', 'items', 'units'):
+        entry = cells.get(cell)
+        if entry is None:
+            south, west, north, east = geo.bounds(cell)
+            entry = cells[cell] = {
+                'cell': cell,
+                'bounds': [round(south, 6), round(west, 6), round(north, 6), round(east, 6)],
+                'items': 0,
+                'units': 0,
+                'by_status': {},
+                'by_category': {},
+            }
+        entry['items'] += items
+        entry['units'] += units
+        entry['by_status'][status] = entry['by_status'].get(status, 0) + items
+        entry['by_category'][category_id] = entry['by_category'].get(category_id, 0) + items
+    return [cells[cell] for cell in sorted(cells)]
@@ -0,0 +1,308 @@
+from django.db import transaction
+from django.db.models import Case, Count, F, FloatField, IntegerField, Q, Sum, Value, When
+from django.db.models.functions import Coalesce
+
+from . import categories
+from .models import ArchivedItem, EWasteItem, ImpactStat
+
+
+# Typical per-unit figures for each seeded category (see add_categories.py).
+# weight_kg is the average device weight; metals/plastics/glass are the
+# recoverable fractions of that weight; co2_kg is the avoided emissions per
+# unit when the device is recycled instead of landfilled.
+CATEGORY_COEFFICIENTS = {
+    'Smartphones': {'weight_kg': 0.18, 'metals': 0.25, 'plastics': 0.40, 'glass': 0.15, 'co2_kg': 16.0},
+    'Laptops & Computers': {'weight_kg': 2.5, 'metals': 0.45, 'plastics': 0.30, 'glass': 0.05, 'co2_kg': 200.0},
+    'Tablets & E-Readers': {'weight_kg': 0.5, 'metals': 0.30, 'plastics': 0.35, 'glass': 0.20, 'co2_kg': 60.0},
+    'Televisions': {'weight_kg': 12.0, 'metals': 0.30, 'plastics': 0.30, 'glass': 0.25, 'co2_kg': 180.0},
+    'Audio Equipment': {'weight_kg': 1.5, 'metals': 0.40, 'plastics': 0.45, 'glass': 0.00, 'co2_kg': 20.0},
+    'Printers & Scanners': {'weight_kg': 6.0, 'metals': 0.35, 'plastics': 0.55, 'glass': 0.02, 'co2_kg': 45.0},
+    'Gaming Devices': {'weight_kg': 2.5, 'metals': 0.35, 'plastics': 0.50, 'glass': 0.00, 'co2_kg': 50.0},
+    'Cameras & Photography': {'weight_kg': 0.6, 'metals': 0.40, 'plastics': 0.35, 'glass': 0.15, 'co2_kg': 25.0},
+    'Home Appliances': {'weight_kg': 25.0, 'metals': 0.60, 'plastics': 0.25, 'glass': 0.05, 'co2_kg': 150.0},
+    'Cables & Accessories': {'weight_kg': 0.2, 'metals': 0.50, 'plastics': 0.45, 'glass': 0.00, 'co2_kg': 2.0},
+}
+
+# Used for items without a category or with a category not in the table
+DEFAULT_COEFFICIENT = {'weight_kg': 1.0, 'metals': 0.35, 'plastics': 0.40, 'glass': 0.05, 'co2_kg': 20.0}
+
+# Working devices can be refurbished, which avoids more emissions than
+# recovering the raw materials of a broken one.
+CONDITION_CO2_FACTORS = {
+    'working': 1.2,
+    'partial': 1.0,
+    'broken': 0.9,
+}
+
+IMPACT_FIELDS = ('weight_kg', 'metals_kg', 'plastics_kg', 'glass_kg', 'co2_avoided_kg')
+
+
+def _coefficient(category_name):
+    return CATEGORY_COEFFICIENTS.get(category_name, DEFAULT_COEFFICIENT)
+
+
+def _per_unit(category_name):
+    """Per-unit impact figures for a category, keyed like ImpactStat fields."""
+    coeff = _coefficient(category_name)
+    weight = coeff['weight_kg']
+    return {
+        'weight_kg': weight,
+        'metals_kg': weight * coeff['metals'],
+        'plastics_kg': weight * coeff['plastics'],
+        'glass_kg': weight * coeff['glass'],
+        'co2_avoided_kg': coeff['co2_kg'],
+    }
+
+
+def item_impact(item):
+    """
+    Impact figures for a single item (quantity and condition applied)
+    """
+    category_name = categories.name_for(item.category_id)
+    figures = {k: v * item.quantity for k, v in _per_unit(category_name).items()}
+    figures['co2_avoided_kg'] *= CONDITION_CO2_FACTORS.get(item.condition, 1.0)
+    return figures
+
+
+def _coefficient_case(field):
+    """SQL CASE mapping an item's category to the per-unit value of `field`."""
+    default = _per_unit(None)[field]
+    whens = [
+        When(category_id__in=categories.ids_named(name), then=Value(_per_unit(name)[field]))
+        for name in CATEGORY_COEFFICIENTS
+        if categories.ids_named(name)
+    ]
+    return Case(*whens, default=Value(default), output_field=FloatField())
+
+
+def _condition_case():
+    whens = [
+        When(Q(condition=condition), then=Value(factor))
+        for condition, factor in CONDITION_CO2_FACTORS.items()
+    ]
+    return Case(*whens, default=Value(1.0), output_field=FloatField())
+
+
+def impact_aggregates():
+    """
+    Aggregate expressions computing impact totals in the database, usable with
+    both .aggregate() and .values(...).annotate()
+    """
+    aggregates = {
+        'items_collected': Count('id'),
+        'units_collected': Coalesce(Sum('quantity'), 0),
+    }
+    for field in IMPACT_FIELDS:
+        expression = F('quantity') * _coefficient_case(field)
+        if field == 'co2_avoided_kg':
+            expression = expression * _condition_case()
+        aggregates[field] = Coalesce(Sum(expression, output_field=FloatField()), 0.0)
+    return aggregates
+
+
+def compute_impact(queryset):
+    """
+    Compute impact totals over a queryset of items in a single query
+    """
+    return queryset.aggregate(**impact_aggregates())
+
+
+def _collected_items():
+    return EWasteItem.objects.filter(is_collected=True)
+
+
+def _archived_collected_items():
+    return ArchivedItem.objects.filter(is_collected=True)
+
+
+def _scope_queryset(scope, obj):
+    items = _collected_items()
+    if scope == ImpactStat.SCOPE_USER:
+        return items.filter(user=obj)
+    if scope == ImpactStat.SCOPE_COMPANY:
+        return items.filter(pickup_request__assigned_to__profile__company=obj)
+    return items
+
+
+def _archived_scope_queryset(scope, obj):
+    items = _archived_collected_items()
+    if scope == ImpactStat.SCOPE_USER:
+        return items.filter(user=obj)
+    if scope == ImpactStat.SCOPE_COMPANY:
+        return items.filter(impact_company=obj)
+    return items
+
+
+def _scope_kwargs(scope, obj):
+    if scope == ImpactStat.SCOPE_USER:
+        return {'user': obj}
+    if scope == ImpactStat.SCOPE_COMPANY:
+        return {'company': obj}
+    return {}
+
+
+def get_impact(scope, obj=None):
+    """
+    Return the cached ImpactStat for a scope, computing it on first access
+    """
+    key = ImpactStat.make_key(scope, obj)
+    stat = ImpactStat.objects.filter(key=key).first()
+    if stat is None:
+        totals = compute_impact(_scope_queryset(scope, obj))
+        archived = compute_impact(_archived_scope_queryset(scope, obj))
+        totals = {field: totals[field] + archived[field] for field in totals}
+        stat, _ = ImpactStat.objects.update_or_create(
+            key=key,
+            defaults=dict(scope=scope, **_scope_kwargs(scope, obj), **totals),
+        )
+    return stat
+
+
+def get_user_impact(user):
+    return get_impact(ImpactStat.SCOPE_USER, user)
+
+
+def get_company_impact(company):
+    return get_impact(ImpactStat.SCOPE_COMPANY, company)
+
+
+def get_platform_impact():
+    return get_impact(ImpactStat.SCOPE_PLATFORM)
+
+
+def _item_company(item):
+    pickup = getattr(item, 'pickup_request', None)
+    assignee = pickup.assigned_to if pickup else None
+    profile = getattr(assignee, 'profile', None) if assignee else None
+    return profile.company if profile else None
+
+
+def record_collection(item):
+    """
+    Add a newly collected item to the cached totals with in-place increments.
+
+    Scopes without a cached row are left alone; they are computed from the
+    items table on first access and will already include this item.
+    """
+    figures = item_impact(item)
+    increments = {
+        'items_collected': F('items_collected') + 1,
+        'units_collected': F('units_collected') + item.quantity,
+    }
+    increments.update({field: F(field) + figures[field] for field in IMPACT_FIELDS})
+
+    keys = [
+        ImpactStat.make_key(ImpactStat.SCOPE_USER, item.user),
+        ImpactStat.make_key(ImpactStat.SCOPE_PLATFORM),
+    ]
+    company = _item_company(item)
+    if company is not None:
+        keys.append(ImpactStat.make_key(ImpactStat.SCOPE_COMPANY, company))
+
+    ImpactStat.objects.filter(key__in=keys).update(**increments)
+
+
+def _grouped_impact(items):
+    """Impact totals of `items` keyed by the ImpactStat key of every scope they touch"""
+    aggregates = impact_aggregates()
+    totals = {}
+    for row in items.values('user').annotate(**aggregates).order_by():
+        totals[f"{ImpactStat.SCOPE_USER}:{row.pop('user')}"] = row
+
+    company_field = 'pickup_request__assigned_to__profile__company'
+    company_rows = (
+        items.filter(**{f'{company_field}__isnull': False})
+        .values(company_field).annotate(**aggregates).order_by()
+    )
+    for row in company_rows:
+        totals[f"{ImpactStat.SCOPE_COMPANY}:{row.pop(company_field)}"] = row
+
+    platform = compute_impact(items)
+    if platform['items_collected']:
+        totals[ImpactStat.SCOPE_PLATFORM] = platform
+    return totals
+
+
+def record_collections(items):
+    """
+    Bulk variant of record_collection for a queryset of newly collected items:
+    one grouped query per scope and a single UPDATE with a CASE per column.
+    """
+    totals = _grouped_impact(items)
+    if not totals:
+        return 0
+    increments = {}
+    for field in ('items_collected', 'units_collected') + IMPACT_FIELDS:
+        output_field = IntegerField() if field in ('items_collected', 'units_collected') else FloatField()
+        by_key = Case(
+            *[When(key=key, then=Value(row[field])) for key, row in totals.items()],
+            default=Value(0), output_field=output_field,
+        )
+        increments[field] = F(field) + by_key
+    return ImpactStat.objects.filter(key__in=list(totals)).update(**increments)
+
+
+def _add_totals(totals, key, row):
+    current = totals.get(key)
+    totals[key] = row if current is None else {field: current[field] + row[field] for field in row}
+
+
+def rebuild_impact():
+    """
+    Recompute every cached ImpactStat from the live and archived items using
+    grouped aggregate queries (one per scope and table).
+
+    The cached rows are locked before the items are read, so a collection
+    committed meanwhile waits and then adds its increment to the rebuilt
+    totals; only rows whose totals differ are written.
+    """
+    with transaction.atomic():
+        current = {stat.key: stat for stat in ImpactStat.objects.select_for_update()}
+        stats = _compute_impact_stats()
+        fields = ('items_collected', 'units_collected') + IMPACT_FIELDS
+        changed, missing = [], []
+        for stat in stats:
+            cached = current.pop(stat.key, None)
+            if cached is None:
+                missing.append(stat)
+            elif any(getattr(cached, field) != getattr(stat, field) for field in fields):
+                stat.pk = cached.pk
+                changed.append(stat)
+        ImpactStat.objects.bulk_update(changed, fields, batch_size=500)
+        ImpactStat.objects.bulk_create(missing, batch_size=500, ignore_conflicts=True)
+        # Scopes with nothing collected any more are recomputed on next access
+        ImpactStat.objects.filter(pk__in=[stat.pk for stat in current.values()]).delete()
+    return len(stats)
+
+
+def _compute_impact_stats():
+    aggregates = impact_aggregates()
+    users, companies, platform = {}, {}, {}
+    sources = (
+        (_collected_items(), 'pickup_request__assigned_to__profile__company'),
+        (_archived_collected_items(), 'impact_company'),
+    )
+    for items, company_field in sources:
+        for row in items.values('user').annotate(**aggregates).order_by():
+            _add_totals(users, row.pop('user'), row)
+        company_rows = (
+            items.filter(**{f'{company_field}__isnull': False})
+            .values(company_field).annotate(**aggregates).order_by()
+        )
+        for row in company_rows:
+            _add_totals(companies, row.pop(company_field), row)
+        _add_totals(platform, ImpactStat.SCOPE_PLATFORM, compute_impact(items))
+
+    stats = [
+        ImpactStat(key=f'{ImpactStat.SCOPE_USER}:{user_id}', scope=ImpactStat.SCOPE_USER, user_id=user_id, **row)
+        for user_id, row in users.items()
+    ]
+    stats += [
+        ImpactStat(key=f'{ImpactStat.SCOPE_COMPANY}:{company_id}', scope=ImpactStat.SCOPE_COMPANY,
+                   company_id=company_id, **row)
+        for company_id, row in companies.items()
+    ]
+    stats.append(ImpactStat(
+        key=ImpactStat.SCOPE_PLATFORM, scope=ImpactStat.SCOPE_PLATFORM, **platform[ImpactStat.SCOPE_PLATFORM],
+    ))
+    return stats
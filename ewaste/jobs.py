@@ -0,0 +1,186 @@
+"""
+Database-backed job queue.
+
+Work that does not have to happen inside a request (emails, pruning, stats
+reconciliation, escalations) is queued as a Job row and executed by the
+`run_jobs` management command. Workers claim a job with an atomic conditional
+UPDATE, so several workers can share the table without a broker. Periodic jobs
+are declared with @register_job(..., every=seconds) and their next due time is
+kept in JobSchedule, claimed the same way so each run is queued exactly once.
+"""
+import logging
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Job, JobSchedule
+
+
+logger = logging.getLogger(__name__)
+
+# Jobs left running longer than this are assumed to belong to a dead worker
+STALE_LOCK_SECONDS = getattr(settings, 'JOBS_STALE_LOCK_SECONDS', 15 * 60)
+RETRY_BASE_SECONDS = getattr(settings, 'JOBS_RETRY_BASE_SECONDS', 30)
+
+_registry = {}
+_schedules = {}
+
+
+def register_job(name, every=None):
+    """
+    Register a function as a job handler, optionally run every `every` seconds
+    """
+    def decorator(func):
+        _registry[name] = func
+        if every:
+            _schedules[name] = every
+        return func
+    return decorator
+
+
+def registered_jobs():
+    return dict(_registry)
+
+
+def registered_schedules():
+    return dict(_schedules)
+
+
+def enqueue(name, payload=None, run_at=None, max_attempts=3):
+    """
+    Queue a job once the current transaction commits.
+
+    With settings.JOBS_ASYNC = False the job runs immediately instead, which
+    keeps development and tests working without a worker. A job that fails
+    there never fails the request: it is logged and queued for `run_jobs` to
+    retry.
+    """
+    if name not in _registry:
+        raise KeyError(f"Unknown job: {name}")
+    payload = payload or {}
+
+    if not getattr(settings, 'JOBS_ASYNC', True):
+        transaction.on_commit(lambda: _run_inline(name, payload, max_attempts))
+        return None
+
+    job = Job(name=name, payload=payload, run_at=run_at or timezone.now(), max_attempts=max_attempts)
+    transaction.on_commit(job.save)
+    return job
+
+
+def _run_inline(name, payload, max_attempts):
+    try:
+        _registry[name](**payload)
+    except Exception:
+        logger.warning("Inline job %s failed; queued for retry", name, exc_info=True)
+        now = timezone.now()
+        Job.objects.create(
+            name=name, payload=payload, run_at=now + timedelta(seconds=RETRY_BASE_SECONDS),
+            attempts=1, max_attempts=max_attempts, last_error=traceback.format_exc(),
+        )
+
+
+def claim_jobs(worker_id, limit=1):
+    """
+    Claim up to `limit` due jobs for `worker_id`.
+
+    Candidates are read without locks; each is then claimed with
+    UPDATE ... WHERE status = 'queued', so a job another worker got first
+    simply updates zero rows and is skipped.
+    """
+    now = timezone.now()
+    candidate_ids = list(
+        Job.objects.filter(status=Job.STATUS_QUEUED, run_at__lte=now)
+        .order_by('run_at').values_list('id', flat=True)[:limit * 4]
+    )
+    claimed = []
+    for job_id in candidate_ids:
+        updated = Job.objects.filter(id=job_id, status=Job.STATUS_QUEUED).update(
+            status=Job.STATUS_RUNNING, locked_by=worker_id, locked_at=now,
+            attempts=F('attempts') + 1, updated_at=now,
+        )
+        if updated:
+            claimed.append(job_id)
+            if len(claimed) == limit:
+                break
+    return list(Job.objects.filter(id__in=claimed))
+
+
+def run_job(job):
+    """Execute a claimed job and record the outcome"""
+    handler = _registry.get(job.name)
+    now = timezone.now()
+    try:
+        if handler is None:
+            raise KeyError(f"No handler registered for job {job.name!r}")
+        handler(**job.payload)
+    except Exception:
+        error = traceback.format_exc()
+        logger.warning("Job %s #%s failed (attempt %s)", job.name, job.pk, job.attempts)
+        if job.attempts < job.max_attempts:
+            retry_at = now + timedelta(seconds=RETRY_BASE_SECONDS * 2 ** (job.attempts - 1))
+            Job.objects.filter(id=job.id).update(
+                status=Job.STATUS_QUEUED, run_at=retry_at, locked_by='', locked_at=None,
+                last_error=error, updated_at=now,
+            )
+        else:
+            Job.objects.filter(id=job.id).update(
+                status=Job.STATUS_FAILED, locked_by='', locked_at=None,
+                last_error=error, finished_at=now, updated_at=now,
+            )
+        return False
+
+    Job.objects.filter(id=job.id).update(
+        status=Job.STATUS_SUCCEEDED, locked_by='', locked_at=None,
+        finished_at=timezone.now(), updated_at=timezone.now(),
+    )
+    return True
+
+
+def sync_schedules():
+    """Create JobSchedule rows for newly registered periodic jobs"""
+    existing = set(JobSchedule.objects.values_list('name', flat=True))
+    JobSchedule.objects.bulk_create([
+        JobSchedule(name=name, interval_seconds=every)
+        for name, every in _schedules.items() if name not in existing
+    ])
+    for name, every in _schedules.items():
+        JobSchedule.objects.filter(name=name).exclude(interval_seconds=every).update(interval_seconds=every)
+
+
+def enqueue_due_schedules():
+    """
+    Queue one run of every periodic job that is due; returns the names queued
+    """
+    now = timezone.now()
+    queued = []
+    due = JobSchedule.objects.filter(enabled=True, next_run_at__lte=now, name__in=list(_schedules))
+    for schedule in due:
+        next_run = now + timedelta(seconds=schedule.interval_seconds)
+        claimed = JobSchedule.objects.filter(
+            id=schedule.id, next_run_at=schedule.next_run_at
+        ).update(next_run_at=next_run, last_run_at=now)
+        if claimed:
+            Job.objects.create(name=schedule.name, run_at=now)
+            queued.append(schedule.name)
+    return queued
+
+
+def requeue_stale_jobs():
+    """Put jobs locked by a worker that died back in the queue"""
+    cutoff = timezone.now() - timedelta(seconds=STALE_LOCK_SECONDS)
+    return Job.objects.filter(status=Job.STATUS_RUNNING, locked_at__lt=cutoff).update(
+        status=Job.STATUS_QUEUED, locked_by='', locked_at=None, updated_at=timezone.now(),
+    )
+
+
+def prune_finished_jobs(days=14):
+    cutoff = timezone.now() - timedelta(days=days)
+    deleted, _ = Job.objects.filter(
+        status__in=[Job.STATUS_SUCCEEDED, Job.STATUS_FAILED], finished_at__lt=cutoff
+    ).delete()
+    return deleted
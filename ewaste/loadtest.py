@@ -0,0 +1,385 @@
+"""
+Mixed-traffic load generator (see `manage.py loadtest`).
+
+Virtual users replay journeys against a running server over plain HTTP, each
+with its own cookie jar, CSRF token and no redirect following, so every
+request is timed on its own:
+
+- anonymous: home, facilities, how it works, the facilities API
+- customer: signup, login, report an item, my items, dashboard, logout
+- company: login, manage pickups and accept a pending one, company dashboard
+- staff: login, admin dashboard, manage pickups, users, search
+
+Company and staff journeys log in with the accounts made by
+create_accounts(), whose company serves the postal code the customer
+journeys report from. Reports spread their dates over the booking window,
+and the load test settings raise the daily slot capacity, so a long run
+does not fill the days up. A form post passes only when it redirects; a 200 means
+the form was re-rendered with errors. The database counters are read through
+the staff-only metrics API as the first staff account. Requests are grouped by URL name; each group records its
+latencies, status codes and errors. A run is either closed (a fixed number of
+users looping journeys back to back) or open (journeys start at a Poisson
+arrival rate, and at most `concurrency` run at once).
+
+Run the server on the same database as the command with the load test
+settings (no throttling, cheap password hashing so signups and logins measure
+the app rather than PBKDF2, more pickups per day, database counters on):
+
+    DJANGO_SETTINGS_MODULE=ewaste_project.settings_loadtest \
+        python manage.py runserver --noreload
+
+Keep the job worker running, or with JOBS_ASYNC=False pick an email backend
+that needs no server (DJANGO_EMAIL_BACKEND=...locmem.EmailBackend): inline
+sends that fail are queued for retry, which adds writes to the measurement.
+"""
+import http.cookiejar
+import json
+import math
+import random
+import re
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.exceptions import ImproperlyConfigured
+from django.urls import reverse
+from django.utils import timezone
+
+from . import slots
+from .models import Company, UserProfile
+
+
+JOURNEYS = ('anonymous', 'customer', 'company', 'staff')
+DEFAULT_MIX = {'anonymous': 50, 'customer': 30, 'company': 15, 'staff': 5}
+ACCOUNT_PREFIX = 'loadtest'
+DEFAULT_PASSWORD = 'loadtest-password'
+# Postal code of the customer journeys' pickup address, served by the load test company
+SERVICE_REGION = '560001'
+
+_CATEGORY_OPTION = re.compile(r'<option value="(\d+)"')
+_ACCEPT_BUTTON = re.compile(r'value="accept:(\d+)"')
+
+
+def parse_mix(text):
+    """'anonymous=50,customer=30' -> {'anonymous': 50, 'customer': 30}"""
+    mix = {}
+    for part in filter(None, (p.strip() for p in text.split(','))):
+        name, _, weight = part.partition('=')
+        if name not in JOURNEYS or not weight.isdigit():
+            raise ValueError(f"Invalid journey weight: {part!r}")
+        mix[name] = int(weight)
+    if not any(mix.values()):
+        raise ValueError("The journey mix needs at least one positive weight.")
+    return mix
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an ascending list"""
+    if not sorted_values:
+        return 0.0
+    index = max(0, math.ceil(fraction * len(sorted_values)) - 1)
+    return sorted_values[min(index, len(sorted_values) - 1)]
+
+
+def create_accounts(count, password):
+    """
+    Make `count` company members and `count` staff users for the journeys
+    (idempotent). The well-known default password is only accepted with
+    DEBUG on, so these staff accounts cannot be opened on a real deployment.
+    """
+    if password == DEFAULT_PASSWORD and not settings.DEBUG:
+        raise ImproperlyConfigured("Load test accounts need DEBUG on or an explicit password.")
+    company, _ = Company.objects.get_or_create(
+        name=f'{ACCOUNT_PREFIX} company', defaults={'contact_email': f'{ACCOUNT_PREFIX}@example.com'},
+    )
+    if SERVICE_REGION not in company.region_list():
+        company.service_regions = SERVICE_REGION
+        company.save()
+    for i in range(count):
+        for role in ('company', 'staff'):
+            username = f'{ACCOUNT_PREFIX}-{role}-{i}'
+            user = User.objects.filter(username=username).first()
+            if user is None:
+                user = User.objects.create_user(username, f'{username}@example.com', password, is_staff=role == 'staff')
+            if role == 'company':
+                profile, _ = UserProfile.objects.get_or_create(user=user)
+                if not profile.is_company or profile.company_id != company.id:
+                    profile.is_company, profile.company = True, company
+                    profile.save()
+
+
+def existing_accounts():
+    """([company member usernames], [staff usernames]) made by create_accounts()"""
+    accounts = User.objects.filter(username__startswith=f'{ACCOUNT_PREFIX}-').order_by('username')
+    members = accounts.filter(username__startswith=f'{ACCOUNT_PREFIX}-company-', profile__is_company=True)
+    staff = accounts.filter(username__startswith=f'{ACCOUNT_PREFIX}-staff-', is_staff=True)
+    return list(members.values_list('username', flat=True)), list(staff.values_list('username', flat=True))
+
+
+class Stats:
+    """Latencies, status codes and errors per route, shared by all workers"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.routes = {}
+        self.journeys = Counter()
+
+    def record(self, route, seconds, status=None, error=None):
+        with self._lock:
+            entry = self.routes.setdefault(route, {'latencies': [], 'statuses': Counter(), 'errors': 0})
+            entry['latencies'].append(seconds)
+            entry['statuses'][status or error] += 1
+            if error or status is None or status >= 500:
+                entry['errors'] += 1
+
+    def journey_done(self, name, ok):
+        with self._lock:
+            self.journeys[(name, ok)] += 1
+
+    def summary(self, elapsed):
+        """Per-route rows and an overall row, latencies in milliseconds"""
+        rows = []
+        everything = []
+        total_errors = 0
+        with self._lock:
+            routes = {route: dict(entry, latencies=sorted(entry['latencies'])) for route, entry in self.routes.items()}
+        for route in sorted(routes):
+            entry = routes[route]
+            rows.append(self._row(route, entry['latencies'], entry['errors'], entry['statuses'], elapsed))
+            everything += entry['latencies']
+            total_errors += entry['errors']
+        overall = self._row('TOTAL', sorted(everything), total_errors, Counter(), elapsed)
+        return rows, overall
+
+    @staticmethod
+    def _row(route, latencies, errors, statuses, elapsed):
+        count = len(latencies)
+        return {
+            'route': route,
+            'requests': count,
+            'rps': count / elapsed if elapsed else 0.0,
+            'errors': errors,
+            'error_rate': errors / count if count else 0.0,
+            'throttled': statuses.get(429, 0),
+            'p50': percentile(latencies, 0.50) * 1000,
+            'p90': percentile(latencies, 0.90) * 1000,
+            'p99': percentile(latencies, 0.99) * 1000,
+            'max': (latencies[-1] if latencies else 0.0) * 1000,
+            'statuses': {str(status): n for status, n in sorted(statuses.items(), key=str)},
+        }
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+class JourneyFailed(Exception):
+    pass
+
+
+class VirtualUser:
+    """One browser: cookies, CSRF token and timed requests against base_url"""
+
+    def __init__(self, base_url, stats, timeout):
+        self.base_url = base_url.rstrip('/')
+        self.stats = stats
+        self.timeout = timeout
+        self.cookies = http.cookiejar.CookieJar()
+        self.opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(self.cookies), _NoRedirect)
+
+    def _csrf_token(self):
+        return next((cookie.value for cookie in self.cookies if cookie.name == 'csrftoken'), '')
+
+    def request(self, route, path, data=None, expect=(200, 302)):
+        """Timed GET (or POST of `data`); returns (status, body)"""
+        url = self.base_url + path
+        headers = {'User-Agent': 'ewaste-loadtest'}
+        body = None
+        if data is not None:
+            data = dict(data, csrfmiddlewaretoken=self._csrf_token())
+            body = urllib.parse.urlencode(data, doseq=True).encode()
+            headers['Referer'] = url
+        req = urllib.request.Request(url, data=body, headers=headers)
+        start = time.perf_counter()
+        try:
+            with self.opener.open(req, timeout=self.timeout) as response:
+                status, content = response.status, response.read()
+        except urllib.error.HTTPError as exc:
+            status, content = exc.code, exc.read()
+        except OSError as exc:
+            self.stats.record(route, time.perf_counter() - start, error=type(exc).__name__)
+            raise JourneyFailed(f"{route}: {exc}")
+        self.stats.record(route, time.perf_counter() - start, status=status)
+        if status not in expect:
+            raise JourneyFailed(f"{route}: HTTP {status}")
+        return status, content.decode('utf-8', 'replace')
+
+    def get(self, name, expect=(200, 302)):
+        return self.request(name, reverse(name), expect=expect)
+
+    def post(self, name, data, expect=(302,)):
+        # A form that comes back with 200 was rejected and re-rendered
+        return self.request(name, reverse(name), data=data, expect=expect)
+
+    def login(self, username, password, login_as):
+        self.get('login')
+        self.post('login', {'username': username, 'password': password, 'login_as': login_as})
+
+
+class Runner:
+    """Runs journeys against `base_url` and collects Stats"""
+
+    def __init__(self, base_url, mix=None, password='', members=(), staff=(), timeout=30, seed=None):
+        self.base_url = base_url
+        self.mix = mix or DEFAULT_MIX
+        self.password = password
+        self.accounts = {'company': list(members), 'staff': list(staff)}
+        self.timeout = timeout
+        self.random = random.Random(seed)
+        self._random_lock = threading.Lock()
+        self._sequence = iter(range(1, 1 << 62))
+        self.stats = Stats()
+
+    def _choice(self):
+        names = [name for name in JOURNEYS if self.mix.get(name)]
+        with self._random_lock:
+            return self.random.choices(names, weights=[self.mix[name] for name in names])[0]
+
+    def _account(self, role):
+        if not self.accounts[role]:
+            raise JourneyFailed(f"no {role} accounts; run with --create-accounts")
+        with self._random_lock:
+            return self.random.choice(self.accounts[role])
+
+    def anonymous(self, user):
+        user.get('home')
+        user.get('facilities')
+        user.get('how_it_works')
+        user.request('api_facilities', reverse('api_facilities') + '?limit=50')
+
+    def customer(self, user):
+        username = f'{ACCOUNT_PREFIX}-customer-{next(self._sequence)}-{time.time_ns() % 10 ** 9}'
+        user.get('signup')
+        user.post('signup', {
+            'username': username, 'email': f'{username}@example.com', 'first_name': 'Load', 'last_name': 'Test',
+            'password': self.password, 'confirm_password': self.password,
+        })
+        user.login(username, self.password, 'customer')
+        _, page = user.get('report_ewaste')
+        category = next(iter(_CATEGORY_OPTION.findall(page)), '')
+        with self._random_lock:
+            day = timezone.localdate() + timedelta(days=self.random.randrange(1, slots.BOOKING_DAYS))
+            quantity = self.random.randint(1, 5)
+        user.post('report_ewaste', {
+            'category': category, 'item_name': 'Old laptop', 'description': 'Load test item',
+            'condition': 'broken', 'quantity': quantity, 'pickup_location': f'1 Test Street {SERVICE_REGION}',
+            'preferred_date': day.isoformat(), 'contact_phone': '9999999999',
+        })
+        user.get('my_items')
+        user.get('dashboard')
+        user.get('logout')
+
+    def company(self, user):
+        user.login(self._account('company'), self.password, 'company')
+        _, page = user.get('manage_pickups')
+        pending = _ACCEPT_BUTTON.findall(page)
+        if pending:
+            with self._random_lock:
+                pickup_id = self.random.choice(pending)
+            user.post('manage_pickups', {'action': f'accept:{pickup_id}'})
+        user.get('company_dashboard')
+        user.get('logout')
+
+    def staff(self, user):
+        user.login(self._account('staff'), self.password, 'customer')
+        user.get('admin_dashboard')
+        user.get('manage_pickups')
+        user.get('user_list')
+        user.request('search', reverse('search') + '?q=laptop')
+        user.get('logout')
+
+    def run_journey(self, name=None):
+        name = name or self._choice()
+        user = VirtualUser(self.base_url, self.stats, self.timeout)
+        try:
+            getattr(self, name)(user)
+        except JourneyFailed:
+            self.stats.journey_done(name, False)
+        else:
+            self.stats.journey_done(name, True)
+
+    def closed(self, concurrency, duration):
+        """`concurrency` users replay journeys back to back for `duration` seconds"""
+        deadline = time.monotonic() + duration
+
+        def loop():
+            while time.monotonic() < deadline:
+                self.run_journey()
+
+        start = time.monotonic()
+        threads = [threading.Thread(target=loop, daemon=True) for _ in range(concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return time.monotonic() - start
+
+    def open(self, rate, concurrency, duration):
+        """
+        Start journeys at `rate` per second (Poisson arrivals) for `duration`
+        seconds, at most `concurrency` at once; arrivals queue behind them
+        """
+        start = time.monotonic()
+        deadline = start + duration
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            next_arrival = start
+            while True:
+                with self._random_lock:
+                    next_arrival += self.random.expovariate(rate)
+                if next_arrival >= deadline:
+                    break
+                time.sleep(max(0.0, next_arrival - time.monotonic()))
+                pool.submit(self.run_journey)
+        return time.monotonic() - start
+
+
+def metrics_user(base_url, staff, password, timeout=10):
+    """A VirtualUser logged in as the first staff account, or None without one"""
+    if not staff:
+        return None
+    user = VirtualUser(base_url, Stats(), timeout)
+    try:
+        user.login(staff[0], password, 'customer')
+    except JourneyFailed:
+        return None
+    return user
+
+
+def fetch_db_metrics(user):
+    """Server database counters read by a metrics_user(), or None when unavailable"""
+    if user is None:
+        return None
+    try:
+        _, content = user.request('api_db_metrics', reverse('api_db_metrics'), expect=(200,))
+        return json.loads(content)
+    except (JourneyFailed, ValueError):
+        return None
+
+
+def diff_db_metrics(before, after):
+    """Counter deltas between two snapshots of the same server process"""
+    if not before or not after:
+        return None
+    delta = {'pid': after.get('pid'), 'same_process': before.get('pid') == after.get('pid')}
+    for key, value in after.items():
+        if isinstance(value, (int, float)) and key != 'pid':
+            delta[key] = round(value - before.get(key, 0), 6) if key != 'waiting_locks' else value
+    return delta
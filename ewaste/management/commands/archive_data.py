@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from ewaste import archive
+
+
+class Command(BaseCommand):
+    help = "Move closed pickups and their items, read notifications and old feedback into the archive tables"
+
+    def add_arguments(self, parser):
+        defaults = archive.ARCHIVE_AFTER_DAYS
+        parser.add_argument('--pickup-days', type=int, default=defaults['pickups'],
+                            help=f"Archive pickups closed for this many days (default {defaults['pickups']})")
+        parser.add_argument('--notification-days', type=int, default=defaults['notifications'],
+                            help=f"Archive read notifications older than this (default {defaults['notifications']})")
+        parser.add_argument('--feedback-days', type=int, default=defaults['feedback'],
+                            help=f"Archive feedback older than this (default {defaults['feedback']})")
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help="Rows moved per transaction (default 500)")
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        items = archive.archive_pickups(options['pickup_days'], batch_size=batch_size)
+        notifications = archive.archive_notifications(options['notification_days'], batch_size=batch_size)
+        feedback = archive.archive_feedback(options['feedback_days'], batch_size=batch_size)
+        self.stdout.write(self.style.SUCCESS(
+            f"Archived {items} items, {notifications} notifications and {feedback} feedback entries"
+        ))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from ewaste import services
+
+
+class Command(BaseCommand):
+    help = "Create missing user profiles in bulk"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        created = services.backfill_profiles(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Created {created} profiles"))
@@ -0,0 +1,99 @@
+import time
+from datetime import date, timedelta
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.template.loader import get_template
+from django.test import RequestFactory
+from django.utils import timezone
+from django.utils.safestring import mark_safe
+
+from ewaste.models import EWasteItem, PickupRequest
+from ewaste.streaming import ROWS_MARKER, STREAM_CHUNK_ROWS
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure render time of the list templates with in-memory rows. Streamed "
+        "pages are rendered like stream_list: the page around its rows marker, "
+        "then the row partial chunk by chunk. "
+        "Development only: clears the default cache between runs."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, nargs='+', default=[1000, 10000])
+        parser.add_argument('--repeat', type=int, default=3)
+
+    def _build_rows(self, count):
+        now = timezone.now()
+        statuses = [choice[0] for choice in PickupRequest.STATUS_CHOICES]
+        owner = User(id=1, username='bench', first_name='Bench', last_name='User')
+        items, pickups = [], []
+        for i in range(1, count + 1):
+            item = EWasteItem(
+                id=i, user=owner, category_id=None, item_name=f'Item {i}',
+                description='Benchmark item', condition='broken', quantity=1,
+                pickup_location='1 Test Street', preferred_date=date.today(),
+                contact_phone='0000000000', created_at=now, updated_at=now,
+            )
+            pickup = PickupRequest(
+                id=i, ewaste_item=item, status=statuses[i % len(statuses)],
+                scheduled_date=now + timedelta(days=1), created_at=now, updated_at=now,
+            )
+            item.pickup_request = pickup
+            items.append(item)
+            pickups.append(pickup)
+        return owner, items, pickups
+
+    def _page(self, template_name, context):
+        template = get_template(template_name)
+        return lambda request: template.render(context, request)
+
+    def _streamed_page(self, template_name, row_template_name, context, rows):
+        """Render like streaming.stream_list, with all rows on one page"""
+        template = get_template(template_name)
+        row_template = get_template(row_template_name)
+        context = dict(context, stream_rows=mark_safe(ROWS_MARKER), has_rows=bool(rows))
+
+        def render(request):
+            head, _, tail = template.render(context, request).partition(ROWS_MARKER)
+            parts = [head]
+            for start in range(0, len(rows), STREAM_CHUNK_ROWS):
+                parts.append(row_template.render({'rows': rows[start:start + STREAM_CHUNK_ROWS]}, request))
+            parts.append(tail)
+            return ''.join(parts)
+        return render
+
+    def _time_render(self, render, request, repeat):
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            render(request)
+            timings.append(time.perf_counter() - start)
+        return min(timings)
+
+    def handle(self, *args, **options):
+        factory = RequestFactory()
+        for count in options['rows']:
+            owner, items, pickups = self._build_rows(count)
+            request = factory.get('/')
+            request.user = User(id=2, username='staff', is_staff=True)
+            cases = [
+                ('manage_pickups.html', self._page('manage_pickups.html', {'pickups': pickups})),
+                ('my_items.html', self._streamed_page('my_items.html', 'partials/item_cards.html', {}, items)),
+                ('dashboard.html', self._page(
+                    'dashboard.html', {'user_items': items, 'pending_pickups': 0, 'impact': None},
+                )),
+            ]
+            for name, render in cases:
+                cache.clear()
+                start = time.perf_counter()
+                render(request)
+                cold = time.perf_counter() - start
+                warm = self._time_render(render, request, options['repeat'])
+                self.stdout.write(
+                    f"{name:<22} rows={count:<6} cold={cold * 1000:8.1f} ms  "
+                    f"warm={warm * 1000:8.1f} ms  per-row={warm / count * 1e6:6.1f} us"
+                )
+        cache.clear()
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from ewaste import sla
+
+
+class Command(BaseCommand):
+    help = "Escalate overdue pickups and print the per-assignee backlog"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true',
+                            help="Only report, do not escalate")
+
+    def handle(self, *args, **options):
+        if not options['dry_run']:
+            escalated = sla.escalate_overdue()
+            self.stdout.write(self.style.SUCCESS(f"Escalated {escalated} overdue pickups"))
+
+        self.stdout.write(f"Overdue now: {sla.overdue_pickups().count()}")
+        for row in sla.assignee_backlog():
+            name = row['assigned_to__username'] or 'Unassigned'
+            self.stdout.write(
+                f"- {name}: {row['open_count']} open, {row['overdue_count']} overdue, "
+                f"oldest due {row['oldest_due']}"
+            )
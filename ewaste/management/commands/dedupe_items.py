@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from ewaste.dedup import deduplicate_backlog
+
+
+class Command(BaseCommand):
+    help = "Flag duplicate e-waste reports in the open backlog"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--merge', action='store_true',
+                            help="Also cancel the pending pickups of duplicates")
+        parser.add_argument('--dry-run', action='store_true',
+                            help="Only list duplicates, do not change anything")
+
+    def handle(self, *args, **options):
+        pairs = deduplicate_backlog(merge=options['merge'], dry_run=options['dry_run'])
+        for duplicate_id, original_id in pairs:
+            self.stdout.write(f"Item #{duplicate_id} duplicates item #{original_id}")
+        verb = "Found" if options['dry_run'] else "Flagged"
+        self.stdout.write(self.style.SUCCESS(f"{verb} {len(pairs)} duplicate reports"))
@@ -0,0 +1,119 @@
+import json
+
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management.base import BaseCommand, CommandError
+
+from ewaste import loadtest
+
+
+class Command(BaseCommand):
+    help = (
+        "Replay mixed user journeys against a running server and report throughput, "
+        "errors and latency percentiles per route (server setup: see ewaste/loadtest.py). "
+        "Give several --concurrency values to step up the load and find the saturation point."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000')
+        parser.add_argument('--concurrency', type=int, nargs='+', default=[4],
+                            help='Virtual users per stage (closed mode) or the cap on concurrent journeys (open mode).')
+        parser.add_argument('--rate', type=float, default=None,
+                            help='Journeys started per second; runs an open workload instead of a closed one.')
+        parser.add_argument('--duration', type=float, default=30, help='Seconds per stage.')
+        parser.add_argument('--mix', default='anonymous=50,customer=30,company=15,staff=5')
+        parser.add_argument('--create-accounts', type=int, default=0, metavar='N',
+                            help='Create N company members and N staff users for the journeys first.')
+        parser.add_argument('--password', default=loadtest.DEFAULT_PASSWORD,
+                            help='Password of the load test accounts; required for --create-accounts with DEBUG off.')
+        parser.add_argument('--timeout', type=float, default=30)
+        parser.add_argument('--seed', type=int, default=None)
+        parser.add_argument('--json', action='store_true', help='Print the results as JSON.')
+
+    def handle(self, *args, **options):
+        try:
+            mix = loadtest.parse_mix(options['mix'])
+        except ValueError as exc:
+            raise CommandError(exc)
+        if options['rate'] is not None and options['rate'] <= 0:
+            raise CommandError("--rate must be positive.")
+        if min(options['concurrency']) < 1:
+            raise CommandError("--concurrency must be at least 1.")
+
+        if options['create_accounts']:
+            try:
+                loadtest.create_accounts(options['create_accounts'], options['password'])
+            except ImproperlyConfigured as exc:
+                raise CommandError(exc)
+        members, staff = loadtest.existing_accounts()
+        url = options['url']
+        metrics_user = loadtest.metrics_user(url, staff, options['password'], timeout=options['timeout'])
+        if loadtest.fetch_db_metrics(metrics_user) is None and not options['json']:
+            self.stderr.write(
+                "Database metrics unavailable; they need a staff account (--create-accounts) "
+                "and a server started with DB_METRICS=True (as ewaste_project.settings_loadtest does)."
+            )
+
+        results = []
+        for concurrency in options['concurrency']:
+            runner = loadtest.Runner(
+                url, mix=mix, password=options['password'], members=members, staff=staff,
+                timeout=options['timeout'], seed=options['seed'],
+            )
+            before = loadtest.fetch_db_metrics(metrics_user)
+            if options['rate'] is None:
+                elapsed = runner.closed(concurrency, options['duration'])
+            else:
+                elapsed = runner.open(options['rate'], concurrency, options['duration'])
+            after = loadtest.fetch_db_metrics(metrics_user)
+            rows, overall = runner.stats.summary(elapsed)
+            result = {
+                'concurrency': concurrency,
+                'rate': options['rate'],
+                'elapsed': round(elapsed, 3),
+                'journeys': {
+                    name: {'ok': runner.stats.journeys[(name, True)], 'failed': runner.stats.journeys[(name, False)]}
+                    for name in loadtest.JOURNEYS if mix.get(name)
+                },
+                'routes': rows,
+                'total': overall,
+                'db': loadtest.diff_db_metrics(before, after),
+            }
+            results.append(result)
+            if not options['json']:
+                self._report(result)
+
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+        elif len(results) > 1:
+            self.stdout.write("\nStages:")
+            for result in results:
+                total = result['total']
+                self.stdout.write(
+                    f"  concurrency={result['concurrency']:<4} rps={total['rps']:8.1f}  "
+                    f"errors={total['error_rate']:6.1%}  p50={total['p50']:8.1f} ms  p99={total['p99']:8.1f} ms"
+                )
+
+    def _report(self, result):
+        mode = f"rate={result['rate']}/s cap={result['concurrency']}" if result['rate'] else f"concurrency={result['concurrency']}"
+        self.stdout.write(f"\n{mode}, {result['elapsed']:.1f} s")
+        journeys = ', '.join(f"{name} {counts['ok']} ok/{counts['failed']} failed" for name, counts in result['journeys'].items())
+        self.stdout.write(f"journeys: {journeys}")
+        self.stdout.write(
+            f"{'route':<22} {'requests':>8} {'rps':>8} {'errors':>7} {'429':>5} "
+            f"{'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8} {'max ms':>8}"
+        )
+        for row in result['routes'] + [result['total']]:
+            self.stdout.write(
+                f"{row['route']:<22} {row['requests']:>8} {row['rps']:>8.1f} {row['error_rate']:>7.1%} "
+                f"{row['throttled']:>5} {row['p50']:>8.1f} {row['p90']:>8.1f} {row['p99']:>8.1f} {row['max']:>8.1f}"
+            )
+        db = result['db']
+        if db:
+            note = '' if db['same_process'] else ' (server process changed; counters are not comparable)'
+            self.stdout.write(
+                f"db: {db.get('queries', 0)} queries ({db.get('writes', 0)} writes), "
+                f"{db.get('query_seconds', 0):.2f} s in queries, {db.get('lock_errors', 0)} lock errors "
+                f"({db.get('lock_error_seconds', 0):.2f} s){note}"
+            )
+            if 'deadlocks' in db:
+                self.stdout.write(f"    {db['deadlocks']} deadlocks, {db['waiting_locks']} lock waits at the end")
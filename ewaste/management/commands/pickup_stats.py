@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from ewaste import audit
+
+
+class Command(BaseCommand):
+    help = "Print time-in-status percentiles from the pickup audit trail, optionally compacting old events"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--compact', action='store_true',
+                            help="Roll up and delete old events of closed pickups first")
+        parser.add_argument('--days', type=int, default=180,
+                            help="Age in days after which events are compacted (default 180)")
+
+    def handle(self, *args, **options):
+        if options['compact']:
+            removed = audit.compact_events(older_than_days=options['days'])
+            self.stdout.write(self.style.SUCCESS(f"Compacted {removed} events"))
+
+        for row in audit.time_in_state_percentiles():
+            hours = {k: (row[k] or 0) / 3600 for k in ('avg_seconds', 'p50', 'p90', 'p99')}
+            self.stdout.write(
+                f"- {row['status']}: {row['stays']} stays, avg {hours['avg_seconds']:.1f}h, "
+                f"p50 {hours['p50']:.1f}h, p90 {hours['p90']:.1f}h, p99 {hours['p99']:.1f}h"
+            )
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from ewaste.heatmap import rebuild
+
+
+class Command(BaseCommand):
+    help = "Recompute the geographic heatmap cells from reported items"
+
+    def handle(self, *args, **options):
+        count = rebuild()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {count} heatmap cells"))
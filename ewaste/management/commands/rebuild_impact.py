@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from ewaste.impact import rebuild_impact
+
+
+class Command(BaseCommand):
+    help = "Recompute cached environmental impact totals from collected items"
+
+    def handle(self, *args, **options):
+        count = rebuild_impact()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {count} impact totals"))
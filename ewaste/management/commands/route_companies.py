@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from ewaste import tenancy
+
+
+class Command(BaseCommand):
+    help = "Route unassigned items and pickups to companies by service region and rebuild company counters"
+
+    def handle(self, *args, **options):
+        routed = tenancy.route_backlog()
+        self.stdout.write(self.style.SUCCESS(f"Routed {routed} items"))
+        rebuilt = tenancy.rebuild_counters()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {rebuilt} company counters"))
@@ -0,0 +1,79 @@
+import os
+import signal
+import socket
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connection
+
+from ewaste import jobs
+
+
+class Command(BaseCommand):
+    help = "Run the background job worker (queued jobs and periodic schedules)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=2,
+                            help="Number of threads executing jobs")
+        parser.add_argument('--poll', type=float, default=2.0,
+                            help="Seconds to sleep when the queue is empty")
+        parser.add_argument('--once', action='store_true',
+                            help="Run due schedules and queued jobs once, then exit")
+
+    def handle(self, *args, **options):
+        self.stop = threading.Event()
+        worker_base = f"{socket.gethostname()}:{os.getpid()}"
+        jobs.sync_schedules()
+
+        if options['once']:
+            jobs.requeue_stale_jobs()
+            jobs.enqueue_due_schedules()
+            ran = 0
+            while True:
+                claimed = jobs.claim_jobs(worker_base, limit=10)
+                if not claimed:
+                    break
+                for job in claimed:
+                    jobs.run_job(job)
+                    ran += 1
+            self.stdout.write(self.style.SUCCESS(f"Ran {ran} jobs"))
+            return
+
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(sig, lambda *_: self.stop.set())
+
+        threads = [
+            threading.Thread(target=self._work, args=(f"{worker_base}:{i}", options['poll']), daemon=True)
+            for i in range(options['threads'])
+        ]
+        for thread in threads:
+            thread.start()
+        self.stdout.write(f"Job worker {worker_base} started with {len(threads)} threads")
+
+        # The main thread queues periodic jobs and recovers stale locks
+        while not self.stop.is_set():
+            close_old_connections()
+            jobs.requeue_stale_jobs()
+            for name in jobs.enqueue_due_schedules():
+                self.stdout.write(f"Queued periodic job {name}")
+            self.stop.wait(options['poll'] * 5)
+
+        for thread in threads:
+            thread.join()
+        connection.close()
+        self.stdout.write("Job worker stopped")
+
+    def _work(self, worker_id, poll):
+        try:
+            while not self.stop.is_set():
+                close_old_connections()
+                claimed = jobs.claim_jobs(worker_id)
+                if not claimed:
+                    self.stop.wait(poll)
+                    continue
+                for job in claimed:
+                    ok = jobs.run_job(job)
+                    self.stdout.write(f"[{worker_id}] {job.name} #{job.pk} {'ok' if ok else 'failed'}")
+        finally:
+            connection.close()
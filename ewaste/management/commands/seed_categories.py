@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from ewaste import categories
+
+
+class Command(BaseCommand):
+    help = "Create or update the default e-waste categories (safe to run repeatedly)"
+
+    def handle(self, *args, **options):
+        created, updated = categories.seed_categories()
+        self.stdout.write(self.style.SUCCESS(
+            f"Categories seeded: {created} created, {updated} updated, "
+            f"{categories.count()} total"
+        ))
+        for category in categories.all_categories():
+            self.stdout.write(f"- {category.name}")
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from ewaste.warmup import warm_up
+
+
+class Command(BaseCommand):
+    help = "Warm templates, URLs, ORM metadata and caches, and print how long each step took."
+
+    def handle(self, *args, **options):
+        report = warm_up()
+        for name, seconds, detail in report:
+            style = self.style.ERROR if detail.startswith('failed:') else str
+            self.stdout.write(style(f"{name:<10} {seconds * 1000:8.1f} ms  {detail}"))
+        total = sum(seconds for _, seconds, _ in report)
+        self.stdout.write(f"{'total':<10} {total * 1000:8.1f} ms")
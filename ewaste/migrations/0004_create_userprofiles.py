@@ -5,9 +5,12 @@ def create_profiles(apps, schema_editor):
     User = apps.get_model('auth', 'User')
     UserProfile = apps.get_model('ewaste', 'UserProfile')
 
-    for user in User.objects.all():
-        if not hasattr(user, 'profile'):
-            UserProfile.objects.create(user_id=user.id)
+    missing = User.objects.filter(profile__isnull=True).values_list('id', flat=True)
+    while True:
+        user_ids = list(missing[:1000])
+        if not user_ids:
+            break
+        UserProfile.objects.bulk_create([UserProfile(user_id=user_id) for user_id in user_ids])
 
 
 class Migration(migrations.Migration):
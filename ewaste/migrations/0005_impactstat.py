@@ -0,0 +1,34 @@
+# Generated by Django 4.2 on 2026-10-19 18:14
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('ewaste', '0004_create_userprofiles'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImpactStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=50, unique=True)),
+                ('scope', models.CharField(choices=[('user', 'User'), ('company', 'Company'), ('platform', 'Platform')], max_length=20)),
+                ('items_collected', models.IntegerField(default=0)),
+                ('units_collected', models.IntegerField(default=0)),
+                ('weight_kg', models.FloatField(default=0)),
+                ('metals_kg', models.FloatField(default=0)),
+                ('plastics_kg', models.FloatField(default=0)),
+                ('glass_kg', models.FloatField(default=0)),
+                ('co2_avoided_kg', models.FloatField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('company', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='impact_stats', to='ewaste.company')),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='impact_stats', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+    ]
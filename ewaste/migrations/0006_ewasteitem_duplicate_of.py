@@ -0,0 +1,19 @@
+# Generated by Django 4.2 on 2026-10-19 18:17
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ewaste', '0005_impactstat'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ewasteitem',
+            name='duplicate_of',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='duplicates', to='ewaste.ewasteitem'),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 4.2 on 2026-10-19 18:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ewaste', '0006_ewasteitem_duplicate_of'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notification',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='recyclingfacility',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddIndex(
+            model_name='ewasteitem',
+            index=models.Index(fields=['updated_at', 'id'], name='ewaste_item_sync_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['user', 'updated_at', 'id'], name='ewaste_notif_sync_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pickuprequest',
+            index=models.Index(fields=['updated_at', 'id'], name='ewaste_pickup_sync_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recyclingfacility',
+            index=models.Index(fields=['updated_at', 'id'], name='ewaste_facility_sync_idx'),
+        ),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 4.2 on 2026-10-19 18:23
+
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def backfill_due_at(apps, schema_editor):
+    PickupRequest = apps.get_model('ewaste', 'PickupRequest')
+
+    batch = []
+    pickups = PickupRequest.objects.select_related('ewaste_item').only(
+        'id', 'scheduled_date', 'ewaste_item__preferred_date'
+    )
+    for pickup in pickups.iterator(chunk_size=2000):
+        if pickup.scheduled_date:
+            pickup.due_at = pickup.scheduled_date
+        else:
+            day_after = datetime.combine(pickup.ewaste_item.preferred_date + timedelta(days=1), time.min)
+            pickup.due_at = timezone.make_aware(day_after) if settings.USE_TZ else day_after
+        batch.append(pickup)
+        if len(batch) == 2000:
+            PickupRequest.objects.bulk_update(batch, ['due_at'])
+            batch = []
+    if batch:
+        PickupRequest.objects.bulk_update(batch, ['due_at'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ewaste', '0008_job'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pickuprequest',
+            name='due_at',
+            field=models.DateTimeField(blank=True, editable=False, help_text='Scheduled date, or end of the preferred date', null=True),
+        ),
+        migrations.AddField(
+            model_name='pickuprequest',
+            name='escalated_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='pickuprequest',
+            index=models.Index(fields=['status', 'due_at'], name='ewaste_pickup_due_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pickuprequest',
+            index=models.Index(fields=['status', 'escalated_at', 'due_at'], name='ewaste_pickup_escalate_idx'),
+        ),
+        migrations.RunPython(backfill_due_at, reverse_code=migrations.RunPython.noop),
+    ]
@@ -0,0 +1,65 @@
+# Generated by Django 4.2 on 2026-10-19 18:24
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('ewaste', '0009_pickup_due_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PickupEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('from_status', models.CharField(blank=True, max_length=20)),
+                ('to_status', models.CharField(max_length=20)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'ordering': ['created_at', 'id'],
+            },
+        ),
+        migrations.CreateModel(
+            name='PickupEventMonthly',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField()),
+                ('status', models.CharField(max_length=20)),
+                ('transitions', models.IntegerField(default=0)),
+                ('total_seconds', models.FloatField(default=0)),
+                ('max_seconds', models.FloatField(default=0)),
+            ],
+            options={
+                'ordering': ['-month', 'status'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='pickupeventmonthly',
+            constraint=models.UniqueConstraint(fields=('month', 'status'), name='ewaste_event_month_status_uniq'),
+        ),
+        migrations.AddField(
+            model_name='pickupevent',
+            name='actor',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='pickupevent',
+            name='pickup',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='events', to='ewaste.pickuprequest'),
+        ),
+        migrations.AddIndex(
+            model_name='pickupevent',
+            index=models.Index(fields=['pickup', 'created_at'], name='ewaste_event_pickup_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pickupevent',
+            index=models.Index(fields=['created_at'], name='ewaste_event_created_idx'),
+        ),
+    ]
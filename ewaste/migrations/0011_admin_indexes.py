@@ -0,0 +1,29 @@
+# Generated by Django 4.2 on 2026-10-19 18:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ewaste', '0010_pickupevent'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='ewasteitem',
+            index=models.Index(fields=['item_name'], name='ewaste_item_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ewasteitem',
+            index=models.Index(fields=['-created_at'], name='ewaste_item_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['-created_at'], name='ewaste_notif_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pickuprequest',
+            index=models.Index(fields=['-created_at'], name='ewaste_pickup_created_idx'),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 4.2 on 2026-10-19 18:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ewaste', '0011_admin_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='pickupevent',
+            name='from_status',
+            field=models.CharField(blank=True, choices=[('pending', 'Pending'), ('scheduled', 'Scheduled'), ('in_progress', 'In Progress'), ('completed', 'Completed'), ('cancelled', 'Cancelled')], max_length=20),
+        ),
+        migrations.AlterField(
+            model_name='pickupevent',
+            name='to_status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('scheduled', 'Scheduled'), ('in_progress', 'In Progress'), ('completed', 'Completed'), ('cancelled', 'Cancelled')], max_length=20),
+        ),
+        migrations.AddIndex(
+            model_name='ewasteitem',
+            index=models.Index(fields=['user', '-id'], name='ewaste_item_user_idx'),
+        ),
+    ]
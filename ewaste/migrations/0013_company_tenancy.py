@@ -0,0 +1,59 @@
+# Generated by Django 4.2 on 2026-10-19 18:35
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ewaste', '0012_item_history'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CompanyCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=30)),
+                ('value', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='company',
+            name='service_regions',
+            field=models.TextField(blank=True, help_text='Comma-separated postal codes or area names this company collects from'),
+        ),
+        migrations.AddField(
+            model_name='ewasteitem',
+            name='company',
+            field=models.ForeignKey(blank=True, help_text='Partner company whose service region covers the pickup location', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='items', to='ewaste.company'),
+        ),
+        migrations.AddField(
+            model_name='ewasteitem',
+            name='region_key',
+            field=models.CharField(blank=True, help_text='Service region the pickup location matched', max_length=50),
+        ),
+        migrations.AddField(
+            model_name='pickuprequest',
+            name='company',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='pickups', to='ewaste.company'),
+        ),
+        migrations.AddIndex(
+            model_name='ewasteitem',
+            index=models.Index(fields=['company', '-id'], name='ewaste_item_company_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pickuprequest',
+            index=models.Index(fields=['company', 'status', '-created_at'], name='ewaste_pickup_company_idx'),
+        ),
+        migrations.AddField(
+            model_name='companycounter',
+            name='company',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='counters', to='ewaste.company'),
+        ),
+        migrations.AddConstraint(
+            model_name='companycounter',
+            constraint=models.UniqueConstraint(fields=('company', 'name'), name='ewaste_company_counter_unique'),
+        ),
+    ]
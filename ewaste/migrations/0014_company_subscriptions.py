@@ -0,0 +1,56 @@
+# Generated by Django 4.2 on 2026-10-19 18:40
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def subscribe_existing_companies(apps, schema_editor):
+    # Existing partners were emailed about every pickup; keep that until they
+    # narrow their subscriptions
+    Company = apps.get_model('ewaste', 'Company')
+    CompanySubscription = apps.get_model('ewaste', 'CompanySubscription')
+    CompanySubscription.objects.bulk_create(
+        [CompanySubscription(company_id=company_id) for company_id in Company.objects.values_list('id', flat=True)],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ewaste', '0013_company_tenancy'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ewasteitem',
+            name='geohash',
+            field=models.CharField(blank=True, editable=False, max_length=12),
+        ),
+        migrations.AddField(
+            model_name='ewasteitem',
+            name='latitude',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='ewasteitem',
+            name='longitude',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name='CompanySubscription',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('condition', models.CharField(blank=True, choices=[('working', 'Working'), ('partial', 'Partially Working'), ('broken', 'Broken')], max_length=20)),
+                ('geohash_prefix', models.CharField(blank=True, help_text="Geohash cell covering the service area, e.g. 'tdr1'", max_length=12)),
+                ('region', models.CharField(blank=True, help_text='Postal code or area name', max_length=50)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('category', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='ewaste.ewastecategory')),
+                ('company', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='subscriptions', to='ewaste.company')),
+            ],
+            options={
+                'ordering': ['company', 'id'],
+            },
+        ),
+        migrations.RunPython(subscribe_existing_companies, reverse_code=migrations.RunPython.noop),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 4.2 on 2026-10-19 18:44
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def book_open_pickups(apps, schema_editor):
+    # Count upcoming open pickups once so availability starts out right
+    from django.conf import settings
+    from django.db.models import Count
+    from django.utils import timezone
+
+    PickupRequest = apps.get_model('ewaste', 'PickupRequest')
+    PickupSlot = apps.get_model('ewaste', 'PickupSlot')
+    open_pickups = PickupRequest.objects.filter(
+        status__in=['pending', 'scheduled', 'in_progress'],
+        ewaste_item__preferred_date__gte=timezone.localdate(),
+    )
+    capacity = getattr(settings, 'PICKUP_SLOT_CAPACITY', 20)
+    groups = (
+        open_pickups.values('ewaste_item__preferred_date', 'ewaste_item__region_key')
+        .annotate(n=Count('id')).order_by()
+    )
+    for group in groups:
+        day, area = group['ewaste_item__preferred_date'], group['ewaste_item__region_key']
+        slot = PickupSlot.objects.create(date=day, area=area, capacity=max(capacity, group['n']), booked=group['n'])
+        open_pickups.filter(ewaste_item__preferred_date=day, ewaste_item__region_key=area).update(slot=slot)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ewaste', '0015_email_digests'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PickupSlot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('area', models.CharField(blank=True, max_length=50)),
+                ('capacity', models.PositiveIntegerField()),
+                ('booked', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'ordering': ['date', 'area'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='pickupslot',
+            constraint=models.UniqueConstraint(fields=('area', 'date'), name='ewaste_pickup_slot_unique'),
+        ),
+        migrations.AddField(
+            model_name='pickuprequest',
+            name='slot',
+            field=models.ForeignKey(blank=True, help_text='Booked day; released when the pickup is cancelled', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='pickups', to='ewaste.pickupslot'),
+        ),
+        migrations.RunPython(book_open_pickups, reverse_code=migrations.RunPython.noop),
+    ]
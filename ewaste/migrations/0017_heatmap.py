@@ -0,0 +1,35 @@
+# Generated by Django 4.2 on 2026-10-19 18:46
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ewaste', '0016_pickup_slots'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HeatmapCell',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('cell', models.CharField(max_length=12)),
+                ('precision', models.PositiveSmallIntegerField()),
+                ('category_id', models.PositiveIntegerField(default=0)),
+                ('status', models.CharField(choices=[('open', 'Open'), ('collected', 'Collected')], max_length=10)),
+                ('items', models.IntegerField(default=0)),
+                ('units', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='heatmapcell',
+            index=models.Index(fields=['precision', 'cell'], name='ewaste_heatmap_tile_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='heatmapcell',
+            constraint=models.UniqueConstraint(fields=('cell', 'category_id', 'status'), name='ewaste_heatmap_cell_unique'),
+        ),
+    ]
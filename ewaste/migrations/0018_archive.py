@@ -0,0 +1,71 @@
+# Generated by Django 4.2 on 2026-10-19 18:49
+
+from django.conf import settings
+import django.core.serializers.json
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('ewaste', '0017_heatmap'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedRecord',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('notification', 'Notification'), ('feedback', 'Feedback')], max_length=20)),
+                ('original_id', models.BigIntegerField()),
+                ('created_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('data', models.JSONField(default=dict, encoder=django.core.serializers.json.DjangoJSONEncoder)),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ArchivedItem',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('category_id', models.PositiveIntegerField(blank=True, null=True)),
+                ('item_name', models.CharField(max_length=200)),
+                ('description', models.TextField(blank=True)),
+                ('condition', models.CharField(choices=[('working', 'Working'), ('partial', 'Partially Working'), ('broken', 'Broken')], max_length=20)),
+                ('quantity', models.IntegerField(default=1)),
+                ('pickup_location', models.CharField(max_length=500)),
+                ('preferred_date', models.DateField(blank=True, null=True)),
+                ('contact_phone', models.CharField(blank=True, max_length=15)),
+                ('geohash', models.CharField(blank=True, max_length=12)),
+                ('is_collected', models.BooleanField(default=False)),
+                ('pickup_status', models.CharField(choices=[('pending', 'Pending'), ('scheduled', 'Scheduled'), ('in_progress', 'In Progress'), ('completed', 'Completed'), ('cancelled', 'Cancelled')], max_length=20)),
+                ('completed_date', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('data', models.JSONField(default=dict, encoder=django.core.serializers.json.DjangoJSONEncoder)),
+                ('company', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='archived_items', to='ewaste.company')),
+                ('impact_company', models.ForeignKey(blank=True, help_text='Company of the assignee who collected it', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='ewaste.company')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_items', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='archivedrecord',
+            index=models.Index(fields=['kind', 'user', '-created_at'], name='ewaste_archived_record_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='archivedrecord',
+            constraint=models.UniqueConstraint(fields=('kind', 'original_id'), name='ewaste_archived_record_unique'),
+        ),
+        migrations.AddIndex(
+            model_name='archiveditem',
+            index=models.Index(fields=['user', '-id'], name='ewaste_archived_user_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='archiveditem',
+            index=models.Index(fields=['company', '-id'], name='ewaste_archived_company_idx'),
+        ),
+    ]
@@ -1,7 +1,56 @@
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.core.exceptions import ValidationError
 from django.db import models
 from django.contrib.auth.models import User
 from django.utils import timezone
 
+from . import geo
+
+
+EMAIL_FREQUENCY_CHOICES = [
+    ('immediate', 'Immediately'),
+    ('hourly', 'Hourly digest'),
+    ('daily', 'Daily digest'),
+]
+
+
+class ItemQuerySet(models.QuerySet):
+    def visible_to(self, user):
+        """
+        Staff see every item, company members their company's items,
+        customers their own. Unrouted items stay with staff until routing (or
+        a staff assignment) gives them to a company.
+        """
+        if user.is_staff:
+            return self
+        profile = getattr(user, 'profile', None)
+        if profile and profile.is_company:
+            if profile.company_id is None:
+                return self.none()
+            return self.filter(company_id=profile.company_id)
+        return self.filter(user=user)
+
+
+class PickupQuerySet(models.QuerySet):
+    def visible_to(self, user):
+        """
+        Staff see every pickup, company members their company's pickups,
+        customers the pickups of their own items. Unrouted pickups stay with
+        staff until they are given to a company.
+        """
+        if user.is_staff:
+            return self
+        profile = getattr(user, 'profile', None)
+        if profile and profile.is_company:
+            if profile.company_id is None:
+                return self.none()
+            return self.filter(company_id=profile.company_id)
+        return self.filter(ewaste_item__user=user)
+
+
 class EWasteCategory(models.Model):
     """Categories of e-waste items"""
     name = models.CharField(max_length=100)
@@ -34,14 +83,59 @@ class EWasteItem(models.Model):
     contact_phone = models.CharField(max_length=15)
     images = models.TextField(blank=True, help_text="Store image paths or URLs")
     is_collected = models.BooleanField(default=False)
+    duplicate_of = models.ForeignKey('self', on_delete=models.SET_NULL, null=True, blank=True, related_name='duplicates')
+    company = models.ForeignKey('Company', on_delete=models.SET_NULL, null=True, blank=True, related_name='items',
+                                help_text="Partner company whose service region covers the pickup location")
+    region_key = models.CharField(max_length=50, blank=True, help_text="Service region the pickup location matched")
+    latitude = models.FloatField(null=True, blank=True)
+    longitude = models.FloatField(null=True, blank=True)
+    geohash = models.CharField(max_length=12, blank=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+
+    objects = ItemQuerySet.as_manager()
     
     def __str__(self):
         return f"{self.item_name} - {self.user.username}"
+
+    def save(self, *args, **kwargs):
+        # Keep the geohash of the pickup coordinates in sync
+        if self.latitude is not None and self.longitude is not None:
+            geohash = geo.encode(self.latitude, self.longitude)
+        else:
+            geohash = ''
+        if geohash != self.geohash:
+            self.geohash = geohash
+            if kwargs.get('update_fields') is not None:
+                kwargs['update_fields'] = set(kwargs['update_fields']) | {'geohash'}
+        super().save(*args, **kwargs)
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['updated_at', 'id'], name='ewaste_item_sync_idx'),
+            models.Index(fields=['item_name'], name='ewaste_item_name_idx'),
+            models.Index(fields=['user', '-id'], name='ewaste_item_user_idx'),
+            models.Index(fields=['company', '-id'], name='ewaste_item_company_idx'),
+            models.Index(fields=['-created_at'], name='ewaste_item_created_idx'),
+        ]
+
+
+class PickupSlot(models.Model):
+    """Pickup capacity of one day in one service area (region key)"""
+    date = models.DateField()
+    area = models.CharField(max_length=50, blank=True)
+    capacity = models.PositiveIntegerField()
+    booked = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.date} {self.area or '-'}: {self.booked}/{self.capacity}"
+
+    class Meta:
+        ordering = ['date', 'area']
+        constraints = [
+            models.UniqueConstraint(fields=['area', 'date'], name='ewaste_pickup_slot_unique'),
+        ]
 
 
 class PickupRequest(models.Model):
@@ -60,14 +154,47 @@ class PickupRequest(models.Model):
     scheduled_date = models.DateTimeField(null=True, blank=True)
     completed_date = models.DateTimeField(null=True, blank=True)
     notes = models.TextField(blank=True)
+    due_at = models.DateTimeField(null=True, blank=True, editable=False, help_text="Scheduled date, or end of the preferred date")
+    escalated_at = models.DateTimeField(null=True, blank=True, editable=False)
+    company = models.ForeignKey('Company', on_delete=models.SET_NULL, null=True, blank=True, related_name='pickups')
+    slot = models.ForeignKey(PickupSlot, on_delete=models.SET_NULL, null=True, blank=True, related_name='pickups',
+                             help_text="Booked day; released when the pickup is cancelled")
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+
+    objects = PickupQuerySet.as_manager()
     
     def __str__(self):
         return f"Pickup - {self.ewaste_item.item_name} ({self.status})"
+
+    def compute_due_at(self):
+        if self.scheduled_date:
+            return self.scheduled_date
+        preferred = self.ewaste_item.preferred_date if self.ewaste_item_id else None
+        if preferred is None:
+            return None
+        day_after = datetime.combine(preferred + timedelta(days=1), time.min)
+        return timezone.make_aware(day_after) if settings.USE_TZ else day_after
+
+    def save(self, *args, **kwargs):
+        # Keep the indexed due date in sync; a new due date restarts the SLA clock
+        due_at = self.compute_due_at()
+        if due_at != self.due_at:
+            self.due_at = due_at
+            self.escalated_at = None
+            if kwargs.get('update_fields') is not None:
+                kwargs['update_fields'] = set(kwargs['update_fields']) | {'due_at', 'escalated_at'}
+        super().save(*args, **kwargs)
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['updated_at', 'id'], name='ewaste_pickup_sync_idx'),
+            models.Index(fields=['status', 'due_at'], name='ewaste_pickup_due_idx'),
+            models.Index(fields=['status', 'escalated_at', 'due_at'], name='ewaste_pickup_escalate_idx'),
+            models.Index(fields=['-created_at'], name='ewaste_pickup_created_idx'),
+            models.Index(fields=['company', 'status', '-created_at'], name='ewaste_pickup_company_idx'),
+        ]
 
 
 class RecyclingFacility(models.Model):
@@ -81,12 +208,16 @@ class RecyclingFacility(models.Model):
     latitude = models.FloatField(null=True, blank=True)
     longitude = models.FloatField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     
     def __str__(self):
         return self.name
     
     class Meta:
         verbose_name_plural = "Recycling Facilities"
+        indexes = [
+            models.Index(fields=['updated_at', 'id'], name='ewaste_facility_sync_idx'),
+        ]
 
 
 class Feedback(models.Model):
@@ -110,23 +241,89 @@ class Company(models.Model):
     address = models.TextField(blank=True)
     contact_email = models.EmailField()
     contact_phone = models.CharField(max_length=15, blank=True)
+    service_regions = models.TextField(blank=True, help_text="Comma-separated postal codes or area names this company collects from")
+    email_frequency = models.CharField(max_length=10, choices=EMAIL_FREQUENCY_CHOICES, default='immediate')
     created_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
         return self.name
 
+    def region_list(self):
+        return [region.strip() for region in self.service_regions.split(',') if region.strip()]
+
+
+class CompanySubscription(models.Model):
+    """
+    Which new pickups a company is notified about. Empty criteria match
+    anything; a company may hold several subscriptions. A new company starts
+    with one catch-all subscription (see signals.py).
+    """
+    company = models.ForeignKey(Company, on_delete=models.CASCADE, related_name='subscriptions')
+    category = models.ForeignKey(EWasteCategory, on_delete=models.CASCADE, null=True, blank=True, related_name='+')
+    condition = models.CharField(max_length=20, choices=EWasteItem.CONDITION_CHOICES, blank=True)
+    geohash_prefix = models.CharField(max_length=12, blank=True, help_text="Geohash cell covering the service area, e.g. 'tdr1'")
+    region = models.CharField(max_length=50, blank=True, help_text="Postal code or area name")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        criteria = [str(value) for value in (self.category, self.get_condition_display() if self.condition else '',
+                                              self.geohash_prefix, self.region) if value]
+        return f"{self.company_id}: {', '.join(criteria) or 'all pickups'}"
+
+    def clean(self):
+        self.geohash_prefix = self.geohash_prefix.strip().lower()
+        if self.geohash_prefix and not geo.is_valid(self.geohash_prefix):
+            raise ValidationError({'geohash_prefix': "Enter a valid geohash."})
+
+    class Meta:
+        ordering = ['company', 'id']
+
+
+class CompanyCounter(models.Model):
+    """Running per-company totals (items, pickups per status) for dashboards"""
+    company = models.ForeignKey(Company, on_delete=models.CASCADE, related_name='counters')
+    name = models.CharField(max_length=30)
+    value = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.company_id}:{self.name}={self.value}"
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['company', 'name'], name='ewaste_company_counter_unique'),
+        ]
+
 
 class UserProfile(models.Model):
     """Extended profile for users to handle company/customer role"""
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='profile')
     is_company = models.BooleanField(default=False)
     company = models.ForeignKey('Company', on_delete=models.SET_NULL, null=True, blank=True, related_name='members')
+    email_frequency = models.CharField(max_length=10, choices=EMAIL_FREQUENCY_CHOICES, default='immediate')
     created_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
         return f"{self.user.username} Profile"
 
 
+class DigestEntry(models.Model):
+    """An email notification waiting for its recipient's next digest"""
+    email = models.EmailField()
+    frequency = models.CharField(max_length=10, choices=EMAIL_FREQUENCY_CHOICES)
+    subject = models.CharField(max_length=200)
+    message = models.TextField()
+    url = models.CharField(max_length=500, blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"{self.email}: {self.subject}"
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['frequency', 'email', 'id'], name='ewaste_digest_pending_idx'),
+        ]
+
+
 class Notification(models.Model):
     """In-app notification for staff/company users"""
     user = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True, related_name='notifications')
@@ -135,9 +332,243 @@ class Notification(models.Model):
     url = models.CharField(max_length=500, blank=True)
     is_read = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return (self.message[:75] + '...') if len(self.message) > 75 else self.message
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', 'updated_at', 'id'], name='ewaste_notif_sync_idx'),
+            models.Index(fields=['-created_at'], name='ewaste_notif_created_idx'),
+        ]
+
+
+class ImpactStat(models.Model):
+    """Cached environmental impact totals for a user, a company or the whole platform"""
+    SCOPE_USER = 'user'
+    SCOPE_COMPANY = 'company'
+    SCOPE_PLATFORM = 'platform'
+    SCOPE_CHOICES = [
+        (SCOPE_USER, 'User'),
+        (SCOPE_COMPANY, 'Company'),
+        (SCOPE_PLATFORM, 'Platform'),
+    ]
+
+    key = models.CharField(max_length=50, unique=True)
+    scope = models.CharField(max_length=20, choices=SCOPE_CHOICES)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True, related_name='impact_stats')
+    company = models.ForeignKey('Company', on_delete=models.CASCADE, null=True, blank=True, related_name='impact_stats')
+    items_collected = models.IntegerField(default=0)
+    units_collected = models.IntegerField(default=0)
+    weight_kg = models.FloatField(default=0)
+    metals_kg = models.FloatField(default=0)
+    plastics_kg = models.FloatField(default=0)
+    glass_kg = models.FloatField(default=0)
+    co2_avoided_kg = models.FloatField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    @staticmethod
+    def make_key(scope, obj=None):
+        return f"{scope}:{obj.pk}" if obj is not None else scope
+
+    def __str__(self):
+        return f"Impact {self.key}: {self.co2_avoided_kg:.1f} kg CO2"
+
+
+class HeatmapCell(models.Model):
+    """
+    Number of reported items in one geohash cell, per category (0 when
+    uncategorized) and status ('open' or 'collected')
+    """
+    STATUS_CHOICES = [
+        ('open', 'Open'),
+        ('collected', 'Collected'),
+    ]
+
+    cell = models.CharField(max_length=12)
+    precision = models.PositiveSmallIntegerField()
+    category_id = models.PositiveIntegerField(default=0)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES)
+    items = models.IntegerField(default=0)
+    units = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"{self.cell} {self.category_id}/{self.status}: {self.items}"
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['cell', 'category_id', 'status'], name='ewaste_heatmap_cell_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['precision', 'cell'], name='ewaste_heatmap_tile_idx'),
+        ]
+
+
+class ArchivedItem(models.Model):
+    """
+    A reported item whose pickup closed long ago, moved out of the hot tables
+    by the archive_data command. Keeps the original id, the columns that
+    lists and totals filter on, and a snapshot of the item, its pickup and
+    the pickup's events.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='archived_items')
+    category_id = models.PositiveIntegerField(null=True, blank=True)
+    company = models.ForeignKey('Company', on_delete=models.SET_NULL, null=True, blank=True, related_name='archived_items')
+    impact_company = models.ForeignKey('Company', on_delete=models.SET_NULL, null=True, blank=True, related_name='+',
+                                       help_text="Company of the assignee who collected it")
+    item_name = models.CharField(max_length=200)
+    description = models.TextField(blank=True)
+    condition = models.CharField(max_length=20, choices=EWasteItem.CONDITION_CHOICES)
+    quantity = models.IntegerField(default=1)
+    pickup_location = models.CharField(max_length=500)
+    preferred_date = models.DateField(null=True, blank=True)
+    contact_phone = models.CharField(max_length=15, blank=True)
+    geohash = models.CharField(max_length=12, blank=True)
+    is_collected = models.BooleanField(default=False)
+    pickup_status = models.CharField(max_length=20, choices=PickupRequest.STATUS_CHOICES)
+    completed_date = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    archived_at = models.DateTimeField(default=timezone.now)
+    data = models.JSONField(encoder=DjangoJSONEncoder, default=dict)
+
+    def __str__(self):
+        return f"{self.item_name} (archived)"
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', '-id'], name='ewaste_archived_user_idx'),
+            models.Index(fields=['company', '-id'], name='ewaste_archived_company_idx'),
+        ]
+
+
+class ArchivedRecord(models.Model):
+    """An archived notification or feedback row, kept as a snapshot"""
+    KIND_NOTIFICATION = 'notification'
+    KIND_FEEDBACK = 'feedback'
+    KIND_CHOICES = [
+        (KIND_NOTIFICATION, 'Notification'),
+        (KIND_FEEDBACK, 'Feedback'),
+    ]
+
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    original_id = models.BigIntegerField()
+    user = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True, related_name='+')
+    created_at = models.DateTimeField()
+    archived_at = models.DateTimeField(default=timezone.now)
+    data = models.JSONField(encoder=DjangoJSONEncoder, default=dict)
+
+    def __str__(self):
+        return f"{self.kind} #{self.original_id}"
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['kind', 'original_id'], name='ewaste_archived_record_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['kind', 'user', '-created_at'], name='ewaste_archived_record_idx'),
+        ]
+
+
+class Tombstone(models.Model):
+    """Id of a row deleted or archived from a table the API syncs (see tombstones.py)"""
+    model = models.CharField(max_length=100, help_text="app_label.model_name")
+    object_id = models.BigIntegerField()
+    deleted_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"{self.model} #{self.object_id}"
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['model', 'deleted_at'], name='ewaste_tombstone_model_idx'),
+        ]
+
+
+class Job(models.Model):
+    """Deferred unit of work executed by the `run_jobs` worker"""
+    STATUS_QUEUED = 'queued'
+    STATUS_RUNNING = 'running'
+    STATUS_SUCCEEDED = 'succeeded'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_QUEUED, 'Queued'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_SUCCEEDED, 'Succeeded'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+
+    name = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_QUEUED)
+    run_at = models.DateTimeField(default=timezone.now)
+    attempts = models.IntegerField(default=0)
+    max_attempts = models.IntegerField(default=3)
+    locked_by = models.CharField(max_length=100, blank=True)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name} #{self.pk} ({self.status})"
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'run_at'], name='ewaste_job_claim_idx'),
+        ]
+
+
+class JobSchedule(models.Model):
+    """Next due time of a periodic job; claimed by workers with an atomic UPDATE"""
+    name = models.CharField(max_length=100, unique=True)
+    interval_seconds = models.IntegerField()
+    next_run_at = models.DateTimeField(default=timezone.now)
+    last_run_at = models.DateTimeField(null=True, blank=True)
+    enabled = models.BooleanField(default=True)
+
+    def __str__(self):
+        return f"{self.name} every {self.interval_seconds}s"
+
+
+class PickupEvent(models.Model):
+    """Append-only log of pickup status transitions"""
+    pickup = models.ForeignKey(PickupRequest, on_delete=models.CASCADE, related_name='events')
+    from_status = models.CharField(max_length=20, choices=PickupRequest.STATUS_CHOICES, blank=True)
+    to_status = models.CharField(max_length=20, choices=PickupRequest.STATUS_CHOICES)
+    actor = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    created_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"Pickup #{self.pickup_id}: {self.from_status or 'new'} -> {self.to_status}"
+
+    class Meta:
+        ordering = ['created_at', 'id']
+        indexes = [
+            models.Index(fields=['pickup', 'created_at'], name='ewaste_event_pickup_idx'),
+            models.Index(fields=['created_at'], name='ewaste_event_created_idx'),
+        ]
+
+
+class PickupEventMonthly(models.Model):
+    """Monthly roll-up of compacted PickupEvents: time spent in each status"""
+    month = models.DateField()
+    status = models.CharField(max_length=20)
+    transitions = models.IntegerField(default=0)
+    total_seconds = models.FloatField(default=0)
+    max_seconds = models.FloatField(default=0)
+
+    def __str__(self):
+        return f"{self.month:%Y-%m} {self.status}: {self.transitions}"
+
+    class Meta:
+        ordering = ['-month', 'status']
+        constraints = [
+            models.UniqueConstraint(fields=['month', 'status'], name='ewaste_event_month_status_uniq'),
+        ]
@@ -1,15 +1,55 @@
-from django.db.models import Count, Q
+import csv
+
+from django.db.models import Count, Prefetch, Q
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.urls import reverse
 from django.utils import timezone
-from .models import EWasteItem, PickupRequest, RecyclingFacility
+from django.utils.dateparse import parse_datetime
+from .models import ArchivedItem, EWasteItem, Notification, PickupEvent, PickupRequest, RecyclingFacility, UserProfile
+from . import audit, categories, dedup, heatmap, impact, sessions, slots, tenancy
+
+
+def register_user(username, email, password, first_name='', last_name=''):
+    """
+    Create a customer account and its profile in one transaction.
+
+    Raises IntegrityError if the username is taken; the unique index decides,
+    so there is no window between a check and the insert.
+    """
+    with transaction.atomic():
+        # The post_save signal inserts the UserProfile inside this transaction
+        return User.objects.create_user(
+            username=username, email=email, password=password,
+            first_name=first_name, last_name=last_name,
+        )
+
+
+def backfill_profiles(batch_size=1000):
+    """Create missing UserProfiles with bulk inserts; returns how many were created"""
+    created = 0
+    missing = User.objects.filter(profile__isnull=True).values_list('id', flat=True)
+    while True:
+        user_ids = list(missing[:batch_size])
+        if not user_ids:
+            return created
+        UserProfile.objects.bulk_create(
+            [UserProfile(user_id=user_id) for user_id in user_ids], ignore_conflicts=True,
+        )
+        sessions.invalidate_roles(user_ids)
+        created += len(user_ids)
 
 
 def get_user_statistics(user):
     """
     Get statistics for a specific user
     """
-    total_items = EWasteItem.objects.filter(user=user).count()
-    collected_items = EWasteItem.objects.filter(user=user, is_collected=True).count()
-    pending_items = EWasteItem.objects.filter(user=user, is_collected=False).count()
+    archived = ArchivedItem.objects.filter(user=user).aggregate(
+        total=Count('id'), collected=Count('id', filter=Q(is_collected=True)),
+    )
+    total_items = EWasteItem.objects.filter(user=user).count() + archived['total']
+    collected_items = EWasteItem.objects.filter(user=user, is_collected=True).count() + archived['collected']
+    pending_items = total_items - collected_items
     
     return {
         'total_items': total_items,
@@ -22,10 +62,15 @@ def get_global_statistics():
     """
     Get global platform statistics
     """
-    total_items = EWasteItem.objects.count()
-    collected_items = EWasteItem.objects.filter(is_collected=True).count()
+    archived = ArchivedItem.objects.aggregate(
+        total=Count('id'),
+        collected=Count('id', filter=Q(is_collected=True)),
+        completed=Count('id', filter=Q(pickup_status='completed')),
+    )
+    total_items = EWasteItem.objects.count() + archived['total']
+    collected_items = EWasteItem.objects.filter(is_collected=True).count() + archived['collected']
     pending_pickups = PickupRequest.objects.filter(status__in=['pending', 'scheduled']).count()
-    completed_pickups = PickupRequest.objects.filter(status='completed').count()
+    completed_pickups = PickupRequest.objects.filter(status='completed').count() + archived['completed']
     
     return {
         'total_items': total_items,
@@ -39,11 +84,52 @@ def get_category_statistics():
     """
     Get statistics by category
     """
-    categories = EWasteItem.objects.values('category__name').annotate(
+    rows = EWasteItem.objects.values('category').annotate(
         count=Count('id')
     ).order_by('-count')
-    
-    return list(categories)
+
+    return [
+        {'category__name': categories.name_for(row['category']), 'count': row['count']}
+        for row in rows
+    ]
+
+
+def item_history(user, status=None, condition=None, category=None):
+    """
+    A user's reported items with their pickup and its assignee joined in, so
+    listing them is one query however many there are. Category names come
+    from the category registry and need no join.
+    """
+    items = EWasteItem.objects.filter(user=user).select_related('pickup_request__assigned_to')
+    if status:
+        items = items.filter(pickup_request__status=status)
+    if condition:
+        items = items.filter(condition=condition)
+    if category:
+        items = items.filter(category=category)
+    return items
+
+
+def archived_item_history(user, status=None, condition=None, category=None):
+    """A user's archived items, filtered like item_history()"""
+    items = ArchivedItem.objects.filter(user=user)
+    if status:
+        items = items.filter(pickup_status=status)
+    if condition:
+        items = items.filter(condition=condition)
+    if category:
+        items = items.filter(category_id=category.pk)
+    return items
+
+
+def item_with_timeline(item_id):
+    """One item with pickup, assignee and the pickup's status events (two queries)"""
+    events = PickupEvent.objects.select_related('actor').order_by('created_at', 'id')
+    return (
+        EWasteItem.objects.select_related('pickup_request__assigned_to')
+        .prefetch_related(Prefetch('pickup_request__events', queryset=events, to_attr='timeline'))
+        .filter(id=item_id).first()
+    )
 
 
 def get_pending_pickups():
@@ -55,29 +141,388 @@ def get_pending_pickups():
     ).select_related('ewaste_item', 'assigned_to').order_by('-created_at')
 
 
+def _record_status_change(pickup_request, previous_status, to_status, actor=None, when=None):
+    """Audit event, company counters and slot release for one status change"""
+    audit.record_transition(pickup_request, previous_status, to_status, actor=actor, when=when)
+    tenancy.record_transitions([(pickup_request.company_id, previous_status)], to_status)
+    if to_status == 'cancelled' and previous_status != 'cancelled':
+        slots.release([pickup_request.slot_id])
+
+
+def create_pickup(ewaste_item, actor=None, **fields):
+    """
+    Create the pickup request for a reported item, routed to the item's
+    company, and log its first status. Unless it is created cancelled, the
+    pickup books the item's preferred date (raises slots.SlotFull).
+    """
+    fields.setdefault('company_id', ewaste_item.company_id)
+    with transaction.atomic():
+        if fields.get('status', 'pending') != 'cancelled' and 'slot_id' not in fields:
+            fields['slot_id'] = slots.book(ewaste_item.preferred_date, ewaste_item.region_key)
+        pickup_request = PickupRequest.objects.create(ewaste_item=ewaste_item, **fields)
+        tenancy.bump({(pickup_request.company_id, tenancy.ITEMS_COUNTER): 1})
+        _record_status_change(pickup_request, '', pickup_request.status, actor=actor)
+    return pickup_request
+
+
+def _claim_for_company(pickup_request, assignee, current_status):
+    """
+    Give an unrouted pickup (and its item) to the assignee's company and start
+    counting it there in `current_status`; the caller saves the pickup
+    """
+    company_id = tenancy.company_of(assignee) if assignee is not None else None
+    if pickup_request.company_id is not None or company_id is None:
+        return
+    pickup_request.company_id = company_id
+    pickup_request.ewaste_item.company_id = company_id
+    EWasteItem.objects.filter(id=pickup_request.ewaste_item_id).update(company_id=company_id)
+    tenancy.bump({
+        (company_id, tenancy.ITEMS_COUNTER): 1,
+        (company_id, tenancy.status_counter(current_status)): 1,
+    })
+
+
+def _scheduled_day(scheduled_date):
+    return timezone.localtime(scheduled_date).date() if timezone.is_aware(scheduled_date) else scheduled_date.date()
+
+
+def _sync_booking(pickup_request):
+    """
+    Move an open pickup's booking to its scheduled day (raises
+    slots.SlotFull, keeping the old booking)
+    """
+    if pickup_request.scheduled_date is None:
+        return
+    day = _scheduled_day(pickup_request.scheduled_date)
+    pickup_request.slot_id = slots.move(pickup_request.slot_id, day, pickup_request.ewaste_item.region_key)
+
+
+def save_pickup(pickup_request):
+    """
+    Save edited pickup details, moving the booking when the scheduled day
+    changed (raises slots.SlotFull)
+    """
+    with transaction.atomic():
+        if pickup_request.status not in audit.FINAL_STATUSES:
+            _sync_booking(pickup_request)
+        pickup_request.save()
+    return pickup_request
+
+
 def schedule_pickup(pickup_request, scheduled_date, assigned_staff):
     """
-    Schedule a pickup request
+    Schedule a pickup request, moving its booking to the scheduled day
+    (raises slots.SlotFull)
     """
-    pickup_request.status = 'scheduled'
     pickup_request.scheduled_date = scheduled_date
-    pickup_request.assigned_to = assigned_staff
-    pickup_request.save()
+    return transition_pickup(pickup_request, 'scheduled', assign_to=assigned_staff, actor=assigned_staff)
+
+
+def complete_pickup(pickup_request, completed_at=None, actor=None, previous_status=None):
+    """
+    Mark a pickup as completed and add the item to the impact totals
+    """
+    item = pickup_request.ewaste_item
+    newly_collected = not item.is_collected
+    if previous_status is None:
+        previous_status = pickup_request.status
+
+    with transaction.atomic():
+        pickup_request.status = 'completed'
+        if previous_status != 'completed' or pickup_request.completed_date is None:
+            pickup_request.completed_date = completed_at or timezone.now()
+        item.is_collected = True
+        pickup_request.save()
+        item.save()
+        _record_status_change(pickup_request, previous_status, 'completed', actor=actor,
+                              when=pickup_request.completed_date)
+
+        if newly_collected:
+            impact.record_collection(item)
+            heatmap.record_collection(item)
     return pickup_request
 
 
-def complete_pickup(pickup_request):
+# Status changes allowed for a pickup; completed and cancelled are final
+PICKUP_TRANSITIONS = {
+    'pending': {'scheduled', 'in_progress', 'completed', 'cancelled'},
+    'scheduled': {'pending', 'in_progress', 'completed', 'cancelled'},
+    'in_progress': {'scheduled', 'completed', 'cancelled'},
+    'completed': set(),
+    'cancelled': set(),
+}
+
+
+def can_transition(from_status, to_status):
+    return to_status in PICKUP_TRANSITIONS.get(from_status, set())
+
+
+def transition_pickup(pickup_request, to_status, assign_to=None, when=None, actor=None, previous_status=None):
     """
-    Mark a pickup as completed
+    Move a pickup to a new status, optionally assigning it, and log the change.
+
+    Pass previous_status when the instance was already modified (e.g. by a
+    bound ModelForm) so the event records where it actually came from.
+    An open pickup stays booked on its scheduled day (raises slots.SlotFull).
     """
-    pickup_request.status = 'completed'
-    pickup_request.completed_date = timezone.now()
-    pickup_request.ewaste_item.is_collected = True
-    pickup_request.save()
-    pickup_request.ewaste_item.save()
+    if previous_status is None:
+        previous_status = pickup_request.status
+    with transaction.atomic():
+        if to_status not in audit.FINAL_STATUSES:
+            _sync_booking(pickup_request)
+        if assign_to is not None:
+            pickup_request.assigned_to = assign_to
+        # Staff handing an unrouted pickup to a company member gives it to their company
+        _claim_for_company(pickup_request, assign_to, previous_status)
+        if to_status == 'completed':
+            return complete_pickup(pickup_request, completed_at=when, actor=actor, previous_status=previous_status)
+        pickup_request.status = to_status
+        pickup_request.save()
+        _record_status_change(pickup_request, previous_status, to_status, actor=actor, when=when)
     return pickup_request
 
 
+def sync_pickup_transitions(changes, actor):
+    """
+    Apply a batch of driver status changes in one transaction.
+
+    Each change is a dict with `id`, `to`, optional `from` (the status the
+    driver last saw) and optional `client_ts` (ISO 8601). Changes are applied
+    in client timestamp order; a change conflicts when the pickup does not
+    exist, its current status differs from `from`, or the transition is not
+    allowed. Returns (applied, conflicts) lists of compact dicts.
+    """
+    now = timezone.now()
+
+    def client_time(change):
+        try:
+            parsed = parse_datetime(str(change.get('client_ts') or ''))
+        except ValueError:
+            parsed = None
+        return min(parsed, now) if parsed and parsed.tzinfo else now
+
+    def pickup_id(change):
+        value = change.get('id')
+        return value if isinstance(value, int) else None
+
+    ordered = sorted(changes, key=client_time)
+    ids = {pickup_id(change) for change in ordered} - {None}
+
+    applied = []
+    conflicts = []
+    with transaction.atomic():
+        pickups = (
+            PickupRequest.objects.visible_to(actor).select_for_update()
+            .select_related('ewaste_item')
+            .in_bulk(ids)
+        )
+        for change in ordered:
+            pickup = pickups.get(pickup_id(change))
+            to_status = change.get('to')
+            expected = change.get('from')
+
+            if pickup is None:
+                conflicts.append({'id': change.get('id'), 'reason': 'not_found'})
+                continue
+            if expected and expected != pickup.status:
+                reason = 'status_changed'
+            elif to_status == pickup.status:
+                reason = None
+            elif not can_transition(pickup.status, to_status):
+                reason = 'invalid_transition'
+            else:
+                try:
+                    transition_pickup(
+                        pickup, to_status,
+                        assign_to=actor if pickup.assigned_to_id is None else None,
+                        when=client_time(change),
+                        actor=actor,
+                    )
+                    reason = None
+                except slots.SlotFull:
+                    reason = 'slot_full'
+
+            if reason:
+                conflicts.append({
+                    'id': pickup.id,
+                    'reason': reason,
+                    'status': pickup.status,
+                    'updated_at': pickup.updated_at,
+                })
+            else:
+                applied.append({
+                    'id': pickup.id,
+                    'status': pickup.status,
+                    'updated_at': pickup.updated_at,
+                })
+    return applied, conflicts
+
+
+BULK_STATUS_LABELS = {
+    'scheduled': 'scheduled',
+    'completed': 'marked completed',
+    'cancelled': 'cancelled',
+}
+
+
+def bulk_update_pickups(pickup_ids, actor, to_status=None, assign_to=None, scheduled_date=None):
+    """
+    Apply one change to many pickups with set-based updates.
+
+    Pickups that cannot move to `to_status` are skipped, except that pickups
+    already in `to_status` given a `scheduled_date` just get the new date,
+    with no status event. Without `to_status`, completed and cancelled
+    pickups are skipped. Each table gets a
+    single UPDATE, the audit events one INSERT and the assignees one batch of
+    notifications; per-row save() and signals are bypassed. Open pickups
+    given a `scheduled_date` are booked on that day, all or none (raises
+    slots.SlotFull). Returns (updated_ids, skipped_ids).
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        rows = list(
+            PickupRequest.objects.select_for_update(of=('self',))
+            .filter(id__in=pickup_ids)
+            .values_list('id', 'status', 'ewaste_item_id', 'assigned_to_id', 'company_id', 'slot_id',
+                         'ewaste_item__region_key', 'slot__date')
+        )
+        if to_status:
+            # Scheduling a scheduled pickup again only moves its date
+            eligible = [
+                row for row in rows
+                if can_transition(row[1], to_status) or (scheduled_date is not None and row[1] == to_status)
+            ]
+        else:
+            # Closed pickups keep their assignee
+            eligible = [row for row in rows if row[1] not in audit.FINAL_STATUSES]
+        changed =[row for row in eligible if to_status and row[1] != to_status]
+        eligible_ids = [row[0] for row in eligible]
+        skipped = sorted(set(pickup_ids) - set(eligible_ids))
+        if not eligible_ids:
+            return [], skipped
+
+        updates = {'updated_at': now}
+        if to_status:
+            updates['status'] = to_status
+        if to_status == 'completed':
+            updates['completed_date'] = now
+        if assign_to is not None:
+            updates['assigned_to'] = assign_to
+        if scheduled_date is not None:
+            # save() would recompute these; update() has to set them itself
+            updates.update(scheduled_date=scheduled_date, due_at=scheduled_date, escalated_at=None)
+        PickupRequest.objects.filter(id__in=eligible_ids).update(**updates)
+        if scheduled_date is not None and to_status not in audit.FINAL_STATUSES:
+            _move_bookings(eligible, _scheduled_day(scheduled_date))
+
+        item_ids = [row[2] for row in eligible]
+        claimed_by = tenancy.company_of(assign_to if assign_to is not None else actor)
+        if claimed_by is not None:
+            eligible = _claim_rows_for_company(eligible, claimed_by)
+        if to_status == 'completed':
+            newly_collected = list(
+                EWasteItem.objects.filter(id__in=item_ids, is_collected=False).values_list('id', flat=True)
+            )
+            EWasteItem.objects.filter(id__in=newly_collected).update(is_collected=True, updated_at=now)
+            impact.record_collections(EWasteItem.objects.filter(id__in=newly_collected))
+            heatmap.record_collections(EWasteItem.objects.filter(id__in=newly_collected))
+
+        if changed:
+            changed_ids = {row[0] for row in changed}
+            changed = [row for row in eligible if row[0] in changed_ids]
+            audit.record_transitions([(row[0], row[1]) for row in changed], to_status, actor=actor, when=now)
+            tenancy.record_transitions([(row[4], row[1]) for row in changed], to_status)
+        if to_status == 'cancelled':
+            slots.release([row[5] for row in changed])
+
+        _notify_assignees(eligible, actor, to_status, assign_to)
+
+        if to_status in audit.FINAL_STATUSES:
+            transaction.on_commit(lambda: [dedup.unindex_item(item_id) for item_id in item_ids])
+    return eligible_ids, skipped
+
+
+def _move_bookings(rows, day):
+    """
+    Bulk variant of _sync_booking: book `day` for the rows (see
+    bulk_update_pickups) not already booked on it, one UPDATE per area
+    """
+    by_area = {}
+    for row in rows:
+        # Cancelled rows hold no place, whatever their slot says
+        if row[1] == 'cancelled' or row[7] != day:
+            by_area.setdefault(row[6], []).append(row)
+    for area, moving in by_area.items():
+        slot_id = slots.book(day, area, places=len(moving))
+        PickupRequest.objects.filter(id__in=[row[0] for row in moving]).update(slot_id=slot_id)
+        slots.release([row[5] for row in moving if row[1] != 'cancelled'])
+
+
+def _claim_rows_for_company(rows, company_id):
+    """
+    Bulk variant of _claim_for_company for (id, status, item_id, assignee_id,
+    company_id, slot_id, ...) rows; returns the rows with the claimed company filled in
+    """
+    unclaimed = [row for row in rows if row[4] is None]
+    if not unclaimed:
+        return rows
+    PickupRequest.objects.filter(id__in=[row[0] for row in unclaimed]).update(company_id=company_id)
+    EWasteItem.objects.filter(id__in=[row[2] for row in unclaimed]).update(company_id=company_id)
+    deltas = {(company_id, tenancy.ITEMS_COUNTER): len(unclaimed)}
+    for row in unclaimed:
+        key = (company_id, tenancy.status_counter(row[1]))
+        deltas[key] = deltas.get(key, 0) + 1
+    tenancy.bump(deltas)
+    return [row if row[4] is not None else row[:4] + (company_id,) + row[5:] for row in rows]
+
+
+def _notify_assignees(rows, actor, to_status, assign_to):
+    """
+    One notification per affected assignee other than the actor, in one
+    INSERT; `actor` is None for system changes such as duplicate merging
+    """
+    counts = {}
+    for row in rows:
+        assignee_id = assign_to.pk if assign_to is not None else row[3]
+        if assignee_id and (actor is None or assignee_id != actor.pk):
+            counts[assignee_id] = counts.get(assignee_id, 0) + 1
+
+    what = BULK_STATUS_LABELS.get(to_status, 'assigned to you' if assign_to is not None else 'updated')
+    url = reverse('manage_pickups')
+    Notification.objects.bulk_create([
+        Notification(
+            user_id=assignee_id,
+            message=f"{count} {'pickup' if count == 1 else 'pickups'} {what}"
+                    + (f" by {actor.username}." if actor is not None else "."),
+            url=url,
+        )
+        for assignee_id, count in counts.items()
+    ])
+
+
+PICKUP_EXPORT_FIELDS = (
+    ('id', 'Pickup ID'),
+    ('ewaste_item_id', 'Item ID'),
+    ('ewaste_item__item_name', 'Item'),
+    ('ewaste_item__user__username', 'Reported By'),
+    ('ewaste_item__pickup_location', 'Location'),
+    ('status', 'Status'),
+    ('assigned_to__username', 'Assigned To'),
+    ('scheduled_date', 'Scheduled Date'),
+    ('completed_date', 'Completed Date'),
+    ('created_at', 'Created At'),
+)
+
+
+def write_pickups_csv(queryset, out):
+    """Write pickups as CSV to a file-like object, streaming rows with .values()"""
+    writer = csv.writer(out)
+    writer.writerow([label for _, label in PICKUP_EXPORT_FIELDS])
+    fields = [field for field, _ in PICKUP_EXPORT_FIELDS]
+    for row in queryset.order_by('id').values_list(*fields).iterator(chunk_size=2000):
+        writer.writerow(row)
+
+
 def find_nearby_facilities(latitude, longitude, radius_km=10):
     """
     Find recycling facilities within a radius
@@ -106,9 +551,13 @@ def export_user_items_data(user):
     """
     Export user's items data for backup/report
     """
-    items = EWasteItem.objects.filter(user=user).values(
-        'id', 'item_name', 'category__name', 'condition', 'quantity',
-        'is_collected', 'created_at'
-    )
-    
-    return list(items)
+    fields = ('id', 'item_name', 'category_id', 'condition', 'quantity', 'is_collected', 'created_at')
+    items = EWasteItem.objects.filter(user=user).values(*fields)
+    archived = ArchivedItem.objects.filter(user=user).values(*fields)
+
+    rows = []
+    for queryset in (items, archived):
+        for item in queryset:
+            item['category__name'] = categories.name_for(item.pop('category_id'))
+            rows.append(item)
+    return rows
@@ -0,0 +1,114 @@
+"""
+Session storage and the per-session role snapshot.
+
+settings.SESSION_ENGINE is cached_db when a shared cache (Redis or
+Memcached) is configured, with the sessions kept in their own key space
+(settings.SESSION_CACHE_ALIAS) so other cached data cannot evict them: a
+request whose session is cached reads no session row, and only logins,
+logouts and session writes touch django_session. Without a shared cache it
+is the plain database engine, since a per-process cache would keep serving a
+session after another process ended it. DJANGO_SESSION_ENGINE can select
+signed_cookies instead, which needs no table at all.
+
+RoleSnapshotMiddleware keeps the fields of the user's profile that views
+check (is_company, company) in the session and hands them to request.user as
+its cached `profile`, so `getattr(request.user, 'profile', None)` is answered
+without a query. A snapshot carries the user's role token from the shared
+cache; saving or deleting a profile replaces the token (see signals.py),
+which makes every session of that user, in any process, reload the profile
+on its next request. Without a shared cache a token change could not reach
+the other processes, so the middleware stays out of the way and the profile
+is read from the database when a view needs it.
+
+clear_expired() deletes expired session rows in small batches so cleanup
+never holds a long lock on a busy table; the clear_expired_sessions job runs
+it hourly.
+"""
+from importlib import import_module
+from uuid import uuid4
+
+from django.conf import settings
+from django.contrib.auth.middleware import get_user
+from django.contrib.auth.models import User
+from django.contrib.sessions.backends.db import SessionStore as DatabaseSessionStore
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+from django.utils import timezone
+from django.utils.functional import SimpleLazyObject
+
+from .models import UserProfile
+
+
+ROLE_SESSION_KEY = '_ewaste_role'
+
+ROLE_FIELDS = ('id', 'is_company', 'company_id', 'email_frequency')
+
+
+def _token_key(user_id):
+    return f'ewaste:role_token:{user_id}'
+
+
+def invalidate_roles(user_ids):
+    """Make the role snapshots of these users stale in every session"""
+    if not getattr(settings, 'SHARED_CACHE', False):
+        return
+    cache.set_many({_token_key(user_id): uuid4().hex for user_id in user_ids}, timeout=None)
+
+
+def _role_token(user_id):
+    # A missing token (never set, or evicted) is replaced by a new one, so a
+    # snapshot is only trusted while the token it was taken with is cached.
+    return cache.get_or_set(_token_key(user_id), lambda: uuid4().hex, timeout=None)
+
+
+def _load_role(user_id, token):
+    profile = UserProfile.objects.filter(user_id=user_id).values(*ROLE_FIELDS).first()
+    return {'token': token, 'profile': profile}
+
+
+def with_role(request, user):
+    """`user` with its profile taken from the session snapshot, refreshed if stale"""
+    if not user.is_authenticated:
+        return user
+    token = _role_token(user.pk)
+    role = request.session.get(ROLE_SESSION_KEY)
+    if not role or role.get('token') != token:
+        role = _load_role(user.pk, token)
+        request.session[ROLE_SESSION_KEY] = role
+    # Snapshot profiles are for reading: they lack created_at and are never saved
+    profile = UserProfile(user=user, **role['profile']) if role['profile'] else None
+    User.profile.related.set_cached_value(user, profile)
+    return user
+
+
+class RoleSnapshotMiddleware:
+    """Give request.user its profile from the session; goes after AuthenticationMiddleware"""
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'SHARED_CACHE', False):
+            raise MiddlewareNotUsed("Role snapshots need a shared cache.")
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.user = SimpleLazyObject(lambda: with_role(request, get_user(request)))
+        return self.get_response(request)
+
+
+def clear_expired(batch_size=1000):
+    """
+    Delete expired sessions `batch_size` rows at a time. Returns the number
+    of rows deleted; engines without a table clean up after themselves.
+    """
+    store = import_module(settings.SESSION_ENGINE).SessionStore
+    if not issubclass(store, DatabaseSessionStore):
+        store.clear_expired()
+        return 0
+
+    model = store.get_model_class()
+    expired = model.objects.filter(expire_date__lt=timezone.now()).values_list('pk', flat=True)
+    deleted = 0
+    while True:
+        keys = list(expired[:batch_size])
+        if not keys:
+            return deleted
+        deleted += model.objects.filter(pk__in=keys).delete()[0]
@@ -1,17 +1,16 @@
-from django.db.models.signals import post_save
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
-from django.core.mail import send_mail
-from django.conf import settings
 from django.urls import reverse
 
 from django.contrib.auth.models import User
-from .models import PickupRequest, Notification, Company
+from .models import PickupRequest, Notification, Company, CompanySubscription, EWasteCategory, EWasteItem, PickupSlot, RecyclingFacility, UserProfile
 
 
 @receiver(post_save, sender=PickupRequest)
 def pickup_request_created(sender, instance, created, **kwargs):
-    """When a PickupRequest is created, notify staff users and company contacts."""
-    if not created:
+    """When a PickupRequest is created, notify staff users and subscribed companies."""
+    if not created or instance.status == 'cancelled':
         return
 
     message = f"New pickup reported: {instance.ewaste_item.item_name} by {instance.ewaste_item.user.username}."
@@ -19,23 +18,21 @@ def pickup_request_created(sender, instance, created, **kwargs):
 
     # Create in-app notifications for staff users
     staff_users = User.objects.filter(is_staff=True)
-    for u in staff_users:
-        Notification.objects.create(user=u, message=message, url=url)
+    Notification.objects.bulk_create([
+        Notification(user_id=user_id, message=message, url=url)
+        for user_id in staff_users.values_list('id', flat=True)
+    ])
 
-    # Prepare email recipients (staff + company contacts)
-    recipient_list = list(staff_users.values_list('email', flat=True))
-    companies = Company.objects.all()
-    recipient_list += [c.contact_email for c in companies if c.contact_email]
-    recipient_list = [e for e in recipient_list if e]
-
-    if recipient_list:
-        subject = "New e-waste pickup reported"
-        from_email = getattr(settings, 'DEFAULT_FROM_EMAIL', 'noreply@localhost')
-        try:
-            send_mail(subject, message, from_email, recipient_list, fail_silently=True)
-        except Exception:
-            # Fail silently so app won't break if mail is not configured
-            pass
+    # Email staff, the routed company and subscribed companies, each now or
+    # in their next digest depending on their email frequency
+    from .digests import deliver
+    from .subscriptions import contacts, matching_companies
+    company_ids = matching_companies(instance.ewaste_item)
+    if instance.company_id is not None:
+        company_ids.add(instance.company_id)
+    recipients = list(staff_users.values_list('email', 'profile__email_frequency'))
+    recipients += contacts(company_ids)
+    deliver("New e-waste pickup reported", message, recipients, url=url)
 
 
 # Auto-create a UserProfile whenever a new User is created
@@ -45,3 +42,94 @@ def create_user_profile(sender, instance, created, **kwargs):
         # Import here to avoid circular import issues
         from .models import UserProfile
         UserProfile.objects.create(user=instance)
+
+
+@receiver(post_save, sender=UserProfile)
+@receiver(post_delete, sender=UserProfile)
+def profile_changed(sender, instance, **kwargs):
+    """The user's role may have changed; drop the snapshot kept in their sessions."""
+    from .sessions import invalidate_roles
+    invalidate_roles([instance.user_id])
+
+
+@receiver(post_save, sender=Company)
+@receiver(post_delete, sender=Company)
+def company_changed(sender, instance, created=False, raw=False, **kwargs):
+    """Service regions or contacts may have changed; rebuild the indexes."""
+    from . import subscriptions, tenancy
+    if created and not raw:
+        # Like the companies that predate subscriptions, a new company hears
+        # about every pickup until its subscriptions are narrowed
+        CompanySubscription.objects.create(company=instance)
+    tenancy.invalidate()
+    subscriptions.invalidate()
+
+
+@receiver(post_save, sender=CompanySubscription)
+@receiver(post_delete, sender=CompanySubscription)
+def subscription_changed(sender, instance, **kwargs):
+    from .subscriptions import invalidate
+    invalidate()
+
+
+@receiver(post_save, sender=PickupSlot)
+@receiver(post_delete, sender=PickupSlot)
+def slot_changed(sender, instance, **kwargs):
+    """A capacity was edited; drop the cached calendar of its area."""
+    from .slots import invalidate_calendar
+    invalidate_calendar(instance.area)
+
+
+@receiver(post_save, sender=EWasteCategory)
+@receiver(post_delete, sender=EWasteCategory)
+def category_changed(sender, instance, **kwargs):
+    """Invalidate the in-process category registry when a category changes."""
+    from .categories import invalidate
+    invalidate()
+
+
+@receiver(post_save, sender=EWasteItem)
+def index_reported_item(sender, instance, created, **kwargs):
+    """Keep the duplicate-report index and the heatmap in sync with items."""
+    from .dedup import index_item
+    index_item(instance)
+    if created:
+        from .heatmap import record_report
+        record_report(instance)
+
+
+@receiver(post_delete, sender=EWasteItem)
+def unindex_deleted_item(sender, instance, **kwargs):
+    from .archive import is_archiving
+    from .dedup import unindex_item
+    from .heatmap import record_removal
+    unindex_item(instance.pk)
+    if not is_archiving():
+        # Archived items still count on the map
+        record_removal(instance)
+
+
+@receiver(post_delete, sender=EWasteItem)
+@receiver(post_delete, sender=PickupRequest)
+@receiver(post_delete, sender=Notification)
+@receiver(post_delete, sender=RecyclingFacility)
+def leave_tombstone(sender, instance, **kwargs):
+    """Delta sync clients have to learn the row is gone (see tombstones.py)."""
+    from .tombstones import record_deleted
+    record_deleted(sender, instance)
+
+
+@receiver(post_save, sender=PickupRequest)
+def unindex_closed_pickup(sender, instance, **kwargs):
+    """Completed or cancelled pickups can no longer be duplicated."""
+    if instance.status in ('completed', 'cancelled'):
+        from .dedup import unindex_item
+        unindex_item(instance.ewaste_item_id)
+
+
+@receiver(connection_created)
+def count_queries(sender, connection, **kwargs):
+    """Count queries and lock errors of every connection when DB_METRICS is on (see dbmetrics.py)."""
+    from . import dbmetrics
+    if dbmetrics.ENABLED:
+        dbmetrics.install(connection)
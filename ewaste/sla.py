@@ -0,0 +1,96 @@
+"""
+Stale-pickup SLA monitor.
+
+A pickup is overdue once it is still pending or scheduled after its due_at
+(the scheduled date, or the end of the customer's preferred date). due_at is
+stored on the row and indexed together with status, so every scan here is an
+index range query over the open statuses only.
+"""
+from django.contrib.auth.models import User
+from django.db.models import Count, Min, Q
+from django.urls import reverse
+from django.utils import timezone
+
+from .digests import deliver
+from .models import Notification, PickupRequest
+
+
+OPEN_STATUSES = ['pending', 'scheduled']
+ESCALATION_BATCH_SIZE = 500
+
+
+def overdue_pickups(now=None):
+    now = now or timezone.now()
+    return PickupRequest.objects.filter(status__in=OPEN_STATUSES, due_at__lt=now)
+
+
+def overdue_summary(now=None, limit=10):
+    """Count of overdue pickups and the `limit` most overdue ones"""
+    overdue = overdue_pickups(now)
+    return {
+        'count': overdue.count(),
+        'oldest': list(
+            overdue.select_related('ewaste_item', 'assigned_to').order_by('due_at')[:limit]
+        ),
+    }
+
+
+def assignee_backlog(now=None):
+    """Open, overdue and oldest-due pickups per assignee, in one grouped query"""
+    now = now or timezone.now()
+    return list(
+        PickupRequest.objects.filter(status__in=OPEN_STATUSES)
+        .values('assigned_to', 'assigned_to__username')
+        .annotate(
+            open_count=Count('id'),
+            overdue_count=Count('id', filter=Q(due_at__lt=now)),
+            oldest_due=Min('due_at'),
+        )
+        .order_by('-overdue_count', '-open_count')
+    )
+
+
+def escalate_overdue(now=None, batch_size=ESCALATION_BATCH_SIZE):
+    """
+    Mark newly overdue pickups as escalated and notify staff and assignees.
+
+    Each batch costs one index range read, one UPDATE and one bulk INSERT of
+    notifications (one per staff user plus one per assignee), however many
+    pickups it covers. Returns the number of pickups escalated.
+    """
+    now = now or timezone.now()
+    escalated = 0
+    url = reverse('manage_pickups')
+    staff = list(User.objects.filter(is_staff=True, is_active=True).values_list('id', 'email', 'profile__email_frequency'))
+
+    while True:
+        batch = list(
+            PickupRequest.objects.filter(
+                status__in=OPEN_STATUSES, escalated_at__isnull=True, due_at__lt=now
+            ).order_by('due_at').values_list('id', 'assigned_to')[:batch_size]
+        )
+        if not batch:
+            break
+        ids = [pickup_id for pickup_id, _ in batch]
+        PickupRequest.objects.filter(id__in=ids).update(escalated_at=now)
+
+        per_assignee = {}
+        for _, assignee_id in batch:
+            if assignee_id is not None:
+                per_assignee[assignee_id] = per_assignee.get(assignee_id, 0) + 1
+
+        message = f"{len(batch)} pickup(s) are past their due date and still open."
+        notifications = [Notification(user_id=user_id, message=message, url=url) for user_id, _, _ in staff]
+        notifications += [
+            Notification(user_id=assignee_id, url=url,
+                         message=f"{count} of your assigned pickup(s) are overdue.")
+            for assignee_id, count in per_assignee.items()
+        ]
+        Notification.objects.bulk_create(notifications)
+
+        deliver("Overdue e-waste pickups", message, [(email, frequency) for _, email, frequency in staff], url=url)
+
+        escalated += len(batch)
+        if len(batch) < batch_size:
+            break
+    return escalated
@@ -0,0 +1,138 @@
+"""
+Pickup slot booking.
+
+Every day in every service area (the item's region_key) has a PickupSlot
+row holding its capacity and how many pickups are booked. Unrouted pickups
+(area '') belong to no service area, so they take no place and are not
+limited; staff plan those by hand.
+Booking is one conditional UPDATE ... SET booked = booked + 1 WHERE booked <
+capacity, so concurrent reports can never oversubscribe a day, and
+cancelling gives the place back. Scheduling a pickup for another day moves
+its booking there (move()); the old place is only given back once the new
+one is taken. Availability is read from the slot rows of
+the requested range, never by counting pickups, and is cached per area for a
+short time; a failed booking drops the cached calendar of its area.
+"""
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import F
+from django.utils import timezone
+
+from .models import PickupSlot
+from .tenancy import route
+
+
+DEFAULT_CAPACITY = getattr(settings, 'PICKUP_SLOT_CAPACITY', 20)
+BOOKING_DAYS = getattr(settings, 'PICKUP_BOOKING_DAYS', 30)
+CALENDAR_CACHE_SECONDS = getattr(settings, 'PICKUP_CALENDAR_CACHE_SECONDS', 60)
+
+
+class SlotFull(Exception):
+    def __init__(self, day, area=''):
+        super().__init__(f"No pickups left on {day} in {area or 'this area'}.")
+        self.day = day
+        self.area = area
+
+
+def area_for(location):
+    """Service area of a pickup address"""
+    return route(location)[1]
+
+
+def booking_window(today=None):
+    """First and last day that can be booked"""
+    today = today or timezone.localdate()
+    return today, today + timedelta(days=BOOKING_DAYS - 1)
+
+
+def book(day, area='', places=1):
+    """
+    Take `places` places on `day` in `area`; returns the slot id (None for
+    the unrouted area '') or raises SlotFull
+    """
+    if not area:
+        return None
+    PickupSlot.objects.bulk_create([PickupSlot(date=day, area=area, capacity=DEFAULT_CAPACITY)], ignore_conflicts=True)
+    slot = PickupSlot.objects.filter(date=day, area=area)
+    if not slot.filter(booked__lte=F('capacity') - places).update(booked=F('booked') + places):
+        invalidate_calendar(area)
+        raise SlotFull(day, area)
+    return slot.values_list('id', flat=True).get()
+
+
+def move(slot_id, day, area=''):
+    """
+    Book `day` in `area` for a pickup holding `slot_id` and give the old place
+    back; returns the new slot id. Raises SlotFull with the old booking kept.
+    """
+    if not area:
+        release([slot_id])
+        return None
+    if slot_id is not None and PickupSlot.objects.filter(id=slot_id, date=day, area=area).exists():
+        return slot_id
+    new_slot_id = book(day, area)
+    release([slot_id])
+    return new_slot_id
+
+
+def release(slot_ids):
+    """Give back one place per occurrence of each slot id"""
+    by_count = {}
+    for slot_id, count in Counter(slot_id for slot_id in slot_ids if slot_id is not None).items():
+        by_count.setdefault(count, []).append(slot_id)
+    for count, ids in by_count.items():
+        PickupSlot.objects.filter(id__in=ids, booked__gte=count).update(booked=F('booked') - count)
+
+
+def _version_key(area):
+    return f'ewaste:slot_calendar_version:{area}'
+
+
+def invalidate_calendar(area):
+    try:
+        cache.incr(_version_key(area))
+    except ValueError:
+        cache.set(_version_key(area), 2, timeout=None)
+
+
+def calendar(area='', start=None, days=None):
+    """
+    Availability of `days` days from `start` in `area` as a list of
+    {'date', 'capacity', 'booked', 'available'} dicts; empty for the unrouted
+    area '', which has no limit
+    """
+    if not area:
+        return []
+    first, last = booking_window()
+    start = max(start or first, first)
+    days = min(days or BOOKING_DAYS, (last - start).days + 1)
+    if days <= 0:
+        return []
+
+    version = cache.get_or_set(_version_key(area), 1, timeout=None)
+    key = f'ewaste:slot_calendar:{area}:{version}:{start.isoformat()}:{days}'
+    result = cache.get(key)
+    if result is not None:
+        return result
+
+    end = start + timedelta(days=days - 1)
+    rows = {
+        day: (capacity, booked)
+        for day, capacity, booked in PickupSlot.objects.filter(area=area, date__range=(start, end))
+        .values_list('date', 'capacity', 'booked')
+    }
+    result = []
+    for offset in range(days):
+        day = start + timedelta(days=offset)
+        capacity, booked = rows.get(day, (DEFAULT_CAPACITY, 0))
+        result.append({
+            'date': day.isoformat(),
+            'capacity': capacity,
+            'booked': booked,
+            'available': max(capacity - booked, 0),
+        })
+    cache.set(key, result, CALENDAR_CACHE_SECONDS)
+    return result
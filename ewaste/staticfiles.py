@@ -0,0 +1,227 @@
+"""
+Static asset pipeline.
+
+`collectstatic` with CompressedManifestStaticFilesStorage minifies CSS and JS,
+writes content-hashed copies (style.3f2a9c.css) and stores .gz and, when the
+`brotli` package is installed, .br siblings of every text asset. Templates
+keep using {% static %}, which resolves to the hashed name.
+
+StaticFilesMiddleware serves STATIC_ROOT from the app: hashed files get a
+year-long immutable Cache-Control, and the precompressed variant matching the
+client's Accept-Encoding is sent, so nothing is compressed per request.
+"""
+import gzip
+import mimetypes
+import os
+import re
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.base import ContentFile
+from django.http import FileResponse, HttpResponseNotModified
+from django.utils._os import safe_join
+from django.utils.cache import patch_vary_headers
+from django.utils.http import http_date, parse_http_date_safe
+
+try:
+    import brotli
+except ImportError:  # optional: only gzip variants are written
+    brotli = None
+
+
+COMPRESS_EXTENSIONS = ('.css', '.js', '.svg', '.txt', '.html', '.json', '.map')
+COMPRESS_MIN_SIZE = 256
+IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60
+MUTABLE_MAX_AGE = 60
+
+_CSS_COMMENT_RE = re.compile(r'/\*.*?\*/', re.S)
+_CSS_TOKEN_RE = re.compile(r'''"(?:\\.|[^"\\])*"|'(?:\\.|[^'\\])*'|[{};]|[^{};"']+|.''', re.S)
+_CSS_SPACE_RE = re.compile(r'\s+')
+_CSS_PUNCT_RE = re.compile(r'\s*([,>])\s*')
+_CSS_COLON_RE = re.compile(r'\s*:\s*')
+_HASHED_NAME_RE = re.compile(r'\.[0-9a-f]{12}\.')
+
+
+def _minify_css_segment(parts, declaration):
+    minified = []
+    for part in parts:
+        if len(part) > 1 and part[0] in '"\'':
+            minified.append(part)
+            continue
+        part = _CSS_PUNCT_RE.sub(r'\1', _CSS_SPACE_RE.sub(' ', part))
+        if declaration:
+            part = _CSS_COLON_RE.sub(':', part)
+        minified.append(part)
+    return ''.join(minified).strip()
+
+
+def minify_css(text):
+    """
+    Drop comments and collapse whitespace. Quoted strings are kept as they
+    are, and whitespace around ':' only goes in declarations: in a selector,
+    `a :hover` and `a:hover` mean different things.
+    """
+    out = []
+    segment = []
+    for token in _CSS_TOKEN_RE.findall(_CSS_COMMENT_RE.sub('', text)):
+        if token not in ('{', ';', '}'):
+            segment.append(token)
+            continue
+        # A segment ending in '{' is a selector or an at-rule prelude
+        minified = _minify_css_segment(segment, declaration=token != '{')
+        segment = []
+        if token == '}' and not minified and out and out[-1] == ';':
+            out.pop()
+        out += [minified, token]
+    out.append(_minify_css_segment(segment, declaration=False))
+    return ''.join(out)
+
+
+def minify_js(text):
+    """
+    Conservative JS minification: drop indentation, blank lines and whole-line
+    // comments. Line breaks are kept so automatic semicolon insertion and
+    string/regex literals are never affected.
+    """
+    lines = []
+    for line in text.splitlines():
+        line = line.strip()
+        if line and not line.startswith('//'):
+            lines.append(line)
+    return '\n'.join(lines) + '\n'
+
+
+MINIFIERS = {'.css': minify_css, '.js': minify_js}
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    # Fall back to the unhashed name instead of failing when collectstatic
+    # has not been run (tests, fresh checkouts)
+    manifest_strict = False
+
+    def _save(self, name, content):
+        minify = MINIFIERS.get(os.path.splitext(name)[1])
+        if minify is not None and not name.endswith(('.min.css', '.min.js')):
+            content.seek(0)
+            text = content.read().decode('utf-8')
+            content = ContentFile(minify(text).encode('utf-8'))
+        return super()._save(name, content)
+
+    def post_process(self, paths, dry_run=False, **options):
+        written = set()
+        for original_name, processed_name, processed in super().post_process(paths, dry_run, **options):
+            if not isinstance(processed, Exception) and processed_name:
+                written.add(processed_name)
+                written.add(original_name)
+            yield original_name, processed_name, processed
+        if not dry_run:
+            for name in sorted(written):
+                self._write_compressed(name)
+
+    def _write_compressed(self, name):
+        if not name.endswith(COMPRESS_EXTENSIONS) or not self.exists(name):
+            return
+        with self.open(name) as source:
+            data = source.read()
+        if len(data) < COMPRESS_MIN_SIZE:
+            return
+        variants = [('.gz', gzip.compress(data, compresslevel=9, mtime=0))]
+        if brotli is not None:
+            variants.append(('.br', brotli.compress(data)))
+        for suffix, compressed in variants:
+            if len(compressed) >= len(data):
+                continue
+            if self.exists(name + suffix):
+                self.delete(name + suffix)
+            super()._save(name + suffix, ContentFile(compressed))
+
+
+def _accepted_encodings(request):
+    header = request.META.get('HTTP_ACCEPT_ENCODING', '')
+    accepted = set()
+    for part in header.split(','):
+        coding, _, params = part.strip().partition(';')
+        if params.replace(' ', '') in ('q=0', 'q=0.0', 'q=0.00', 'q=0.000'):
+            continue
+        accepted.add(coding.strip().lower())
+    return accepted
+
+
+class _StaticFile:
+    __slots__ = ('path', 'content_type', 'variants', 'immutable')
+
+    def __init__(self, path, immutable):
+        self.path = path
+        self.content_type = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+        self.immutable = immutable
+        self.variants = {
+            encoding: path + suffix
+            for encoding, suffix in (('br', '.br'), ('gzip', '.gz'))
+            if os.path.isfile(path + suffix)
+        }
+
+
+class StaticFilesMiddleware:
+    """Serve collected static files with long-lived caching and precompression"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.prefix = settings.STATIC_URL if settings.STATIC_URL.startswith('/') else '/' + settings.STATIC_URL
+        self.root = str(settings.STATIC_ROOT) if settings.STATIC_ROOT else None
+        self.enabled = bool(self.root) and getattr(settings, 'SERVE_STATIC', not settings.DEBUG)
+        self._files = {}
+
+    def __call__(self, request):
+        if self.enabled and request.method in ('GET', 'HEAD') and request.path.startswith(self.prefix):
+            static_file = self._find(request.path[len(self.prefix):])
+            if static_file is not None:
+                return self._serve(request, static_file)
+        return self.get_response(request)
+
+    def _find(self, name):
+        if name in self._files:
+            return self._files[name]
+        try:
+            path = safe_join(self.root, name)
+        except SuspiciousFileOperation:
+            return None
+        static_file = None
+        if os.path.isfile(path):
+            static_file = _StaticFile(path, immutable=bool(_HASHED_NAME_RE.search(os.path.basename(name))))
+        if static_file is not None or len(self._files) < 10000:
+            self._files[name] = static_file
+        return static_file
+
+    def _serve(self, request, static_file):
+        path, encoding = static_file.path, None
+        accepted = _accepted_encodings(request)
+        for candidate in ('br', 'gzip'):
+            if candidate in accepted and candidate in static_file.variants:
+                path, encoding = static_file.variants[candidate], candidate
+                break
+
+        stat = os.stat(path)
+        etag = f'"{int(stat.st_mtime):x}-{stat.st_size:x}"'
+        if static_file.immutable:
+            cache_control = f'public, max-age={IMMUTABLE_MAX_AGE}, immutable'
+        else:
+            cache_control = f'public, max-age={MUTABLE_MAX_AGE}'
+
+        if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+        if_modified_since = parse_http_date_safe(request.META.get('HTTP_IF_MODIFIED_SINCE', ''))
+        if (if_none_match and etag in if_none_match) or (
+            not if_none_match and if_modified_since and int(stat.st_mtime) <= if_modified_since
+        ):
+            response = HttpResponseNotModified()
+        else:
+            response = FileResponse(open(path, 'rb'), content_type=static_file.content_type)
+            response['Content-Length'] = str(stat.st_size)
+            if encoding:
+                response['Content-Encoding'] = encoding
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(stat.st_mtime)
+        response['Cache-Control'] = cache_control
+        if static_file.variants:
+            patch_vary_headers(response, ('Accept-Encoding',))
+        return response
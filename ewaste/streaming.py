@@ -0,0 +1,108 @@
+"""
+Streamed rendering for long list pages.
+
+The page template is rendered once around a marker. The rows are then read
+with a server-side iterator and rendered chunk by chunk between the halves,
+so the first bytes go out before the query finishes and at most one chunk of
+rows is held in memory. Pages stop after STREAM_PAGE_ROWS rows and leave a
+sentinel that main.js uses to fetch the rest as JSON fragments.
+"""
+from django.conf import settings
+from django.http import JsonResponse, StreamingHttpResponse
+from django.template.loader import get_template
+from django.utils.safestring import mark_safe
+
+
+ROWS_MARKER = '<!--stream-rows-->'
+
+STREAM_PAGE_ROWS = getattr(settings, 'STREAM_PAGE_ROWS', 500)
+STREAM_CHUNK_ROWS = getattr(settings, 'STREAM_CHUNK_ROWS', 100)
+FRAGMENT_ROWS = getattr(settings, 'FRAGMENT_ROWS', 50)
+
+
+def _keyset(queryset, order, after):
+    """Order by id and continue after the cursor"""
+    descending = order.startswith('-')
+    queryset = queryset.order_by(order)
+    if after:
+        try:
+            after = int(after)
+        except (TypeError, ValueError):
+            return queryset.none()
+        queryset = queryset.filter(id__lt=after) if descending else queryset.filter(id__gt=after)
+    return queryset
+
+
+def _next_url(request, cursor):
+    params = request.GET.copy()
+    params['format'] = 'fragment'
+    params['after'] = cursor
+    return f"{request.path}?{params.urlencode()}"
+
+
+def _render_rows(row_template, rows, request):
+    return row_template.render({'rows': rows}, request)
+
+
+def _stream_rows(request, queryset, row_template, limit, chunk_size):
+    """
+    Yield (html, None) for each rendered chunk of up to `limit` rows, then
+    (None, cursor) where cursor is the id of the last row sent if more rows
+    remain, otherwise None.
+    """
+    chunk = []
+    last_id = None
+    sent = 0
+    for obj in queryset[:limit + 1].iterator(chunk_size=chunk_size):
+        if sent == limit:
+            if chunk:
+                yield _render_rows(row_template, chunk, request), None
+            yield None, last_id
+            return
+        chunk.append(obj)
+        last_id = obj.id
+        sent += 1
+        if len(chunk) == chunk_size:
+            yield _render_rows(row_template, chunk, request), None
+            chunk = []
+    if chunk:
+        yield _render_rows(row_template, chunk, request), None
+    yield None, None
+
+
+def stream_list(request, template_name, context, queryset, row_template_name, order='-id',
+                sentinel_template_name='partials/infinite_sentinel.html'):
+    """
+    Stream `template_name` with the rows of `queryset` rendered through
+    `row_template_name` in place of the `stream_rows` context variable.
+
+    With ?format=fragment, return the next batch of rows after ?after=<id> as
+    JSON instead: {"html": ..., "next": url or null}.
+    """
+    row_template = get_template(row_template_name)
+    queryset = _keyset(queryset, order, request.GET.get('after'))
+
+    if request.GET.get('format') == 'fragment':
+        rows = list(queryset[:FRAGMENT_ROWS + 1])
+        more = len(rows) > FRAGMENT_ROWS
+        rows = rows[:FRAGMENT_ROWS]
+        return JsonResponse({
+            'html': _render_rows(row_template, rows, request),
+            'next': _next_url(request, rows[-1].id) if more else None,
+        })
+
+    context = dict(context, stream_rows=mark_safe(ROWS_MARKER), has_rows=queryset.exists())
+    page = get_template(template_name).render(context, request)
+    head, _, tail = page.partition(ROWS_MARKER)
+    sentinel_template = get_template(sentinel_template_name)
+
+    def generate():
+        yield head
+        for html, cursor in _stream_rows(request, queryset, row_template, STREAM_PAGE_ROWS, STREAM_CHUNK_ROWS):
+            if html:
+                yield html
+            elif cursor:
+                yield sentinel_template.render({'next_url': _next_url(request, cursor)})
+        yield tail
+
+    return StreamingHttpResponse(generate(), content_type='text/html; charset=utf-8')
@@ -0,0 +1,110 @@
+"""
+Company subscriptions to new pickups.
+
+Each CompanySubscription is filed in an in-process index under its most
+selective criterion: geohash cell, region token, category, condition, or the
+catch-all bucket. Resolving the companies interested in an item looks up the
+item's enclosing geohash cells, address tokens, category and condition, and
+checks the remaining criteria of only the subscriptions found there, so the
+cost follows the number of candidate subscriptions rather than the number of
+companies. The index is rebuilt when its version number changes (bumped
+whenever a subscription or company is saved, see signals.py and versions.py).
+"""
+import threading
+from collections import namedtuple
+
+from . import geo, versions
+from .dedup import normalize_address
+from .models import Company, CompanySubscription
+
+
+VERSION_CACHE_KEY = 'ewaste:subscription_index_version'
+
+ANY = ('any',)
+
+_Entry = namedtuple('_Entry', 'company_id category_id condition geohash_prefix region_tokens')
+
+_lock = threading.Lock()
+_state = {'version': None, 'buckets': {}, 'contacts': {}}
+
+
+def invalidate():
+    """Bump the subscription index version so processes reload it"""
+    versions.bump(VERSION_CACHE_KEY)
+    with _lock:
+        _state['version'] = None
+
+
+def _bucket_key(entry):
+    if entry.geohash_prefix:
+        return ('geo', entry.geohash_prefix)
+    if entry.region_tokens:
+        return ('region', max(entry.region_tokens, key=lambda t: (len(t), t)))
+    if entry.category_id is not None:
+        return ('category', entry.category_id)
+    if entry.condition:
+        return ('condition', entry.condition)
+    return ANY
+
+
+def _load():
+    buckets = {}
+    rows = CompanySubscription.objects.values_list(
+        'company_id', 'category_id', 'condition', 'geohash_prefix', 'region'
+    ).order_by('id')
+    for company_id, category_id, condition, geohash_prefix, region in rows:
+        entry = _Entry(company_id, category_id, condition, geohash_prefix.strip().lower(), normalize_address(region))
+        buckets.setdefault(_bucket_key(entry), []).append(entry)
+    contacts = {
+        company_id: (email, frequency)
+        for company_id, email, frequency in Company.objects.values_list('id', 'contact_email', 'email_frequency')
+    }
+    return buckets, contacts
+
+
+def _index():
+    version = versions.current(VERSION_CACHE_KEY)
+    if _state['version'] != version:
+        with _lock:
+            if _state['version'] != version:
+                _state['buckets'], _state['contacts'] = _load()
+                _state['version'] = version
+    return _state
+
+
+def _matches(entry, item, address_tokens):
+    if entry.category_id is not None and entry.category_id != item.category_id:
+        return False
+    if entry.condition and entry.condition != item.condition:
+        return False
+    if entry.geohash_prefix and not (item.geohash or '').startswith(entry.geohash_prefix):
+        return False
+    if entry.region_tokens and not entry.region_tokens <= address_tokens:
+        return False
+    return True
+
+
+def matching_companies(item):
+    """Ids of the companies subscribed to pickups of `item`"""
+    buckets = _index()['buckets']
+    address_tokens = normalize_address(item.pickup_location)
+
+    keys = [ANY, ('condition', item.condition)]
+    if item.category_id is not None:
+        keys.append(('category', item.category_id))
+    keys += [('region', token) for token in address_tokens]
+    if item.geohash:
+        keys += [('geo', cell) for cell in geo.prefixes(item.geohash)]
+
+    companies = set()
+    for key in keys:
+        for entry in buckets.get(key, ()):
+            if entry.company_id not in companies and _matches(entry, item, address_tokens):
+                companies.add(entry.company_id)
+    return companies
+
+
+def contacts(company_ids):
+    """(contact_email, email_frequency) of the given companies, from the index"""
+    known = _index()['contacts']
+    return [known[company_id] for company_id in sorted(company_ids) if company_id in known]
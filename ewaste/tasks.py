@@ -0,0 +1,81 @@
+"""
+Job handlers run by the `run_jobs` worker (see jobs.py).
+"""
+from django.conf import settings
+from django.core.mail import send_mail
+
+from .jobs import prune_finished_jobs, register_job
+
+
+@register_job('send_email')
+def send_email(subject, message, recipient_list):
+    """Send one email to a list of recipients"""
+    from_email = getattr(settings, 'DEFAULT_FROM_EMAIL', 'noreply@localhost')
+    send_mail(subject, message, from_email, recipient_list, fail_silently=False)
+
+
+@register_job('prune_notifications', every=24 * 60 * 60)
+def prune_notifications():
+    """
+    Move read notifications past ARCHIVE_AFTER_DAYS into the archive, which
+    keeps them (see archive.py)
+    """
+    from .archive import archive_notifications
+    archive_notifications()
+
+
+@register_job('reconcile_stats', every=6 * 60 * 60)
+def reconcile_stats():
+    """
+    Reconcile cached impact totals and company counters in case an
+    incremental update was missed (each rebuild locks its rows first)
+    """
+    from .impact import rebuild_impact
+    from .tenancy import rebuild_counters
+    rebuild_impact()
+    rebuild_counters()
+
+
+@register_job('prune_jobs', every=24 * 60 * 60)
+def prune_jobs():
+    prune_finished_jobs()
+
+
+@register_job('escalate_overdue_pickups', every=5 * 60)
+def escalate_overdue_pickups():
+    """Notify staff and assignees about pickups that just became overdue"""
+    from .sla import escalate_overdue
+    escalate_overdue()
+
+
+@register_job('compact_pickup_events', every=24 * 60 * 60)
+def compact_pickup_events():
+    """Roll old events of closed pickups up into monthly totals"""
+    from .audit import compact_events
+    compact_events()
+
+
+@register_job('send_hourly_digests', every=60 * 60)
+def send_hourly_digests():
+    from .digests import send_digests
+    send_digests('hourly')
+
+
+@register_job('send_daily_digests', every=24 * 60 * 60)
+def send_daily_digests():
+    from .digests import send_digests
+    send_digests('daily')
+
+
+@register_job('prune_tombstones', every=24 * 60 * 60)
+def prune_tombstones():
+    """Forget deleted row ids older than any delta sync still served"""
+    from .tombstones import prune
+    prune()
+
+
+@register_job('clear_expired_sessions', every=60 * 60)
+def clear_expired_sessions():
+    """Delete expired sessions in small batches"""
+    from .sessions import clear_expired
+    clear_expired()
@@ -0,0 +1,17 @@
+from django import template
+
+from ewaste import categories
+
+register = template.Library()
+
+
+@register.filter(name='category_name')
+def category_name(item):
+    """Return the item's category name from the category registry (no query)."""
+    return categories.name_for(getattr(item, 'category_id', None)) or ''
+
+
+@register.simple_tag
+def category_registry_version():
+    """Current category registry version, for fragment cache keys that show category names."""
+    return categories.current_version()
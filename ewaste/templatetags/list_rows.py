@@ -0,0 +1,33 @@
+from django import template
+
+register = template.Library()
+
+
+@register.inclusion_tag('partials/pickup_row.html')
+def pickup_row(pickup):
+    """One row of the manage-pickups table (fragment-cached by updated_at)."""
+    return {'pickup': pickup}
+
+
+@register.inclusion_tag('partials/item_card.html')
+def item_card(item):
+    """Card for one of the user's reported items (fragment-cached by updated_at)."""
+    return {'item': item}
+
+
+@register.inclusion_tag('partials/status_badge.html')
+def status_badge(item):
+    """Badge showing the pickup status of an item."""
+    pickup = getattr(item, 'pickup_request', None)
+    if pickup is None and getattr(item, 'pickup_status', None):
+        # Archived items keep their final pickup status on the row
+        return {
+            'status': item.pickup_status,
+            'status_display': item.get_pickup_status_display(),
+            'is_collected': item.is_collected,
+        }
+    return {
+        'status': pickup.status if pickup else None,
+        'status_display': pickup.get_status_display() if pickup else '',
+        'is_collected': item.is_collected,
+    }
@@ -0,0 +1,207 @@
+"""
+Company tenancy.
+
+Each item and pickup carries the partner company whose service region covers
+its pickup location, so company pages filter on an indexed company_id and do
+work proportional to that company's slice. Routing uses an in-process index
+of service region phrase -> company, rebuilt when its version number changes (bumped
+whenever a company is saved, see signals.py and versions.py). Per-company
+totals are kept in CompanyCounter rows updated with in-place increments.
+"""
+import threading
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import Count, F
+
+from . import versions
+from .dedup import address_words
+from .models import ArchivedItem, Company, CompanyCounter, EWasteItem, PickupRequest
+
+
+VERSION_CACHE_KEY = 'ewaste:region_index_version'
+
+ITEMS_COUNTER = 'items'
+
+REGION_KEY_LENGTH = EWasteItem._meta.get_field('region_key').max_length
+
+_lock = threading.Lock()
+_state = {'version': None, 'regions': ({}, 0)}
+
+
+def invalidate():
+    """Bump the region index version so processes reload it"""
+    versions.bump(VERSION_CACHE_KEY)
+    with _lock:
+        _state['version'] = None
+
+
+def _region_index():
+    version = versions.current(VERSION_CACHE_KEY)
+    if _state['version'] != version:
+        with _lock:
+            if _state['version'] != version:
+                regions = {}
+                for company_id, service_regions in Company.objects.exclude(service_regions='').values_list(
+                    'id', 'service_regions'
+                ).order_by('id'):
+                    for region in service_regions.split(','):
+                        words = address_words(region)
+                        if words:
+                            regions.setdefault(words, company_id)
+                # Kept with the longest phrase length so readers see one consistent pair
+                _state['regions'] = (regions, max(map(len, regions), default=0))
+                _state['version'] = version
+    return _state['regions']
+
+
+def route(address):
+    """
+    Return (company_id, region_key) for a pickup address, or (None, '') if no
+    company serves it. A service region matches when all of its normalized
+    words appear consecutively in the address, so "North City" does not catch
+    every address mentioning "north"; regions with more words (then longer
+    ones) win.
+    """
+    regions, longest = _region_index()
+    words = address_words(address)
+    best = None
+    for size in range(min(longest, len(words)), 0, -1):
+        for start in range(len(words) - size + 1):
+            phrase = words[start:start + size]
+            if phrase in regions:
+                key = ' '.join(phrase)
+                if best is None or len(key) > len(best[1]):
+                    best = (regions[phrase], key)
+        if best is not None:
+            return best[0], best[1][:REGION_KEY_LENGTH]
+    return None, ''
+
+
+def assign_region(item):
+    """Set item.company and item.region_key from its pickup location (not saved)"""
+    item.company_id, item.region_key = route(item.pickup_location)
+    return item
+
+
+def company_of(user):
+    """Company id of a company member, None for staff and customers"""
+    profile = getattr(user, 'profile', None)
+    return profile.company_id if profile and profile.is_company else None
+
+
+def status_counter(status):
+    return f'pickups:{status}'
+
+
+def bump(deltas):
+    """
+    Apply {(company_id, counter_name): delta} with one UPDATE per distinct
+    delta; rows are created on first use
+    """
+    deltas = {key: delta for key, delta in deltas.items() if key[0] is not None and delta}
+    if not deltas:
+        return
+    CompanyCounter.objects.bulk_create(
+        [CompanyCounter(company_id=company_id, name=name) for company_id, name in deltas],
+        ignore_conflicts=True,
+    )
+    by_delta = {}
+    for key, delta in deltas.items():
+        by_delta.setdefault(delta, []).append(key)
+    for delta, keys in by_delta.items():
+        for company_id in {company_id for company_id, _ in keys}:
+            names = [name for cid, name in keys if cid == company_id]
+            CompanyCounter.objects.filter(company_id=company_id, name__in=names).update(value=F('value') + delta)
+
+
+def record_transitions(rows, to_status):
+    """Move counters for pickups given as (company_id, from_status) pairs"""
+    deltas = Counter()
+    for company_id, from_status in rows:
+        if from_status == to_status:
+            continue
+        if from_status:
+            deltas[(company_id, status_counter(from_status))] -= 1
+        deltas[(company_id, status_counter(to_status))] += 1
+    bump(deltas)
+
+
+def counters(company_id):
+    """
+    One company's counters as {'items': n, '<status>': n, ...}, zero-filled
+    for every pickup status
+    """
+    values = dict(CompanyCounter.objects.filter(company_id=company_id).values_list('name', 'value'))
+    summary = {ITEMS_COUNTER: values.get(ITEMS_COUNTER, 0)}
+    for status, _ in PickupRequest.STATUS_CHOICES:
+        summary[status] = values.get(status_counter(status), 0)
+    return summary
+
+
+def rebuild_counters():
+    """
+    Recompute every company's counters with grouped queries over live and
+    archived rows.
+
+    The counter rows are locked before the rows are counted, so an increment
+    committed meanwhile waits and then applies on top of the rebuilt value;
+    only counters whose value differs are written.
+    """
+    with transaction.atomic():
+        current = {
+            (company_id, name): (pk, value)
+            for pk, company_id, name, value in CompanyCounter.objects.select_for_update()
+            .values_list('id', 'company_id', 'name', 'value')
+        }
+        values = _count_company_rows()
+        changed, missing = [], []
+        for (company_id, name), value in values.items():
+            pk, cached = current.pop((company_id, name), (None, None))
+            if pk is None:
+                missing.append(CompanyCounter(company_id=company_id, name=name, value=value))
+            elif cached != value:
+                changed.append(CompanyCounter(pk=pk, value=value))
+        changed += [CompanyCounter(pk=pk, value=0) for pk, cached in current.values() if cached]
+        CompanyCounter.objects.bulk_update(changed, ['value'], batch_size=500)
+        CompanyCounter.objects.bulk_create(missing, batch_size=500, ignore_conflicts=True)
+    return len(values)
+
+
+def _count_company_rows():
+    values = Counter()
+    for row in EWasteItem.objects.filter(company__isnull=False).values('company').annotate(n=Count('id')).order_by():
+        values[(row['company'], ITEMS_COUNTER)] = row['n']
+    pickup_rows = (
+        PickupRequest.objects.filter(company__isnull=False)
+        .values('company', 'status').annotate(n=Count('id')).order_by()
+    )
+    for row in pickup_rows:
+        values[(row['company'], status_counter(row['status']))] = row['n']
+    archived_rows = (
+        ArchivedItem.objects.filter(company__isnull=False)
+        .values('company', 'pickup_status').annotate(n=Count('id')).order_by()
+    )
+    for row in archived_rows:
+        values[(row['company'], ITEMS_COUNTER)] += row['n']
+        values[(row['company'], status_counter(row['pickup_status']))] += row['n']
+    return values
+
+
+def route_backlog(batch_size=2000):
+    """
+    Route items that have no company yet and copy the result onto their
+    pickups. Returns the number of items routed.
+    """
+    routed = []
+    unrouted = EWasteItem.objects.filter(company__isnull=True).only('id', 'pickup_location')
+    for item in unrouted.iterator(chunk_size=batch_size):
+        company_id, region_key = route(item.pickup_location)
+        if company_id is not None:
+            routed.append(EWasteItem(pk=item.pk, company_id=company_id, region_key=region_key))
+    EWasteItem.objects.bulk_update(routed, ['company', 'region_key'], batch_size=500)
+    for company_id in {item.company_id for item in routed}:
+        PickupRequest.objects.filter(
+            company__isnull=True, ewaste_item__company_id=company_id
+        ).update(company_id=company_id)
+    return len(routed)
@@ -0,0 +1,75 @@
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from ewaste import tombstones
+from ewaste.models import EWasteItem
+
+
+class ItemSyncTests(TestCase):
+    def setUp(self):
+        self.customer = User.objects.create_user('customer', 'customer@example.com', 'pw')
+        self.items = [
+            EWasteItem.objects.create(
+                user=self.customer, item_name=f'Item {i}', description='Old device', condition='broken',
+                quantity=1, pickup_location='1 Test Street', preferred_date=timezone.localdate(),
+                contact_phone='9999999999',
+            )
+            for i in range(3)
+        ]
+        self.client.force_login(self.customer)
+        self.url = reverse('api_items')
+
+    def test_unchanged_list_answers_not_modified(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+
+        again = self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(again.status_code, 304)
+
+        self.items[0].item_name = 'Renamed'
+        self.items[0].save()
+        changed = self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(changed.status_code, 200)
+
+    def test_cursor_walks_every_row_once(self):
+        seen = []
+        params = {'limit': 2}
+        while True:
+            payload = self.client.get(self.url, params).json()
+            seen += [row['id'] for row in payload['results']]
+            if not payload['next_cursor']:
+                break
+            params['cursor'] = payload['next_cursor']
+        self.assertEqual(seen, [item.id for item in self.items])
+
+    def test_delta_sync_reports_deleted_rows(self):
+        since = timezone.now()
+        removed_id = self.items[1].id
+        self.items[1].delete()
+        self.items[2].save()
+
+        payload = self.client.get(self.url, {'since': since.isoformat()}).json()
+
+        self.assertEqual([row['id'] for row in payload['results']], [self.items[2].id])
+        self.assertEqual(payload['deleted'], [removed_id])
+        self.assertFalse(payload['full_resync'])
+
+    def test_delta_sync_past_retention_asks_for_full_resync(self):
+        since = timezone.now() - timedelta(days=tombstones.RETENTION_DAYS + 1)
+
+        payload = self.client.get(self.url, {'since': since.isoformat()}).json()
+
+        self.assertEqual(payload['deleted'], [])
+        self.assertTrue(payload['full_resync'])
+
+    def test_bulk_delete_leaves_tombstones(self):
+        since = timezone.now()
+        tombstones.delete(EWasteItem.objects.filter(id__in=[self.items[0].id, self.items[1].id]))
+
+        self.assertEqual(
+            sorted(tombstones.deleted_since(EWasteItem, since)), [self.items[0].id, self.items[1].id],
+        )
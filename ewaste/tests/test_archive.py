@@ -0,0 +1,77 @@
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from ewaste import archive, services, tombstones
+from ewaste.impact import get_platform_impact
+from ewaste.models import ArchivedItem, ArchivedRecord, EWasteItem, Notification, PickupEvent, PickupRequest
+from ewaste.tasks import prune_notifications
+
+
+class ArchiveTests(TestCase):
+    def setUp(self):
+        self.customer = User.objects.create_user('customer', 'customer@example.com', 'pw')
+        self.staff = User.objects.create_user('staff', 'staff@example.com', 'pw', is_staff=True)
+        self.closed = self.pickup('Old laptop')
+        services.transition_pickup(self.closed, 'completed', actor=self.staff)
+        self.open = self.pickup('Old phone')
+        long_ago = timezone.now() - timedelta(days=archive.ARCHIVE_AFTER_DAYS['pickups'] + 1)
+        PickupRequest.objects.update(updated_at=long_ago)
+
+    def pickup(self, name):
+        item = EWasteItem.objects.create(
+            user=self.customer, item_name=name, description='Does not boot', condition='broken', quantity=2,
+            pickup_location='1 Test Street', preferred_date=timezone.localdate(), contact_phone='9999999999',
+        )
+        return services.create_pickup(item, actor=self.customer)
+
+    def test_closed_pickups_move_with_their_events(self):
+        item_id, pickup_id = self.closed.ewaste_item_id, self.closed.id
+        since = timezone.now()
+
+        self.assertEqual(archive.archive_pickups(), 1)
+
+        self.assertFalse(EWasteItem.objects.filter(id=item_id).exists())
+        self.assertFalse(PickupEvent.objects.filter(pickup_id=pickup_id).exists())
+        self.assertTrue(PickupEvent.objects.filter(pickup=self.open).exists())
+        self.assertEqual(tombstones.deleted_since(EWasteItem, since), [item_id])
+
+        archived = ArchivedItem.objects.get(id=item_id)
+        pickup, timeline = archive.archived_pickup(archived)
+        self.assertEqual(pickup.status, 'completed')
+        self.assertEqual([event.to_status for event in timeline], ['pending', 'completed'])
+
+    def test_totals_survive_archiving(self):
+        statistics = services.get_global_statistics()
+        impact = get_platform_impact()
+
+        archive.archive_pickups()
+
+        self.assertEqual(services.get_global_statistics(), statistics)
+        self.assertEqual(get_platform_impact().items_collected, impact.items_collected)
+
+    def test_archived_item_stays_visible_to_its_owner(self):
+        archive.archive_pickups()
+        self.client.force_login(self.customer)
+
+        response = self.client.get(reverse('item_detail', args=[self.closed.ewaste_item_id]))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Old laptop')
+
+    def test_read_notifications_are_archived_not_deleted(self):
+        notification = Notification.objects.create(user=self.customer, message='Collected', is_read=True)
+        Notification.objects.filter(id=notification.id).update(
+            created_at=timezone.now() - timedelta(days=archive.ARCHIVE_AFTER_DAYS['notifications'] + 1),
+        )
+
+        prune_notifications()
+        prune_notifications()
+
+        self.assertFalse(Notification.objects.filter(id=notification.id).exists())
+        self.assertTrue(ArchivedRecord.objects.filter(
+            kind=ArchivedRecord.KIND_NOTIFICATION, original_id=notification.id,
+        ).exists())
@@ -0,0 +1,67 @@
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.utils import timezone
+
+from ewaste import dedup, services, tenancy
+from ewaste.models import Company, EWasteItem, PickupEvent, PickupSlot
+
+
+class DuplicateDetectionTests(TestCase):
+    def setUp(self):
+        dedup._index = None
+        Company.objects.create(name='North', contact_email='north@example.com', service_regions='560001')
+        self.customer = User.objects.create_user('customer', 'customer@example.com', 'pw')
+        self.day = timezone.localdate() + timedelta(days=3)
+
+    def report(self, name, description, location='12 Main Street 560001', phone='9876543210'):
+        item = EWasteItem(
+            user=self.customer, item_name=name, description=description, condition='broken', quantity=1,
+            pickup_location=location, preferred_date=self.day, contact_phone=phone,
+        )
+        tenancy.assign_region(item)
+        item.save()
+        services.create_pickup(item, actor=self.customer)
+        return item
+
+    def test_near_identical_report_matches_earlier_one(self):
+        original = self.report('Old Samsung phone', 'Cracked screen, does not turn on')
+        repeat = EWasteItem(
+            user=self.customer, item_name='Old Samsung phone', description='Cracked screen does not turn on',
+            pickup_location='12 Main St 560001', contact_phone='+91 98765 43210',
+        )
+        self.assertEqual(dedup.find_duplicate(repeat), original)
+
+    def test_different_item_at_another_address_is_not_a_duplicate(self):
+        self.report('Old Samsung phone', 'Cracked screen, does not turn on')
+        other = EWasteItem(
+            user=self.customer, item_name='Broken microwave', description='Door hinge snapped',
+            pickup_location='7 Lake Road 560001', contact_phone='9000000000',
+        )
+        self.assertIsNone(dedup.find_duplicate(other))
+
+    def test_merge_cancels_duplicate_pickups_through_services(self):
+        original = self.report('Old Samsung phone', 'Cracked screen, does not turn on')
+        duplicate = self.report('Old Samsung phone', 'Cracked screen, does not turn on')
+
+        pairs = dedup.deduplicate_backlog(merge=True)
+
+        self.assertEqual(pairs, [(duplicate.pk, original.pk)])
+        duplicate.refresh_from_db()
+        self.assertEqual(duplicate.duplicate_of_id, original.pk)
+        self.assertEqual(duplicate.pickup_request.status, 'cancelled')
+        self.assertTrue(PickupEvent.objects.filter(
+            pickup=duplicate.pickup_request, from_status='pending', to_status='cancelled',
+        ).exists())
+        self.assertEqual(PickupSlot.objects.get(date=self.day, area='560001').booked, 1)
+        self.assertEqual(tenancy.counters(original.company_id)['cancelled'], 1)
+
+    def test_dry_run_changes_nothing(self):
+        self.report('Old Samsung phone', 'Cracked screen, does not turn on')
+        duplicate = self.report('Old Samsung phone', 'Cracked screen, does not turn on')
+
+        self.assertEqual(len(dedup.deduplicate_backlog(merge=True, dry_run=True)), 1)
+        duplicate.refresh_from_db()
+        self.assertIsNone(duplicate.duplicate_of_id)
+        self.assertEqual(duplicate.pickup_request.status, 'pending')
@@ -0,0 +1,76 @@
+from django.test import TestCase, override_settings
+
+from ewaste import jobs, tasks, tenancy
+from ewaste.models import Company, CompanyCounter, Job
+
+
+calls = []
+
+
+@jobs.register_job('test_record_call')
+def record_call(value):
+    calls.append(value)
+
+
+@jobs.register_job('test_always_fail')
+def always_fail():
+    raise RuntimeError('boom')
+
+
+class JobQueueTests(TestCase):
+    def setUp(self):
+        calls.clear()
+
+    def enqueue(self, name, payload=None, max_attempts=3):
+        with self.captureOnCommitCallbacks(execute=True):
+            jobs.enqueue(name, payload, max_attempts=max_attempts)
+        return Job.objects.get(name=name)
+
+    @override_settings(JOBS_ASYNC=True)
+    def test_a_job_is_claimed_by_one_worker_only(self):
+        job = self.enqueue('test_record_call', {'value': 1})
+
+        self.assertEqual(jobs.claim_jobs('worker-a'), [job])
+        self.assertEqual(jobs.claim_jobs('worker-b'), [])
+
+        job.refresh_from_db()
+        self.assertTrue(jobs.run_job(job))
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.STATUS_SUCCEEDED)
+        self.assertEqual(calls, [1])
+
+    @override_settings(JOBS_ASYNC=True)
+    def test_failing_job_is_retried_then_marked_failed(self):
+        job = self.enqueue('test_always_fail', max_attempts=2)
+
+        [job] = jobs.claim_jobs('worker')
+        with self.assertLogs('ewaste.jobs', 'WARNING'):
+            self.assertFalse(jobs.run_job(job))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.STATUS_QUEUED, 1))
+
+        Job.objects.filter(id=job.id).update(run_at=job.created_at)
+        [job] = jobs.claim_jobs('worker')
+        with self.assertLogs('ewaste.jobs', 'WARNING'):
+            self.assertFalse(jobs.run_job(job))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.STATUS_FAILED, 2))
+        self.assertIn('boom', job.last_error)
+
+    @override_settings(JOBS_ASYNC=False)
+    def test_inline_failure_is_queued_for_retry(self):
+        with self.assertLogs('ewaste.jobs', 'WARNING'), self.captureOnCommitCallbacks(execute=True):
+            jobs.enqueue('test_always_fail')
+
+        job = Job.objects.get(name='test_always_fail')
+        self.assertEqual((job.status, job.attempts), (Job.STATUS_QUEUED, 1))
+
+    def test_reconcile_stats_repairs_drifted_counters(self):
+        company = Company.objects.create(name='North', contact_email='north@example.com')
+        tenancy.bump({(company.id, tenancy.ITEMS_COUNTER): 5})
+
+        tasks.reconcile_stats()
+
+        self.assertEqual(
+            CompanyCounter.objects.get(company=company, name=tenancy.ITEMS_COUNTER).value, 0,
+        )
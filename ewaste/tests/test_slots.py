@@ -0,0 +1,93 @@
+from datetime import datetime, time, timedelta
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase
+from django.utils import timezone
+
+from ewaste import services, slots
+from ewaste.models import EWasteItem, PickupSlot
+
+
+class SlotBookingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.customer = User.objects.create_user('customer', 'customer@example.com', 'pw')
+        self.staff = User.objects.create_user('staff', 'staff@example.com', 'pw', is_staff=True)
+        self.day = timezone.localdate() + timedelta(days=2)
+        PickupSlot.objects.create(date=self.day, area='560001', capacity=2)
+
+    def pickup(self, area='560001', day=None):
+        item = EWasteItem.objects.create(
+            user=self.customer, item_name='Old laptop', description='Does not boot', condition='broken',
+            quantity=1, pickup_location=f'1 Test Street {area}', region_key=area,
+            preferred_date=day or self.day, contact_phone='9999999999',
+        )
+        return services.create_pickup(item, actor=self.customer)
+
+    def booked(self, day=None):
+        return PickupSlot.objects.get(date=day or self.day, area='560001').booked
+
+    def test_full_day_refuses_more_bookings(self):
+        self.pickup()
+        self.pickup()
+        with self.assertRaises(slots.SlotFull):
+            self.pickup()
+        self.assertEqual(self.booked(), 2)
+
+    def test_multi_place_booking_is_all_or_none(self):
+        self.pickup()
+        with self.assertRaises(slots.SlotFull):
+            slots.book(self.day, '560001', places=2)
+        self.assertEqual(self.booked(), 1)
+
+    def test_cancelling_gives_the_place_back(self):
+        pickup = self.pickup()
+        services.transition_pickup(pickup, 'cancelled', actor=self.staff)
+        self.assertEqual(self.booked(), 0)
+
+    def test_rescheduling_onto_a_full_day_keeps_the_old_booking(self):
+        later = self.day + timedelta(days=1)
+        PickupSlot.objects.create(date=later, area='560001', capacity=1, booked=1)
+        pickup = self.pickup()
+
+        pickup.scheduled_date = timezone.make_aware(datetime.combine(later, time(10)))
+        with self.assertRaises(slots.SlotFull):
+            services.save_pickup(pickup)
+        self.assertEqual(PickupSlot.objects.get(id=pickup.slot_id).date, self.day)
+        self.assertEqual(self.booked(), 1)
+
+    def test_bulk_schedule_moves_bookings(self):
+        pickups = [self.pickup(), self.pickup()]
+        later = self.day + timedelta(days=3)
+
+        services.bulk_update_pickups(
+            [p.id for p in pickups], self.staff, to_status='scheduled',
+            scheduled_date=timezone.make_aware(datetime.combine(later, time(9))),
+        )
+
+        self.assertEqual(self.booked(), 0)
+        self.assertEqual(self.booked(later), 2)
+
+    def test_unrouted_pickups_take_no_place(self):
+        for _ in range(slots.DEFAULT_CAPACITY + 1):
+            pickup = self.pickup(area='')
+        self.assertIsNone(pickup.slot_id)
+        self.assertFalse(PickupSlot.objects.filter(area='').exists())
+        self.assertEqual(slots.calendar(''), [])
+
+    def test_calendar_shows_remaining_places(self):
+        self.pickup()
+        day = next(d for d in slots.calendar('560001') if d['date'] == self.day.isoformat())
+        self.assertEqual((day['capacity'], day['booked'], day['available']), (2, 1, 1))
+
+    def test_booking_checks_capacity_in_the_update_not_the_calendar(self):
+        # Two reporters read the same cached calendar before either books
+        self.pickup()
+        day = next(d for d in slots.calendar('560001') if d['date'] == self.day.isoformat())
+        self.assertEqual(day['available'], 1)
+
+        self.pickup()
+        with self.assertRaises(slots.SlotFull):
+            self.pickup()
+        self.assertEqual(self.booked(), 2)
@@ -0,0 +1,90 @@
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from ewaste import services, tenancy
+from ewaste.models import Company, EWasteItem, PickupRequest
+
+
+class RoutingTests(TestCase):
+    def setUp(self):
+        self.north = Company.objects.create(
+            name='North', contact_email='north@example.com', service_regions='North City, 560034',
+        )
+        self.extension = Company.objects.create(
+            name='Extension', contact_email='ext@example.com', service_regions='North City Extension',
+        )
+
+    def test_region_matches_whole_phrases_only(self):
+        self.assertEqual(tenancy.route('4 North City main road'), (self.north.id, 'north city'))
+        self.assertEqual(tenancy.route('12 North Road, Old City'), (None, ''))
+
+    def test_longer_region_and_postal_code_match(self):
+        self.assertEqual(
+            tenancy.route('North City Extension block 2'), (self.extension.id, 'north city extension'),
+        )
+        self.assertEqual(tenancy.route('Flat 3, 560034'), (self.north.id, '560034'))
+
+    def test_region_edits_reroute_new_addresses(self):
+        self.north.service_regions = 'Lake View'
+        self.north.save()
+        self.assertEqual(tenancy.route('4 North City main road'), (None, ''))
+        self.assertEqual(tenancy.route('2 Lake View'), (self.north.id, 'lake view'))
+
+
+class CompanyScopingTests(TestCase):
+    def setUp(self):
+        self.north = Company.objects.create(name='North', contact_email='n@example.com', service_regions='560001')
+        self.south = Company.objects.create(name='South', contact_email='s@example.com', service_regions='560099')
+        self.member = self.make_member('north-member', self.north)
+        self.customer = User.objects.create_user('customer', 'customer@example.com', 'pw')
+        self.routed = self.report('1 Test Street 560001')
+        self.other = self.report('1 Test Street 560099')
+        self.unrouted = self.report('Somewhere unserved')
+
+    def make_member(self, username, company):
+        user = User.objects.create_user(username, f'{username}@example.com', 'pw')
+        user.profile.is_company, user.profile.company = True, company
+        user.profile.save()
+        return user
+
+    def report(self, location):
+        item = EWasteItem(
+            user=self.customer, item_name='Old laptop', description='Does not boot', condition='broken',
+            quantity=1, pickup_location=location, preferred_date=timezone.localdate(), contact_phone='9999999999',
+        )
+        tenancy.assign_region(item)
+        item.save()
+        services.create_pickup(item, actor=self.customer)
+        return item
+
+    def test_members_see_only_their_company_slice(self):
+        self.assertEqual(list(EWasteItem.objects.visible_to(self.member)), [self.routed])
+        self.assertEqual(
+            list(PickupRequest.objects.visible_to(self.member)), [self.routed.pickup_request],
+        )
+
+    def test_unrouted_rows_stay_with_staff(self):
+        staff = User.objects.create_user('staff', 'staff@example.com', 'pw', is_staff=True)
+        self.assertEqual(EWasteItem.objects.visible_to(staff).count(), 3)
+
+        self.client.force_login(self.member)
+        response = self.client.get(reverse('item_detail', args=[self.unrouted.id]))
+        self.assertRedirects(response, reverse('dashboard'), fetch_redirect_response=False)
+        response = self.client.get(reverse('edit_pickup', args=[self.unrouted.pickup_request.id]))
+        self.assertEqual(response.status_code, 404)
+
+    def test_staff_assignment_hands_unrouted_pickup_to_the_company(self):
+        staff = User.objects.create_user('staff', 'staff@example.com', 'pw', is_staff=True)
+        pickup = self.unrouted.pickup_request
+
+        services.bulk_update_pickups([pickup.id], staff, assign_to=self.member)
+
+        self.assertIn(self.unrouted, EWasteItem.objects.visible_to(self.member))
+        self.assertEqual(tenancy.counters(self.north.id)['items'], 2)
+
+    def test_member_without_company_sees_nothing(self):
+        loose = self.make_member('loose', None)
+        self.assertFalse(EWasteItem.objects.visible_to(loose).exists())
+        self.assertFalse(PickupRequest.objects.visible_to(loose).exists())
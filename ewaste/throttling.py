@@ -0,0 +1,152 @@
+"""
+Request throttling for endpoints that create rows or send mail.
+
+Limits are configured per URL name in settings.THROTTLE_RATES, e.g.
+
+    THROTTLE_RATES = {'signup': {'ip': '5/hour'}, 'report_ewaste': {'user': '20/hour'}}
+
+Each (route, scope, client) pair is a bucket of `count` requests refilled over
+`period`. Buckets are kept as sliding-window counters in the cache: a request
+first increments the current fixed window's counter, then compares it, plus the
+previous window weighted by how much of it still overlaps the sliding window,
+against the limit, and takes its increment back if it is rejected. Since the
+increment is one atomic cache operation, concurrent requests cannot all pass
+on the same stale count. The limit holds across processes only when
+settings.THROTTLE_CACHE is a shared cache (Redis or Memcached, see
+settings.SHARED_CACHE); with the default per-process cache every worker counts
+on its own. The middleware runs before the view and checks the IP bucket
+first, so a flood is rejected without touching the ORM.
+"""
+import math
+import time
+
+from django.conf import settings
+from django.contrib.auth import SESSION_KEY
+from django.core.cache import caches
+from django.http import HttpResponse, JsonResponse
+
+
+PERIODS = {
+    's': 1, 'sec': 1, 'second': 1,
+    'm': 60, 'min': 60, 'minute': 60,
+    'h': 3600, 'hour': 3600,
+    'd': 86400, 'day': 86400,
+}
+
+
+def parse_rate(rate):
+    """'20/hour' -> (20, 3600)"""
+    count, _, period = rate.partition('/')
+    try:
+        return int(count), PERIODS[period.strip().lower()]
+    except (KeyError, ValueError):
+        raise ValueError(f"Invalid throttle rate: {rate!r}")
+
+
+def _cache():
+    return caches[getattr(settings, 'THROTTLE_CACHE', 'default')]
+
+
+def hit(bucket, limit, period, now=None):
+    """
+    Count one request against `bucket`. Returns None if it is allowed, or the
+    number of seconds until it would be.
+    """
+    cache = _cache()
+    now = time.time() if now is None else now
+    window = int(now // period)
+    elapsed = (now % period) / period
+    current_key = f'throttle:{bucket}:{window}'
+    previous_key = f'throttle:{bucket}:{window - 1}'
+
+    if cache.add(current_key, 1, timeout=period * 2):
+        current = 1
+    else:
+        try:
+            current = cache.incr(current_key)
+        except ValueError:
+            # Expired between add() and incr()
+            cache.set(current_key, 1, timeout=period * 2)
+            current = 1
+    previous = cache.get(previous_key, 0)
+
+    if previous * (1 - elapsed) + current <= limit:
+        return None
+
+    try:
+        cache.decr(current_key)
+    except ValueError:
+        pass
+    current -= 1
+    if current >= limit or not previous:
+        wait = (1 - elapsed) * period
+    else:
+        # Wait until enough of the previous window has slid out
+        wait = (1 - (limit - current) / previous - elapsed) * period
+    return max(1, math.ceil(wait))
+
+
+def client_ip(request):
+    if getattr(settings, 'THROTTLE_TRUST_X_FORWARDED_FOR', False):
+        forwarded = request.META.get('HTTP_X_FORWARDED_FOR', '')
+        if forwarded:
+            return forwarded.split(',')[0].strip()
+    return request.META.get('REMOTE_ADDR', '')
+
+
+def _user_id(request):
+    """The logged-in user's id from the session, without loading the user"""
+    session = getattr(request, 'session', None)
+    return session.get(SESSION_KEY) if session is not None else None
+
+
+def check(request, route):
+    """Seconds to wait if `request` exceeds a limit for `route`, else None"""
+    rates = getattr(settings, 'THROTTLE_RATES', {}).get(route)
+    if not rates:
+        return None
+
+    if 'ip' in rates:
+        limit, period = parse_rate(rates['ip'])
+        wait = hit(f'{route}:ip:{client_ip(request)}', limit, period)
+        if wait:
+            return wait
+
+    if 'user' in rates:
+        user_id = _user_id(request)
+        if user_id is not None:
+            limit, period = parse_rate(rates['user'])
+            wait = hit(f'{route}:user:{user_id}', limit, period)
+            if wait:
+                return wait
+    return None
+
+
+def throttled_response(request, wait):
+    message = 'Too many requests. Please try again later.'
+    if request.path.startswith('/api/'):
+        response = JsonResponse({'error': message, 'retry_after': wait}, status=429)
+    else:
+        response = HttpResponse(message, status=429, content_type='text/plain; charset=utf-8')
+    response['Retry-After'] = str(wait)
+    return response
+
+
+class ThrottleMiddleware:
+    """Reject requests over the THROTTLE_RATES limit of their URL name with 429"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.methods = set(getattr(settings, 'THROTTLE_METHODS', ('POST',)))
+
+    def __call__(self, request):
+        return self.get_response(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if not getattr(settings, 'THROTTLE_ENABLED', True) or request.method not in self.methods:
+            return None
+        match = request.resolver_match
+        wait = check(request, match.url_name) if match and match.url_name else None
+        if wait:
+            return throttled_response(request, wait)
+        return None
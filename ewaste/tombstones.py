@@ -0,0 +1,85 @@
+"""
+Tombstones for API delta sync.
+
+A ?since= request only sees rows whose updated_at moved, so a row that was
+deleted or archived would stay in a client's copy forever. Every removal from
+a synced table leaves a Tombstone with the row's id, and list responses for
+?since= carry the ids removed after that time. Single deletes (admin,
+cascades) are recorded by a post_delete receiver (see signals.py); bulk
+removals go through delete(), which records the whole batch in one INSERT.
+
+Tombstones are kept for RETENTION_DAYS. A client whose ?since= is older than
+that, or that would receive more than MAX_IDS of them, is told to resync in
+full instead.
+"""
+from contextvars import ContextVar
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import EWasteItem, Notification, PickupRequest, RecyclingFacility, Tombstone
+
+
+RETENTION_DAYS = getattr(settings, 'TOMBSTONE_RETENTION_DAYS', 90)
+MAX_IDS = getattr(settings, 'TOMBSTONE_MAX_IDS', 1000)
+
+SYNCED_MODELS = (EWasteItem, PickupRequest, Notification, RecyclingFacility)
+
+# Model whose rows delete() is removing, so the receiver leaves them to it
+_bulk_model = ContextVar('ewaste_tombstones_bulk_model', default=None)
+
+
+def record(model, ids, when=None):
+    when = when or timezone.now()
+    label = model._meta.label_lower
+    Tombstone.objects.bulk_create(
+        [Tombstone(model=label, object_id=object_id, deleted_at=when) for object_id in ids],
+        batch_size=1000,
+    )
+
+
+def delete(queryset):
+    """Delete the rows of `queryset` with their tombstones in one INSERT; returns how many"""
+    ids = list(queryset.values_list('id', flat=True))
+    token = _bulk_model.set(queryset.model)
+    try:
+        deleted = queryset.model.objects.filter(id__in=ids).delete()[0]
+    finally:
+        _bulk_model.reset(token)
+    if queryset.model in SYNCED_MODELS:
+        record(queryset.model, ids)
+    return deleted
+
+
+def record_deleted(model, instance):
+    """Tombstone for one deleted row, unless delete() is recording its batch"""
+    if _bulk_model.get() is not model:
+        record(model, [instance.pk])
+
+
+def deleted_since(model, since):
+    """
+    Ids of `model` rows removed after `since`, oldest first, or None when the
+    client has to resync in full
+    """
+    if since < timezone.now() - timedelta(days=RETENTION_DAYS):
+        return None
+    ids = list(
+        Tombstone.objects.filter(model=model._meta.label_lower, deleted_at__gt=since)
+        .order_by('deleted_at', 'id').values_list('object_id', flat=True)[:MAX_IDS + 1]
+    )
+    return None if len(ids) > MAX_IDS else ids
+
+
+def last_deleted(model):
+    return (
+        Tombstone.objects.filter(model=model._meta.label_lower)
+        .order_by('-deleted_at').values_list('deleted_at', flat=True).first()
+    )
+
+
+def prune():
+    """Delete tombstones past the retention period; returns how many"""
+    cutoff = timezone.now() - timedelta(days=RETENTION_DAYS)
+    return Tombstone.objects.filter(deleted_at__lt=cutoff).delete()[0]
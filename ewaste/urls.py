@@ -1,5 +1,5 @@
 from django.urls import path
-from . import views
+from . import api, views
 
 urlpatterns = [
     path('', views.home, name='home'),
@@ -22,4 +22,13 @@ urlpatterns = [
     path('users/', views.user_list, name='user_list'),
     path('user/<int:user_id>/edit/', views.edit_user, name='edit_user'),
     path('search/', views.search_items, name='search'),
+    path('jobs/', views.job_status, name='job_status'),
+    path('api/v1/items/', api.items, name='api_items'),
+    path('api/v1/pickups/', api.pickups, name='api_pickups'),
+    path('api/v1/pickups/sync/', api.pickup_sync, name='api_pickup_sync'),
+    path('api/v1/slots/', api.pickup_slots, name='api_pickup_slots'),
+    path('api/v1/heatmap/<str:tile>/', api.heatmap_tile, name='api_heatmap_tile'),
+    path('api/v1/facilities/', api.facilities, name='api_facilities'),
+    path('api/v1/notifications/', api.notifications, name='api_notifications'),
+    path('api/v1/metrics/db/', api.db_metrics, name='api_db_metrics'),
 ]
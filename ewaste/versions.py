@@ -0,0 +1,33 @@
+"""
+Version numbers of the in-process indexes (categories.py, tenancy.py,
+subscriptions.py).
+
+Each index remembers the version it was built from and rebuilds when
+current() returns something else; bump() is called whenever the rows behind
+it change. With a shared cache (settings.SHARED_CACHE) the version lives
+there, so a bump reaches every process on its next lookup. A per-process
+cache only tells the process that made the change, so there the version also
+carries the current LOCAL_INDEX_TTL window: the other processes rebuild when
+the next window starts, at most LOCAL_INDEX_TTL seconds later.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+
+LOCAL_INDEX_TTL = getattr(settings, 'LOCAL_INDEX_TTL', 30)
+
+
+def current(key):
+    version = cache.get_or_set(key, 1, timeout=None)
+    if getattr(settings, 'SHARED_CACHE', False):
+        return version
+    return version, int(time.time() // LOCAL_INDEX_TTL)
+
+
+def bump(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 2, timeout=None)
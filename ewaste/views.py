@@ -3,16 +3,25 @@ from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.models import User
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
+from django.conf import settings
+from django.db import IntegrityError, transaction
 from django.db.models import Q, Count
-from .models import EWasteItem, EWasteCategory, PickupRequest, RecyclingFacility, Feedback, Notification, Company
-from .forms import UserSignUpForm, EWasteItemForm, FeedbackForm, PickupRequestForm, UserEditForm
+from django.http import Http404, HttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from .models import ArchivedItem, EWasteItem, EWasteCategory, PickupRequest, RecyclingFacility, Feedback, Notification, Company, Job, JobSchedule
+from .forms import UserSignUpForm, EWasteItemForm, FeedbackForm, PickupRequestForm, UserEditForm, ItemHistoryFilterForm
+from . import archive, categories, dedup, services, sla, slots, tenancy
+from .streaming import stream_list
+from .impact import get_platform_impact, get_user_impact
 
 
 def home(request):
     """Home page"""
-    total_items_collected = EWasteItem.objects.filter(is_collected=True).count()
+    # The platform impact row counts archived items too
+    total_items_collected = get_platform_impact().items_collected
     total_users = User.objects.count()
-    total_categories = EWasteCategory.objects.count()
+    total_categories = categories.count()
     
     context = {
         'total_items_collected': total_items_collected,
@@ -65,24 +74,18 @@ def signup(request):
     if request.method == 'POST':
         form = UserSignUpForm(request.POST)
         if form.is_valid():
-            username = form.cleaned_data.get('username')
-            email = form.cleaned_data.get('email')
-            password = form.cleaned_data.get('password')
-            first_name = form.cleaned_data.get('first_name')
-            last_name = form.cleaned_data.get('last_name')
-            
-            if User.objects.filter(username=username).exists():
-                messages.error(request, "Username already exists!")
-            else:
-                user = User.objects.create_user(
-                    username=username,
-                    email=email,
-                    password=password,
-                    first_name=first_name,
-                    last_name=last_name
+            try:
+                services.register_user(
+                    username=form.cleaned_data.get('username'),
+                    email=form.cleaned_data.get('email'),
+                    password=form.cleaned_data.get('password'),
+                    first_name=form.cleaned_data.get('first_name'),
+                    last_name=form.cleaned_data.get('last_name'),
                 )
+            except IntegrityError:
+                form.add_error('username', "Username already exists!")
+            else:
                 # By default public signups are customers. Company membership must be granted via Django admin.
-
                 messages.success(request, "Account created successfully! Please login.")
                 return redirect('login')
     else:
@@ -142,19 +145,25 @@ def company_dashboard(request):
 
     # allow filtering by customer
     selected_user = request.GET.get('user')
+    selected_user = int(selected_user) if selected_user and selected_user.isdigit() else None
 
-    customers = User.objects.filter(profile__is_company=False).annotate(items_count=Count('ewaste_items'))
+    # Only this company's slice is read
+    visible_items = EWasteItem.objects.visible_to(request.user)
+    customers = (
+        visible_items.values('user', 'user__username')
+        .annotate(items_count=Count('id')).order_by('user__username')
+    )
 
-    items = EWasteItem.objects.select_related('user', 'category')
+    items = visible_items.select_related('user', 'pickup_request')
     if selected_user:
         items = items.filter(user__id=selected_user)
-    else:
-        items = items.all()
 
+    company_id = tenancy.company_of(request.user)
     context = {
         'items': items,
         'customers': customers,
-        'selected_user': int(selected_user) if selected_user else None,
+        'selected_user': selected_user,
+        'counters': tenancy.counters(company_id) if company_id else {},
     }
     return render(request, 'company_dashboard.html', context)
 
@@ -167,9 +176,16 @@ def user_list(request):
         messages.error(request, "You don't have permission to access this page!")
         return redirect('dashboard')
 
-    users = User.objects.all()
-    context = {'users': users}
-    return render(request, 'users_list.html', context)
+    users = _manageable_users(request.user).only('id', 'username', 'first_name', 'last_name', 'email', 'is_active')
+    return stream_list(request, 'users_list.html', {}, users, 'partials/user_rows.html', order='id',
+                       sentinel_template_name='partials/infinite_sentinel_row.html')
+
+
+def _manageable_users(user):
+    """Staff manage everyone; company members only the customers in their slice"""
+    if user.is_staff:
+        return User.objects.all()
+    return User.objects.filter(id__in=EWasteItem.objects.visible_to(user).values('user'))
 
 
 @login_required(login_url='login')
@@ -180,7 +196,7 @@ def edit_user(request, user_id):
         messages.error(request, "You don't have permission to access this page!")
         return redirect('dashboard')
 
-    target = get_object_or_404(User, id=user_id)
+    target = get_object_or_404(_manageable_users(request.user), id=user_id)
 
     if request.method == 'POST':
         form = UserEditForm(request.POST, instance=target)
@@ -218,6 +234,7 @@ def dashboard(request):
     context = {
         'user_items': user_items,
         'pending_pickups': pending_pickups,
+        'impact': get_user_impact(request.user),
     }
     return render(request, 'dashboard.html', context)
 
@@ -235,13 +252,42 @@ def report_ewaste(request):
         if form.is_valid():
             ewaste_item = form.save(commit=False)
             ewaste_item.user = request.user
-            ewaste_item.save()
-            
-            # Create pickup request
-            PickupRequest.objects.create(ewaste_item=ewaste_item)
-            
-            messages.success(request, "E-waste item reported successfully! Pickup will be scheduled soon.")
-            return redirect('dashboard')
+
+            # Flag (or merge) reports that repeat an open one
+            original = dedup.find_duplicate(ewaste_item)
+            ewaste_item.duplicate_of = original
+            tenancy.assign_region(ewaste_item)
+            merge = original is not None and getattr(settings, 'DUPLICATE_REPORT_ACTION', 'flag') == 'merge'
+
+            try:
+                with transaction.atomic():
+                    # Book the day first so a full day writes nothing
+                    slot_id = None if merge else slots.book(ewaste_item.preferred_date, ewaste_item.region_key)
+                    ewaste_item.save()
+                    if original is None:
+                        services.create_pickup(ewaste_item, actor=request.user, slot_id=slot_id)
+                    elif merge:
+                        services.create_pickup(
+                            ewaste_item,
+                            actor=request.user,
+                            status='cancelled',
+                            notes=f"Merged into the pickup for item #{original.id}.",
+                        )
+                    else:
+                        services.create_pickup(
+                            ewaste_item,
+                            actor=request.user,
+                            slot_id=slot_id,
+                            notes=f"Possible duplicate of item #{original.id}.",
+                        )
+            except slots.SlotFull:
+                form.add_error('preferred_date', "That day is fully booked. Please choose another date.")
+            else:
+                if merge:
+                    messages.info(request, "This item looks like one that was already reported, so it will be collected with that pickup.")
+                else:
+                    messages.success(request, "E-waste item reported successfully! Pickup will be scheduled soon.")
+                return redirect('dashboard')
     else:
         form = EWasteItemForm()
     
@@ -251,27 +297,46 @@ def report_ewaste(request):
 
 @login_required(login_url='login')
 def my_items(request):
-    """View user's reported items"""
-    user_items = EWasteItem.objects.filter(user=request.user)
-    context = {'user_items': user_items}
-    return render(request, 'my_items.html', context)
+    """View user's reported items, optionally filtered"""
+    filter_form = ItemHistoryFilterForm(request.GET or None)
+    filters = dict(filter_form.cleaned_data) if filter_form.is_valid() else {}
+    if filters.pop('archived', False):
+        user_items = services.archived_item_history(request.user, **filters)
+        filters['archived'] = True
+    else:
+        user_items = services.item_history(request.user, **filters)
+    context = {'filter_form': filter_form, 'filtered': any(filters.values())}
+    return stream_list(request, 'my_items.html', context, user_items, 'partials/item_cards.html')
 
 
 @login_required(login_url='login')
 def item_detail(request, item_id):
     """View item details"""
-    item = get_object_or_404(EWasteItem, id=item_id)
-
-    profile = getattr(request.user, 'profile', None)
-    if item.user != request.user and not request.user.is_staff and not (profile and profile.is_company):
+    item = services.item_with_timeline(item_id)
+    archived = False
+    if item is None:
+        item = ArchivedItem.objects.filter(id=item_id).first()
+        if item is None:
+            raise Http404("No item matches the given query.")
+        archived = True
+
+    company_id = tenancy.company_of(request.user)
+    in_company_slice = company_id is not None and item.company_id == company_id
+    if item.user_id != request.user.id and not request.user.is_staff and not in_company_slice:
         messages.error(request, "You don't have permission to view this item!")
         return redirect('dashboard')
 
-    pickup_request = PickupRequest.objects.filter(ewaste_item=item).first()
+    if archived:
+        pickup_request, timeline = archive.archived_pickup(item)
+    else:
+        pickup_request = getattr(item, 'pickup_request', None)
+        timeline = pickup_request.timeline if pickup_request else []
 
     context = {
         'item': item,
         'pickup_request': pickup_request,
+        'timeline': timeline,
+        'archived': archived,
     }
     return render(request, 'item_detail.html', context)
 
@@ -284,45 +349,115 @@ def manage_pickups(request):
         messages.error(request, "You don't have permission to access this page!")
         return redirect('dashboard')
 
-    pickups = PickupRequest.objects.all()
+    pickups = PickupRequest.objects.visible_to(request.user).select_related('ewaste_item__user', 'assigned_to')
+
+    if request.method == 'POST' and request.POST.get('bulk_action'):
+        return _bulk_pickup_action(request)
 
     if request.method == 'POST':
-        pickup_id = request.POST.get('pickup_id')
-        action = request.POST.get('action')
-        pickup = get_object_or_404(PickupRequest, id=pickup_id)
-
-        if action == 'accept':
-            # Accept a pending pickup and assign to current user (mark scheduled)
-            pickup.status = 'scheduled'
-            pickup.assigned_to = request.user
-            pickup.save()
-            messages.success(request, "Pickup accepted and scheduled.")
-        elif action == 'start':
-            # Start the pickup - mark as in_progress and assign
-            pickup.status = 'in_progress'
-            pickup.assigned_to = request.user
-            pickup.save()
-            messages.success(request, "Pickup started (in progress).")
-        elif action == 'schedule':
-            pickup.status = 'scheduled'
-            pickup.assigned_to = request.user
-            pickup.save()
-            messages.success(request, "Pickup scheduled successfully!")
-        elif action == 'complete':
-            pickup.status = 'completed'
-            pickup.ewaste_item.is_collected = True
-            pickup.save()
-            pickup.ewaste_item.save()
-            messages.success(request, "Pickup marked as completed!")
-        elif action == 'cancel':
-            pickup.status = 'cancelled'
-            pickup.save()
-            messages.success(request, "Pickup cancelled.")
-
-    context = {'pickups': pickups}
+        # Row buttons submit "<action>:<pickup id>" through one shared form
+        action, _, pickup_id = request.POST.get('action', '').partition(':')
+        pickup_id = pickup_id or request.POST.get('pickup_id')
+        pickup = get_object_or_404(pickups, id=pickup_id)
+        to_status = ROW_ACTION_STATUSES.get(action)
+
+        try:
+            if to_status and to_status != pickup.status and not services.can_transition(pickup.status, to_status):
+                messages.error(request, f"A {pickup.get_status_display().lower()} pickup cannot be changed that way.")
+            elif action == 'accept':
+                # Accept a pending pickup and assign to current user (mark scheduled)
+                services.transition_pickup(pickup, 'scheduled', assign_to=request.user, actor=request.user)
+                messages.success(request, "Pickup accepted and scheduled.")
+            elif action == 'start':
+                # Start the pickup - mark as in_progress and assign
+                services.transition_pickup(pickup, 'in_progress', assign_to=request.user, actor=request.user)
+                messages.success(request, "Pickup started (in progress).")
+            elif action == 'schedule':
+                services.transition_pickup(pickup, 'scheduled', assign_to=request.user, actor=request.user)
+                messages.success(request, "Pickup scheduled successfully!")
+            elif action == 'complete':
+                services.transition_pickup(pickup, 'completed', actor=request.user)
+                messages.success(request, "Pickup marked as completed!")
+            elif action == 'cancel':
+                services.transition_pickup(pickup, 'cancelled', actor=request.user)
+                messages.success(request, "Pickup cancelled.")
+        except slots.SlotFull as exc:
+            messages.error(request, str(exc))
+        return redirect('manage_pickups')
+
+    assignees = _assignable_users(request.user).order_by('username')
+    context = {'pickups': pickups, 'assignees': assignees}
     return render(request, 'manage_pickups.html', context)
 
 
+# Status each row button moves a pickup to
+ROW_ACTION_STATUSES = {
+    'accept': 'scheduled',
+    'start': 'in_progress',
+    'schedule': 'scheduled',
+    'complete': 'completed',
+    'cancel': 'cancelled',
+}
+
+
+def _assignable_users(user):
+    """Staff can hand pickups to any operator, company members only to colleagues"""
+    company_id = tenancy.company_of(user)
+    if user.is_staff or company_id is None:
+        return User.objects.filter(Q(is_staff=True) | Q(profile__is_company=True))
+    return User.objects.filter(profile__is_company=True, profile__company_id=company_id)
+
+
+def _bulk_pickup_action(request):
+    """Apply the bulk toolbar's action to the checked pickups"""
+    action = request.POST.get('bulk_action')
+    pickup_ids = [int(pk) for pk in request.POST.getlist('pickup_ids') if pk.isdigit()]
+    pickup_ids = list(PickupRequest.objects.visible_to(request.user).filter(id__in=pickup_ids).values_list('id', flat=True))
+    if not pickup_ids:
+        messages.warning(request, "Select at least one pickup first.")
+        return redirect('manage_pickups')
+
+    if action == 'export':
+        response = HttpResponse(content_type='text/csv')
+        response['Content-Disposition'] = 'attachment; filename="pickups.csv"'
+        services.write_pickups_csv(PickupRequest.objects.filter(id__in=pickup_ids), response)
+        return response
+
+    kwargs = {}
+    if action == 'assign':
+        assignee = _assignable_users(request.user).filter(id=request.POST.get('assign_to') or None).first()
+        if assignee is None:
+            messages.error(request, "Choose a staff member to assign the pickups to.")
+            return redirect('manage_pickups')
+        kwargs['assign_to'] = assignee
+    elif action == 'schedule':
+        scheduled_date = parse_datetime(request.POST.get('scheduled_date', ''))
+        if scheduled_date is None:
+            messages.error(request, "Choose a date and time to schedule the pickups for.")
+            return redirect('manage_pickups')
+        if timezone.is_naive(scheduled_date):
+            scheduled_date = timezone.make_aware(scheduled_date)
+        kwargs.update(to_status='scheduled', scheduled_date=scheduled_date)
+    elif action == 'complete':
+        kwargs['to_status'] = 'completed'
+    elif action == 'cancel':
+        kwargs['to_status'] = 'cancelled'
+    else:
+        messages.error(request, "Unknown bulk action.")
+        return redirect('manage_pickups')
+
+    try:
+        updated, skipped = services.bulk_update_pickups(pickup_ids, request.user, **kwargs)
+    except slots.SlotFull as exc:
+        messages.error(request, f"{exc} No pickups were changed.")
+        return redirect('manage_pickups')
+    if updated:
+        messages.success(request, f"Updated {len(updated)} pickup(s).")
+    if skipped:
+        messages.warning(request, f"Skipped {len(skipped)} pickup(s) that cannot be changed that way.")
+    return redirect('manage_pickups')
+
+
 @login_required(login_url='login')
 def company_admin(request):
     """Company admin page (lists companies and recent pickups)"""
@@ -348,7 +483,8 @@ def edit_pickup(request, pickup_id):
         messages.error(request, "You don't have permission to access this page!")
         return redirect('dashboard')
 
-    pickup = get_object_or_404(PickupRequest, id=pickup_id)
+    pickup = get_object_or_404(PickupRequest.objects.visible_to(request.user), id=pickup_id)
+    previous_status = pickup.status
 
     if request.method == 'POST':
         form = PickupRequestForm(request.POST, instance=pickup)
@@ -357,9 +493,20 @@ def edit_pickup(request, pickup_id):
             # if not assigned, allow assigning to current user
             if not pr.assigned_to:
                 pr.assigned_to = request.user
-            pr.save()
-            messages.success(request, "Pickup updated successfully!")
-            return redirect('manage_pickups')
+            try:
+                if pr.status == previous_status:
+                    # Only details changed; a status transition would redo its side effects
+                    services.save_pickup(pr)
+                elif not services.can_transition(previous_status, pr.status):
+                    previous_label = dict(PickupRequest.STATUS_CHOICES)[previous_status]
+                    form.add_error('status', f"A pickup that is {previous_label.lower()} cannot become {pr.get_status_display().lower()}.")
+                else:
+                    services.transition_pickup(pr, pr.status, actor=request.user, previous_status=previous_status)
+            except slots.SlotFull as exc:
+                form.add_error('scheduled_date', str(exc))
+            if not form.errors:
+                messages.success(request, "Pickup updated successfully!")
+                return redirect('manage_pickups')
     else:
         form = PickupRequestForm(instance=pickup)
 
@@ -374,8 +521,10 @@ def admin_dashboard(request):
         messages.error(request, "You don't have permission to access this page!")
         return redirect('dashboard')
     
-    total_items = EWasteItem.objects.count()
-    collected_items = EWasteItem.objects.filter(is_collected=True).count()
+    # Totals include archived items (see services.get_global_statistics)
+    statistics = services.get_global_statistics()
+    total_items = statistics['total_items']
+    collected_items = statistics['collected_items']
     pending_pickups = PickupRequest.objects.filter(status='pending').count()
     total_users = User.objects.count()
     notifications = Notification.objects.filter(user=request.user, is_read=False)
@@ -390,21 +539,40 @@ def admin_dashboard(request):
         'notifications': notifications,
         'companies_count': companies_count,
         'company_members': company_members,
+        'overdue': sla.overdue_summary(),
+        'assignee_backlog': sla.assignee_backlog(),
     }
     return render(request, 'admin_dashboard.html', context)
 
 
+@login_required(login_url='login')
+def job_status(request):
+    """Background job queue status (staff only)"""
+    if not request.user.is_staff:
+        messages.error(request, "You don't have permission to access this page!")
+        return redirect('dashboard')
+
+    counts = {row['status']: row['count'] for row in Job.objects.values('status').annotate(count=Count('id')).order_by()}
+    context = {
+        'status_counts': [(label, counts.get(value, 0)) for value, label in Job.STATUS_CHOICES],
+        'schedules': JobSchedule.objects.order_by('name'),
+        'failed_jobs': Job.objects.filter(status=Job.STATUS_FAILED).order_by('-finished_at')[:20],
+        'recent_jobs': Job.objects.order_by('-updated_at')[:50],
+    }
+    return render(request, 'jobs_status.html', context)
+
+
 def search_items(request):
     """Search e-waste items"""
     query = request.GET.get('q', '')
-    items = EWasteItem.objects.all()
+    items = EWasteItem.objects.select_related('user')
     
     if query:
         items = items.filter(
             Q(item_name__icontains=query) |
             Q(description__icontains=query) |
-            Q(category__name__icontains=query)
+            Q(category_id__in=categories.ids_matching(query))
         )
     
-    context = {'items': items, 'query': query}
-    return render(request, 'search_results.html', context)
+    context = {'query': query}
+    return stream_list(request, 'search_results.html', context, items, 'partials/search_result_cards.html')
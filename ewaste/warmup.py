@@ -0,0 +1,157 @@
+"""
+Worker warm-up.
+
+A fresh worker otherwise pays for a lot of one-off work while serving its
+first requests. warm_up() does that work before any request arrives:
+
+- database: open the default connection and run the backend's setup
+- models: build the ORM metadata of every model and compile a query for each
+- urls: populate the resolver, then reverse and resolve every named URL
+- templates: compile every template under the TEMPLATES dirs (the cached
+  loader keeps them when DEBUG is off)
+- static: load the static files manifest
+- caches: the category registry, company routing index and subscription index
+
+Each step is timed. A step that fails is logged and reported, never raised,
+so warm-up cannot stop a worker from starting. Database connections are
+closed at the end so that a process about to fork never hands a connection
+to its children.
+
+gunicorn.conf.py runs it from the master's when_ready hook, after the app is
+preloaded and before any worker is forked, so it runs once and the workers
+share the warmed state copy-on-write. It never runs on import, so management
+commands and tests do not pay for it. `manage.py warmup` runs it on demand
+and prints the timing breakdown.
+"""
+import logging
+import os
+import time
+
+from django.apps import apps
+from django.conf import settings
+from django.db import connection, connections
+from django.template import engines
+from django.urls import NoReverseMatch, Resolver404, URLResolver, get_resolver, resolve, reverse
+from django.urls.converters import IntConverter, UUIDConverter
+
+
+logger = logging.getLogger(__name__)
+
+TEMPLATE_EXTENSIONS = ('.html', '.txt')
+
+
+def _database():
+    connection.ensure_connection()
+    return connection.vendor
+
+
+def _models():
+    models = apps.get_models()
+    for model in models:
+        model._meta.get_fields()
+        str(model._default_manager.all().query)
+    return f'{len(models)} models'
+
+
+def _sample(converter):
+    if isinstance(converter, IntConverter):
+        return 1
+    if isinstance(converter, UUIDConverter):
+        return '00000000-0000-0000-0000-000000000000'
+    return 'x'
+
+
+def _named_patterns(resolver, namespace='', converters=None):
+    """(name, converters) of every named URL pattern under `resolver`"""
+    converters = converters or {}
+    for pattern in resolver.url_patterns:
+        inherited = {**converters, **getattr(pattern.pattern, 'converters', {})}
+        if isinstance(pattern, URLResolver):
+            prefix = f'{namespace}{pattern.namespace}:' if pattern.namespace else namespace
+            yield from _named_patterns(pattern, prefix, inherited)
+        elif pattern.name:
+            yield namespace + pattern.name, inherited
+
+
+def _urls():
+    resolver = get_resolver()
+    resolved = skipped = 0
+    for name, converters in _named_patterns(resolver):
+        try:
+            path = reverse(name, kwargs={key: _sample(value) for key, value in converters.items()} or None)
+            resolve(path)
+        except (NoReverseMatch, Resolver404):
+            skipped += 1
+        else:
+            resolved += 1
+    return f'{resolved} resolved, {skipped} need arguments'
+
+
+def _template_names(directory):
+    static_dirs = {os.path.realpath(str(path)) for path in getattr(settings, 'STATICFILES_DIRS', [])}
+    for root, dirs, files in os.walk(directory):
+        dirs[:] = sorted(d for d in dirs if os.path.realpath(os.path.join(root, d)) not in static_dirs)
+        for filename in sorted(files):
+            if filename.endswith(TEMPLATE_EXTENSIONS):
+                yield os.path.relpath(os.path.join(root, filename), directory).replace(os.sep, '/')
+
+
+def _templates():
+    compiled = failed = 0
+    for engine in engines.all():
+        for directory in engine.dirs:
+            for name in _template_names(directory):
+                try:
+                    engine.get_template(name)
+                except Exception:
+                    logger.warning("Warm-up could not compile template %s", name, exc_info=True)
+                    failed += 1
+                else:
+                    compiled += 1
+    return f'{compiled} compiled, {failed} failed'
+
+
+def _static():
+    from django.contrib.staticfiles.storage import staticfiles_storage
+    return f"{len(getattr(staticfiles_storage, 'hashed_files', {}))} manifest entries"
+
+
+def _caches():
+    from . import categories, subscriptions, tenancy
+    count = categories.count()
+    # Each call loads its module's in-process index
+    tenancy.route('')
+    subscriptions.contacts(())
+    return f'{count} categories'
+
+
+STEPS = (
+    ('database', _database),
+    ('models', _models),
+    ('urls', _urls),
+    ('templates', _templates),
+    ('static', _static),
+    ('caches', _caches),
+)
+
+
+def warm_up():
+    """
+    Run every step; returns a list of (step, seconds, detail) with the
+    detail of a failed step starting with 'failed:'
+    """
+    report = []
+    for name, step in STEPS:
+        start = time.perf_counter()
+        try:
+            detail = step()
+        except Exception as exc:
+            logger.warning("Warm-up step %s failed", name, exc_info=True)
+            detail = f'failed: {exc}'
+        report.append((name, time.perf_counter() - start, detail))
+    connections.close_all()
+    total = sum(seconds for _, seconds, _ in report)
+    logger.info("Warm-up took %.0f ms: %s", total * 1000, ', '.join(
+        f'{name} {seconds * 1000:.0f} ms' for name, seconds, _ in report
+    ))
+    return report
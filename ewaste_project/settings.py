@@ -5,11 +5,13 @@ Django settings for ewaste_project project.
 from pathlib import Path
 import os
 
+from django.core.exceptions import ImproperlyConfigured
+
 BASE_DIR = Path(__file__).resolve().parent.parent
 
 SECRET_KEY = 'django-insecure-ewaste-management-key-2024-very-secret'
 
-DEBUG = True
+DEBUG = os.environ.get('DJANGO_DEBUG', 'True') == 'True'
 
 ALLOWED_HOSTS = ['*']
 
@@ -25,10 +27,16 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    # Serves collected static files before any session or auth work
+    'ewaste.staticfiles.StaticFilesMiddleware',
+    'django.middleware.gzip.GZipMiddleware',
+    'django.middleware.http.ConditionalGetMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
+    'ewaste.throttling.ThrottleMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'ewaste.sessions.RoleSnapshotMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -60,6 +68,49 @@ DATABASES = {
     }
 }
 
+# The default LocMemCache is private to each process, which is fine for
+# runserver. Anything run with several processes must share one cache
+# (Redis or Memcached): cache-backed sessions, role snapshots, throttling
+# counters and the version numbers of the in-process indexes rely on it.
+CACHE_BACKEND = os.environ.get('DJANGO_CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache')
+SHARED_CACHE = CACHE_BACKEND in (
+    'django.core.cache.backends.redis.RedisCache',
+    'django.core.cache.backends.memcached.PyMemcacheCache',
+    'django.core.cache.backends.memcached.PyLibMCCache',
+)
+if SHARED_CACHE:
+    CACHES = {
+        'default': {'BACKEND': CACHE_BACKEND, 'LOCATION': os.environ['DJANGO_CACHE_LOCATION']},
+        # Sessions get their own key space so other entries never evict them
+        'sessions': {
+            'BACKEND': CACHE_BACKEND,
+            'LOCATION': os.environ['DJANGO_CACHE_LOCATION'],
+            'KEY_PREFIX': 'sessions',
+        },
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': CACHE_BACKEND,
+            'LOCATION': 'ewaste-default',
+            'OPTIONS': {'MAX_ENTRIES': 20000},
+        },
+    }
+
+# Sessions (see ewaste/sessions.py): cached_db serves sessions from the cache
+# and writes them through to the database, so it needs the shared cache; a
+# per-process cache would keep serving sessions that another process ended.
+SESSION_ENGINE = os.environ.get(
+    'DJANGO_SESSION_ENGINE',
+    'django.contrib.sessions.backends.cached_db' if SHARED_CACHE else 'django.contrib.sessions.backends.db',
+)
+if not SHARED_CACHE and SESSION_ENGINE in (
+    'django.contrib.sessions.backends.cached_db', 'django.contrib.sessions.backends.cache',
+):
+    raise ImproperlyConfigured(f"{SESSION_ENGINE} sessions need a shared DJANGO_CACHE_BACKEND.")
+SESSION_CACHE_ALIAS = 'sessions' if SHARED_CACHE else 'default'
+SESSION_COOKIE_AGE = int(os.environ.get('DJANGO_SESSION_COOKIE_AGE', str(14 * 24 * 60 * 60)))
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -85,8 +136,98 @@ USE_TZ = True
 
 STATIC_URL = '/static/'
 STATICFILES_DIRS = [BASE_DIR / 'templates' / 'static']
+STATIC_ROOT = BASE_DIR / 'staticfiles'
+
+# Outside of development `collectstatic` minifies, fingerprints and
+# precompresses assets (see ewaste/staticfiles.py) and the app serves them
+# itself with immutable cache headers.
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {
+        'BACKEND': (
+            'django.contrib.staticfiles.storage.StaticFilesStorage' if DEBUG
+            else 'ewaste.staticfiles.CompressedManifestStaticFilesStorage'
+        ),
+    },
+}
+SERVE_STATIC = os.environ.get('SERVE_STATIC', str(not DEBUG)) == 'True'
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 LOGIN_URL = 'login'
 LOGIN_REDIRECT_URL = 'dashboard'
+
+# Duplicate report handling: 'flag' keeps the new pickup and marks it as a
+# possible duplicate, 'merge' cancels it in favour of the original report.
+DUPLICATE_REPORT_ACTION = os.environ.get('DUPLICATE_REPORT_ACTION', 'flag')
+DUPLICATE_WINDOW_DAYS = 60
+
+# Pickup booking (see ewaste/slots.py): pickups per day and service area
+# unless a PickupSlot row says otherwise, how far ahead customers can book,
+# and how long the availability calendar is cached.
+PICKUP_SLOT_CAPACITY = int(os.environ.get('PICKUP_SLOT_CAPACITY', '20'))
+PICKUP_BOOKING_DAYS = 30
+PICKUP_CALENDAR_CACHE_SECONDS = 60
+
+# Heatmap of reported items (see ewaste/heatmap.py): geohash precisions
+# counted, and how long clients may reuse a tile.
+HEATMAP_PRECISIONS = (4, 5, 6, 7)
+HEATMAP_TILE_MAX_AGE = 300
+
+# Streamed list pages (my items, users, search): rows sent per page before
+# infinite scroll takes over, rows rendered per streamed chunk, and rows per
+# JSON fragment fetched by main.js.
+STREAM_PAGE_ROWS = 500
+STREAM_CHUNK_ROWS = 100
+FRAGMENT_ROWS = 50
+
+# Background jobs (see ewaste/jobs.py). Run the worker with
+# `python manage.py run_jobs`; set JOBS_ASYNC=False to run jobs inline.
+JOBS_ASYNC = os.environ.get('JOBS_ASYNC', 'True') == 'True'
+JOBS_STALE_LOCK_SECONDS = 15 * 60
+
+# Database counters served at /api/v1/metrics/db/ for `manage.py loadtest`
+# (see ewaste/dbmetrics.py). Off by default; costs a lock per query.
+DB_METRICS = os.environ.get('DB_METRICS', 'False') == 'True'
+
+# Archival (see ewaste/archive.py and `manage.py archive_data`): age in days
+# after which closed pickups and their items, read notifications and
+# feedback move to the archive tables.
+ARCHIVE_AFTER_DAYS = {
+    'pickups': 365,
+    'notifications': 30,
+    'feedback': 730,
+}
+
+# Outgoing email. Use the console or file backend locally to read digests
+# (see ewaste/digests.py) without an SMTP server.
+EMAIL_BACKEND = os.environ.get(
+    'DJANGO_EMAIL_BACKEND',
+    'django.core.mail.backends.console.EmailBackend' if DEBUG else 'django.core.mail.backends.smtp.EmailBackend',
+)
+EMAIL_FILE_PATH = os.environ.get('DJANGO_EMAIL_FILE_PATH', str(BASE_DIR / 'sent_emails'))
+EMAIL_HOST = os.environ.get('DJANGO_EMAIL_HOST', 'localhost')
+EMAIL_PORT = int(os.environ.get('DJANGO_EMAIL_PORT', '25'))
+EMAIL_HOST_USER = os.environ.get('DJANGO_EMAIL_HOST_USER', '')
+EMAIL_HOST_PASSWORD = os.environ.get('DJANGO_EMAIL_HOST_PASSWORD', '')
+EMAIL_USE_TLS = os.environ.get('DJANGO_EMAIL_USE_TLS', 'False') == 'True'
+DEFAULT_FROM_EMAIL = os.environ.get('DJANGO_DEFAULT_FROM_EMAIL', 'noreply@localhost')
+SITE_URL = os.environ.get('SITE_URL', 'http://localhost:8000')
+
+# Bulk pickup actions post one field per selected row
+DATA_UPLOAD_MAX_NUMBER_FIELDS = 10000
+
+# Request throttling (see ewaste/throttling.py): limits per URL name, per
+# client IP and/or per logged-in user, applied to THROTTLE_METHODS requests.
+# The counters are shared between processes only with a shared cache.
+THROTTLE_ENABLED = os.environ.get('THROTTLE_ENABLED', 'True') == 'True'
+THROTTLE_CACHE = 'default'
+THROTTLE_METHODS = ('POST',)
+THROTTLE_TRUST_X_FORWARDED_FOR = os.environ.get('THROTTLE_TRUST_X_FORWARDED_FOR', 'False') == 'True'
+THROTTLE_RATES = {
+    'signup': {'ip': '5/hour'},
+    'login': {'ip': '20/min'},
+    'contact': {'ip': '5/hour', 'user': '5/hour'},
+    'report_ewaste': {'ip': '60/hour', 'user': '20/hour'},
+    'api_pickup_sync': {'user': '120/min'},
+}
@@ -0,0 +1,23 @@
+"""
+Settings for a server measured by `manage.py loadtest` (see ewaste/loadtest.py):
+
+    DJANGO_SETTINGS_MODULE=ewaste_project.settings_loadtest python manage.py runserver --noreload
+
+PBKDF2 dominates the cost of a signup or login, so new passwords are hashed
+with MD5. That must never reach real accounts, so these settings refuse to
+load with DEBUG off. Days take far more pickups than in production so long
+runs measure the app rather than fill every slot.
+"""
+from django.conf import global_settings
+from django.core.exceptions import ImproperlyConfigured
+
+from .settings import *  # noqa: F401,F403
+from .settings import DEBUG
+
+if not DEBUG:
+    raise ImproperlyConfigured("settings_loadtest uses MD5 password hashing and needs DJANGO_DEBUG=True.")
+
+PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher', *global_settings.PASSWORD_HASHERS]
+THROTTLE_ENABLED = False
+PICKUP_SLOT_CAPACITY = 1_000_000
+DB_METRICS = True
@@ -0,0 +1,29 @@
+"""
+gunicorn settings: `gunicorn ewaste_project.wsgi -c gunicorn.conf.py`
+
+The master imports the app once and, in when_ready, warms it up
+(ewaste/warmup.py) before forking, so every worker starts with compiled
+templates, a populated URL resolver and loaded indexes, shared copy-on-write
+with the master.
+
+One worker by default: sessions, role snapshots, throttling, the slot
+calendar and the registry versions live in the Django cache, which is
+per-process unless DJANGO_CACHE_BACKEND names Redis or Memcached (see
+settings.SHARED_CACHE). Only raise GUNICORN_WORKERS with a shared cache.
+"""
+import gc
+import os
+
+bind = os.environ.get('GUNICORN_BIND', '127.0.0.1:8000')
+workers = int(os.environ.get('GUNICORN_WORKERS', '1'))
+preload_app = True
+
+
+def when_ready(server):
+    # The app is loaded (preload_app) and no worker is forked yet
+    from ewaste.warmup import warm_up
+    warm_up()
+    # Move everything loaded so far out of the collector's reach, so garbage
+    # collection in the workers does not write to, and copy, the shared pages
+    gc.collect()
+    gc.freeze()
@@ -63,8 +63,120 @@ document.addEventListener('DOMContentLoaded', function() {
             // You can add real-time search functionality here
         }, 300));
     }
+
+    // Infinite scroll for streamed list pages
+    document.querySelectorAll('[data-infinite-next]').forEach(initInfiniteScroll);
+
+    // "Select all" checkboxes for bulk actions
+    document.querySelectorAll('[data-select-all]').forEach(toggle => {
+        toggle.addEventListener('change', function() {
+            const name = this.dataset.selectAll;
+            document.querySelectorAll(`input[type="checkbox"][name="${name}"]`).forEach(box => {
+                box.checked = this.checked;
+            });
+        });
+    });
+
+    // Fill hidden coordinate fields from the browser's location, only when
+    // the user asks for it with the "Use my location" button
+    document.querySelectorAll('[data-geolocate-button]').forEach(button => {
+        const latitudeField = document.querySelector('[data-geolocate="latitude"]');
+        const longitudeField = document.querySelector('[data-geolocate="longitude"]');
+        const status = document.querySelector('[data-geolocate-status]');
+        if (!latitudeField || !longitudeField || !navigator.geolocation) {
+            button.hidden = true;
+            return;
+        }
+        button.hidden = false;
+        button.addEventListener('click', () => {
+            status.textContent = 'Locating...';
+            navigator.geolocation.getCurrentPosition(position => {
+                latitudeField.value = position.coords.latitude.toFixed(6);
+                longitudeField.value = position.coords.longitude.toFixed(6);
+                status.textContent = 'Location added.';
+            }, () => {
+                status.textContent = 'Location unavailable.';
+            }, {maximumAge: 600000, timeout: 10000});
+        });
+    });
+
+    // Pickup date picker backed by the slot calendar API
+    document.querySelectorAll('[data-slot-calendar]').forEach(initSlotCalendar);
 });
 
+// Show how many pickups are left on the chosen day and block full days
+function initSlotCalendar(container) {
+    const dateInput = container.querySelector('input[type="date"]');
+    const locationInput = document.getElementById(container.dataset.slotLocation);
+    const hint = container.querySelector('[data-slot-hint]');
+    if (!dateInput || !locationInput) {
+        return;
+    }
+    let availability = {};
+    let timer = null;
+
+    function update() {
+        const available = availability[dateInput.value];
+        if (available === 0) {
+            dateInput.setCustomValidity('That day is fully booked. Please choose another date.');
+            hint.textContent = 'Fully booked - please choose another date.';
+        } else {
+            dateInput.setCustomValidity('');
+            hint.textContent = available === undefined ? '' : `${available} pickup${available === 1 ? '' : 's'} left on this day.`;
+        }
+    }
+
+    function load() {
+        const url = `${container.dataset.slotCalendar}?location=${encodeURIComponent(locationInput.value)}`;
+        fetch(url, {headers: {'Accept': 'application/json'}})
+            .then(response => response.ok ? response.json() : Promise.reject(response.status))
+            .then(data => {
+                availability = {};
+                data.days.forEach(day => { availability[day.date] = day.available; });
+                update();
+            })
+            .catch(() => {});
+    }
+
+    locationInput.addEventListener('input', () => {
+        clearTimeout(timer);
+        timer = setTimeout(load, 400);
+    });
+    dateInput.addEventListener('change', update);
+    load();
+}
+
+// Load the next rows of a list page when its sentinel scrolls into view
+function initInfiniteScroll(sentinel) {
+    let loading = false;
+    const scrollObserver = new IntersectionObserver((entries) => {
+        if (!entries[0].isIntersecting || loading) {
+            return;
+        }
+        const url = sentinel.getAttribute('data-infinite-next');
+        if (!url) {
+            scrollObserver.disconnect();
+            sentinel.remove();
+            return;
+        }
+        loading = true;
+        fetch(url, { headers: { 'Accept': 'application/json' }, credentials: 'same-origin' })
+            .then(response => response.json())
+            .then(data => {
+                sentinel.insertAdjacentHTML('beforebegin', data.html);
+                if (data.next) {
+                    sentinel.setAttribute('data-infinite-next', data.next);
+                } else {
+                    scrollObserver.disconnect();
+                    sentinel.remove();
+                }
+            })
+            .catch(error => console.log('Could not load more rows:', error))
+            .finally(() => { loading = false; });
+    }, { rootMargin: '400px' });
+    scrollObserver.observe(sentinel);
+}
+
 // Debounce function for search
 function debounce(func, wait) {
     let timeout;